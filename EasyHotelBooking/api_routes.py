@@ -1,101 +1,35 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, g
 from flask_login import login_required, current_user
-from functools import wraps
-import jwt
 from datetime import datetime, timedelta
 from models import (User, Room, Booking, Amenity, BookingAmenity, Rating, Notification, Payment,
                    CheckInOut, RoomStatus, CleaningTask, SecurityPatrol, SecurityIncident, 
-                   WorkOrder, Equipment, EquipmentMaintenance, DailyReport, StaffPerformance, Attendance)
+                   WorkOrder, Equipment, EquipmentMaintenance, DailyReport, StaffPerformance, Attendance, PayRate)
 from extensions import db
-import smtplib
-from email.mime.text import MIMEText
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
 import random
 import os
+import math
 from payment_service import gcash_service
+from availability import availability_index, parse_room_id
+from reservations import reserve_booking, is_room_free, RoomUnavailable
+from cache import report_cache, catalogue_response
+import reports
+from jobs import enqueue_once
+from mailer import mailer
+from paymongo_client import paymongo_client
+from payment_reconciliation import verify_signature, ingest_event, webhooks_enabled, RECONCILE_MIN_AGE
+from auth import (token_required, admin_required, staff_required, current_principal,
+                  issue_tokens, decode_token, revoke_token)
+from ratelimit import login_retry_after
+from pagination import keyset_page, page_size, capped_count, InvalidCursor
+from serializers import (user_serializer, room_serializer, booking_serializer, notification_serializer,
+                         payment_serializer)
+from tasks import send_verification_email, send_password_reset_email, send_staff_verification_email
 
 # Create API blueprint
 api_bp = Blueprint('unique_api_blueprint_xyz789', __name__, url_prefix='/api')
 
-# JWT Secret Key (should be in environment variables in production)
-JWT_SECRET_KEY = 'your-secret-key-here'
-JWT_ALGORITHM = 'HS256'
-
-# Email configuration
-EMAIL_SERVER = 'smtp.gmail.com'
-EMAIL_PORT = 587
-EMAIL_USERNAME = 'hoteleasy244@gmail.com'
-EMAIL_PASSWORD = 'jler dwhq hzms pzom'
-EMAIL_FROM = 'no-reply@easyhotel.com'
-
-def token_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            return jsonify({'message': 'Token is missing'}), 401
-        
-        try:
-            if token.startswith('Bearer '):
-                token = token[7:]
-            data = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-            current_user_id = data['user_id']
-        except:
-            return jsonify({'message': 'Token is invalid'}), 401
-        
-        return f(current_user_id, *args, **kwargs)
-    return decorated
-
-def generate_token(user_id):
-    payload = {
-        'user_id': user_id,
-        'exp': datetime.utcnow() + timedelta(days=7)
-    }
-    return jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
-
-def send_verification_email(email, verification_code):
-    """Send verification email to user"""
-    try:
-        print(f"📧 Attempting to send verification email to: {email}")
-        print(f"📧 Using SMTP server: {EMAIL_SERVER}:{EMAIL_PORT}")
-        print(f"📧 Verification code: {verification_code}")
-        
-        msg = MIMEText(f'''
-        Welcome to Easy Hotel!
-        
-        Your verification code is: {verification_code}
-        
-        Please enter this code to complete your registration.
-        
-        If you did not request this registration, please ignore this email.
-        
-        Best regards,
-        Easy Hotel Team
-        ''')
-        msg['Subject'] = 'Easy Hotel - Email Verification'
-        msg['From'] = EMAIL_FROM
-        msg['To'] = email
-        
-        with smtplib.SMTP(EMAIL_SERVER, EMAIL_PORT) as server:
-            server.starttls()
-            print(f"📧 TLS started successfully")
-            server.login(EMAIL_USERNAME, EMAIL_PASSWORD)
-            print(f"📧 Login successful")
-            server.sendmail(EMAIL_FROM, [email], msg.as_string())
-            print(f"✅ Email sent successfully to {email}")
-        
-        return True
-    except smtplib.SMTPAuthenticationError as e:
-        print(f"❌ SMTP Authentication Error: {str(e)}")
-        print(f"❌ Check if 2FA is enabled and App Password is correct")
-        return False
-    except smtplib.SMTPException as e:
-        print(f"❌ SMTP Error: {str(e)}")
-        return False
-    except Exception as e:
-        print(f"❌ Email error: {str(e)}")
-        print(f"❌ Error type: {type(e).__name__}")
-        return False
-
 # Authentication Routes
 @api_bp.route('/auth/login', methods=['POST'])
 def api_login():
@@ -106,13 +40,25 @@ def api_login():
     if not email or not password:
         return jsonify({'success': False, 'message': 'Email and password are required'}), 400
     
+    # Throttle before hashing so attempt floods cannot pin the CPU
+    retry_after = login_retry_after(request.remote_addr, email)
+    if retry_after:
+        response = jsonify({'success': False, 'message': 'Too many login attempts, please try again later'})
+        response.headers['Retry-After'] = str(retry_after)
+        return response, 429
+    
     user = User.query.filter_by(email=email).first()
     
     if user and user.check_password(password):
-        token = generate_token(user.id)
+        if user.is_staff and user.staff_status != 'active':
+            return jsonify({'success': False, 'message': 'Account is inactive'}), 403
+        
+        # Saves a hash upgraded by check_password
+        db.session.commit()
+        
         return jsonify({
             'success': True,
-            'token': token,
+            **issue_tokens(user),
             'user': {
                 'id': user.id,
                 'username': user.username,
@@ -125,6 +71,56 @@ def api_login():
     else:
         return jsonify({'success': False, 'message': 'Invalid credentials'}), 401
 
+@api_bp.route('/auth/refresh', methods=['POST'])
+def api_refresh_token():
+    """Exchange a refresh token for a new access/refresh pair; the old refresh token is revoked"""
+    data = request.get_json() or {}
+    try:
+        claims = decode_token(data.get('refresh_token') or '', 'refresh')
+    except Exception:
+        return jsonify({'success': False, 'message': 'Refresh token is invalid'}), 401
+    
+    user = User.query.get(claims['user_id'])
+    if not user or (user.is_staff and user.staff_status != 'active'):
+        return jsonify({'success': False, 'message': 'Refresh token is invalid'}), 401
+    
+    # The unique jti makes the exchange single-use, even across workers and
+    # for two concurrent requests with the same token
+    revoke_token(claims, 'refreshed')
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Refresh token is invalid'}), 401
+    
+    return jsonify({'success': True, **issue_tokens(user)})
+
+@api_bp.route('/auth/logout', methods=['POST'])
+@token_required
+def api_logout(current_user_id):
+    """Revoke the current access token and, if given, its refresh token"""
+    revoke_token(g.token_claims, 'logout')
+    refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+    if refresh_token:
+        try:
+            claims = decode_token(refresh_token, 'refresh')
+            if claims['user_id'] == current_user_id:
+                revoke_token(claims, 'logout')
+        except Exception:
+            pass
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request revoked one of the tokens first; make sure the access token is revoked
+        db.session.rollback()
+        revoke_token(g.token_claims, 'logout')
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+    
+    return jsonify({'success': True, 'message': 'Logged out'})
+
 @api_bp.route('/auth/register', methods=['POST'])
 def api_register():
     data = request.get_json()
@@ -155,12 +151,11 @@ def api_register():
         pending_user.verification_code = None
         db.session.commit()
         
-        # Generate token and return success
-        token = generate_token(pending_user.id)
+        # Generate tokens and return success
         return jsonify({
             'success': True, 
             'message': 'Registration successful',
-            'token': token,
+            **issue_tokens(pending_user),
             'user': {
                 'id': pending_user.id,
                 'username': pending_user.username,
@@ -189,27 +184,17 @@ def api_register():
     new_user.set_password(password)
     
     db.session.add(new_user)
-    db.session.commit()
+    db.session.flush()
     
-    # Send verification email
-    email_sent = send_verification_email(email, verification_code)
+    # Send verification email in the background; the job commits with the user
+    send_verification_email.delay(new_user.id)
+    db.session.commit()
     
-    if email_sent:
-        return jsonify({
-            'success': True, 
-            'message': 'Verification code sent to your email. Please check your inbox.',
-            'requires_verification': True
-        })
-    else:
-        # If email fails, delete the user and return error
-        # This ensures proper verification is enforced
-        db.session.delete(new_user)
-        db.session.commit()
-        
-        return jsonify({
-            'success': False, 
-            'message': 'Failed to send verification email. Please try again or contact support.',
-        }), 500
+    return jsonify({
+        'success': True, 
+        'message': 'Verification code sent to your email. Please check your inbox.',
+        'requires_verification': True
+    })
 
 @api_bp.route('/auth/forgot-password', methods=['POST'])
 def api_forgot_password():
@@ -233,86 +218,15 @@ def api_forgot_password():
     
     # Store reset code (in a real app, you'd want to store this with expiration)
     user.verification_code = reset_code
+    
+    # Send reset email in the background; the job commits with the reset code
+    send_password_reset_email.delay(user.id)
     db.session.commit()
     
-    # Send reset email
-    if send_password_reset_email(email, reset_code):
-        return jsonify({
-            'success': True, 
-            'message': 'If an account with this email exists, password reset instructions have been sent.'
-        })
-    else:
-        return jsonify({'success': False, 'message': 'Failed to send reset email. Please try again.'}), 500
-
-def send_password_reset_email(email, reset_code):
-    """Send password reset email to user"""
-    try:
-        msg = MIMEText(f'''
-        Easy Hotel - Password Reset
-        
-        You have requested to reset your password.
-        
-        Your password reset code is: {reset_code}
-        
-        Please use this code to reset your password. This code will expire in 1 hour.
-        
-        If you did not request this password reset, please ignore this email and your password will remain unchanged.
-        
-        Best regards,
-        Easy Hotel Team
-        ''')
-        msg['Subject'] = 'Easy Hotel - Password Reset'
-        msg['From'] = EMAIL_FROM
-        msg['To'] = email
-        
-        with smtplib.SMTP(EMAIL_SERVER, EMAIL_PORT) as server:
-            server.starttls()
-            server.login(EMAIL_USERNAME, EMAIL_PASSWORD)
-            server.sendmail(EMAIL_FROM, [email], msg.as_string())
-        
-        return True
-    except Exception as e:
-        print(f"Email error: {str(e)}")
-        return False
-
-def send_staff_verification_email(email, username, verification_code, password):
-    """Send verification email to new staff member"""
-    try:
-        msg = MIMEText(f'''
-        Welcome to Easy Hotel Staff Team!
-        
-        Dear {username},
-        
-        Your staff account has been created successfully. To complete your registration, please verify your email address.
-        
-        Your verification code is: {verification_code}
-        
-        Please provide this code to your administrator to activate your account.
-        
-        Your login credentials (after verification):
-        Email: {email}
-        Password: {password}
-        
-        Please keep this information secure and do not share it with anyone.
-        
-        If you have any questions, please contact your administrator.
-        
-        Best regards,
-        Easy Hotel Management Team
-        ''')
-        msg['Subject'] = 'Easy Hotel - Staff Account Verification'
-        msg['From'] = EMAIL_FROM
-        msg['To'] = email
-        
-        with smtplib.SMTP(EMAIL_SERVER, EMAIL_PORT) as server:
-            server.starttls()
-            server.login(EMAIL_USERNAME, EMAIL_PASSWORD)
-            server.sendmail(EMAIL_FROM, [email], msg.as_string())
-        
-        return True
-    except Exception as e:
-        print(f"Email error: {str(e)}")
-        return False
+    return jsonify({
+        'success': True, 
+        'message': 'If an account with this email exists, password reset instructions have been sent.'
+    })
 
 @api_bp.route('/auth/reset-password', methods=['POST'])
 def api_reset_password():
@@ -406,15 +320,36 @@ def update_user_profile(current_user_id):
 # Room Routes
 @api_bp.route('/rooms', methods=['GET'])
 def get_rooms():
-    from models import RoomSize, FloorPlan
+    return catalogue_response('rooms', _load_room_catalogue)
+
+def _load_room_catalogue():
+    from models import RoomSize, AmenityDetail, AmenityMaster
+    from sqlalchemy.orm import joinedload
+    
+    # Rooms with their type and floor in a single joined query
+    rooms = Room.query.options(
+        joinedload(Room.room_size),
+        joinedload(Room.floor)
+    ).order_by(Room.id).all()
+    
+    # Amenities for every room type in one more query (amenity_details is a dynamic relationship)
+    room_size_ids = {room.room_size_id for room in rooms if room.room_size_id}
+    amenities_by_size = {}
+    if room_size_ids:
+        amenity_rows = db.session.query(AmenityDetail.room_size_id, AmenityMaster).join(
+            AmenityMaster, AmenityDetail.amenity_id == AmenityMaster.id
+        ).filter(AmenityDetail.room_size_id.in_(room_size_ids)).order_by(AmenityMaster.name).all()
+        for room_size_id, amenity in amenity_rows:
+            amenities_by_size.setdefault(room_size_id, []).append({
+                'id': amenity.id,
+                'name': amenity.name,
+                'icon_url': amenity.icon_url or ''
+            })
     
-    rooms = Room.query.all()
     rooms_data = []
-    
     for room in rooms:
-        # Get related data
-        room_size = RoomSize.query.get(room.room_size_id) if room.room_size_id else None
-        floor_plan = FloorPlan.query.get(room.floor_id) if room.floor_id else None
+        room_size = room.room_size
+        floor_plan = room.floor
         
         room_dict = {
             'id': room.id,
@@ -428,21 +363,105 @@ def get_rooms():
             'max_children': room_size.max_children if room_size else 0,
             'status': room.status or 'available',
             'image_url': room.image_url or '',
+            'images': room.images,
+            'amenities': amenities_by_size.get(room.room_size_id, []),
             'name': room.name or f'Room {room.room_number}',
             'description': room.description or 'Comfortable room',
             'capacity': room.capacity or 2
         }
         rooms_data.append(room_dict)
     
-    return jsonify({'data': rooms_data})
+    return {'data': rooms_data}
+
+@api_bp.route('/rooms/search', methods=['GET'])
+def search_rooms():
+    """Search rooms that are free for a stay, filtered by capacity, type, floor and price"""
+    from models import RoomSize, FloorPlan
+
+    check_in = request.args.get('check_in')
+    check_out = request.args.get('check_out')
+
+    if not check_in or not check_out:
+        return jsonify({'success': False, 'message': 'check_in and check_out are required'}), 400
+
+    try:
+        check_in_date = datetime.strptime(check_in, '%Y-%m-%d').date()
+        check_out_date = datetime.strptime(check_out, '%Y-%m-%d').date()
+        adults = int(request.args.get('adults', 1))
+        children = int(request.args.get('children', 0))
+        room_type_id = request.args.get('room_type_id', type=int)
+        floor_id = request.args.get('floor_id', type=int)
+        min_price = request.args.get('min_price', type=float)
+        max_price = request.args.get('max_price', type=float)
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid search parameters'}), 400
+
+    if check_out_date <= check_in_date:
+        return jsonify({'success': False, 'message': 'Check-out date must be after check-in date'}), 400
+
+    # Rooms, their type and floor in one query; availability comes from the index
+    query = db.session.query(Room, RoomSize, FloorPlan).join(
+        RoomSize, Room.room_size_id == RoomSize.id
+    ).outerjoin(
+        FloorPlan, Room.floor_id == FloorPlan.id
+    ).filter(
+        RoomSize.max_adults >= adults,
+        RoomSize.max_children >= children
+    )
+
+    room_type = request.args.get('room_type')
+    if room_type_id:
+        query = query.filter(Room.room_size_id == room_type_id)
+    elif room_type:
+        query = query.filter(RoomSize.room_type_name == room_type)
+    if floor_id:
+        query = query.filter(Room.floor_id == floor_id)
+    if min_price is not None:
+        query = query.filter(Room.price_per_night >= min_price)
+    if max_price is not None:
+        query = query.filter(Room.price_per_night <= max_price)
+
+    unavailable = availability_index.unavailable_room_ids(check_in_date, check_out_date)
+    if unavailable:
+        query = query.filter(Room.id.notin_(unavailable))
+
+    total = query.count()
+    results = query.order_by(Room.price_per_night.asc(), Room.id.asc()).offset(
+        (page - 1) * per_page
+    ).limit(per_page).all()
+
+    nights = (check_out_date - check_in_date).days
+    rooms_data = [{
+        'id': room.id,
+        'room_number': room.room_number or '',
+        'room_type_id': room.room_size_id,
+        'room_type_name': room_size.room_type_name,
+        'floor_plan_id': room.floor_id,
+        'floor_name': floor_plan.floor_name if floor_plan else 'Unknown',
+        'price_per_night': float(room.price_per_night) if room.price_per_night else 0.0,
+        'total_price': float(room.price_per_night or 0) * nights,
+        'max_adults': room_size.max_adults,
+        'max_children': room_size.max_children,
+        'status': room.status or 'available',
+        'image_url': room.image_url or '',
+        'name': room.name or f'Room {room.room_number}',
+        'description': room.description or 'Comfortable room'
+    } for room, room_size, floor_plan in results]
+
+    return jsonify({
+        'success': True,
+        'data': rooms_data,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': (total + per_page - 1) // per_page
+    })
 
 @api_bp.route('/admin/rooms', methods=['POST'])
-@token_required
+@admin_required
 def create_room(current_user_id):
-    user = User.query.get(current_user_id)
-    if not user or not user.is_admin:
-        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
-    
     # Get JSON data from request
     data = request.get_json()
     
@@ -493,12 +512,8 @@ def create_room(current_user_id):
     })
 
 @api_bp.route('/admin/rooms/<int:room_id>', methods=['PUT'])
-@token_required
+@admin_required
 def update_room(current_user_id, room_id):
-    user = User.query.get(current_user_id)
-    if not user or not user.is_admin:
-        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
-    
     room = Room.query.get(room_id)
     if not room:
         return jsonify({'success': False, 'message': 'Room not found'}), 404
@@ -546,12 +561,8 @@ def update_room(current_user_id, room_id):
     })
 
 @api_bp.route('/admin/rooms/<int:room_id>', methods=['DELETE'])
-@token_required
+@admin_required
 def delete_room(current_user_id, room_id):
-    user = User.query.get(current_user_id)
-    if not user or not user.is_admin:
-        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
-    
     room = Room.query.get(room_id)
     if not room:
         return jsonify({'success': False, 'message': 'Room not found'}), 404
@@ -587,25 +598,26 @@ def check_availability():
     except ValueError:
         return jsonify({'available': False, 'message': 'Invalid date format'}), 400
     
+    room_id = parse_room_id(room_id)
+    if room_id is None:
+        return jsonify({'available': False, 'message': 'Invalid room_id'}), 400
+    
     # Check for overlapping bookings
-    existing_bookings = Booking.query.filter_by(room_id=room_id).filter(
-        ((Booking.check_in_date <= check_in_date) & (Booking.check_out_date >= check_in_date)) |
-        ((Booking.check_in_date <= check_out_date) & (Booking.check_out_date >= check_out_date)) |
-        ((Booking.check_in_date >= check_in_date) & (Booking.check_out_date <= check_out_date))
-    ).filter(Booking.status != 'cancelled').count()
+    available = is_room_free(room_id, check_in_date, check_out_date)
     
     return jsonify({
-        'available': existing_bookings == 0,
-        'message': 'Room available' if existing_bookings == 0 else 'Room not available'
+        'available': available,
+        'message': 'Room available' if available else 'Room not available'
     })
 
 # Booking Routes
 @api_bp.route('/bookings', methods=['GET'])
 @token_required
 def get_bookings(current_user_id):
-    bookings = Booking.query.filter_by(user_id=current_user_id).all()
+    bookings = Booking.query.options(*booking_serializer.load_options('list')) \
+        .filter_by(user_id=current_user_id).all()
     return jsonify({
-        'bookings': [booking.to_dict() for booking in bookings]
+        'bookings': booking_serializer.dump_many(bookings, 'list')
     })
 
 @api_bp.route('/bookings', methods=['POST'])
@@ -624,14 +636,8 @@ def create_booking(current_user_id):
     if not room:
         return jsonify({'message': 'Room not found'}), 404
     
-    # Check availability
-    existing_bookings = Booking.query.filter_by(room_id=room_id).filter(
-        ((Booking.check_in_date <= check_in_date) & (Booking.check_out_date >= check_in_date)) |
-        ((Booking.check_in_date <= check_out_date) & (Booking.check_out_date >= check_out_date)) |
-        ((Booking.check_in_date >= check_in_date) & (Booking.check_out_date <= check_out_date))
-    ).filter(Booking.status != 'cancelled').count()
-    
-    if existing_bookings > 0:
+    # Check availability against the room-night ledger
+    if not is_room_free(room.id, check_in_date, check_out_date):
         return jsonify({'message': 'Room not available for selected dates'}), 400
     
     # Calculate total price
@@ -655,8 +661,11 @@ def create_booking(current_user_id):
         status='pending'
     )
     
-    db.session.add(booking)
-    db.session.flush()
+    # The room_night unique key rejects the booking if another request took the room first
+    try:
+        reserve_booking(booking)
+    except RoomUnavailable:
+        return jsonify({'message': 'Room not available for selected dates'}), 409
     
     # Add amenities
     for amenity_data in amenities:
@@ -670,7 +679,7 @@ def create_booking(current_user_id):
     db.session.commit()
     
     return jsonify({
-        'booking': booking.to_dict(),
+        'booking': booking_serializer.dump(booking),
         'message': 'Booking created successfully'
     })
 
@@ -694,30 +703,77 @@ def cancel_booking(current_user_id, booking_id):
     db.session.commit()
     
     return jsonify({
-        'booking': booking.to_dict(),
+        'booking': booking_serializer.dump(booking),
         'message': 'Booking cancelled successfully'
     })
 
-# Admin Routes
-@api_bp.route('/admin/bookings/pending', methods=['GET'])
-@token_required
-def get_pending_bookings(current_user_id):
-    user = User.query.get(current_user_id)
-    if not user or not user.is_admin:
-        return jsonify({'message': 'Unauthorized'}), 403
+def parse_list_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+def filtered_bookings(args, status=None):
+    """Bookings matching the listing filters, eager-loading what the list view serializes.
+
+    Filters: status (comma-separated), from/to (YYYY-MM-DD, stays overlapping
+    the range), room_id, guest_id and guest (part of a username or email).
+    Raises ValueError for malformed values.
+    """
+    query = Booking.query.options(*booking_serializer.load_options('list'))
+    
+    statuses = [status] if status else [s.strip() for s in args.get('status', '').split(',') if s.strip()]
+    if statuses:
+        query = query.filter(Booking.status.in_(statuses))
+    date_from = parse_list_date(args.get('from'))
+    date_to = parse_list_date(args.get('to'))
+    if date_from:
+        query = query.filter(Booking.check_out_date > date_from)
+    if date_to:
+        query = query.filter(Booking.check_in_date <= date_to)
+    if args.get('room_id'):
+        query = query.filter(Booking.room_id == int(args['room_id']))
+    if args.get('guest_id'):
+        query = query.filter(Booking.user_id == int(args['guest_id']))
+    if args.get('guest'):
+        pattern = f"%{args['guest'].strip()}%"
+        query = query.filter(Booking.user_id.in_(
+            select(User.id).where(or_(User.username.ilike(pattern), User.email.ilike(pattern)))
+        ))
+    return query
+
+def booking_page(args, status=None):
+    """Keyset page of bookings, newest first, as a JSON response.
+
+    ``total_count`` counts every booking matching the filters (not just this
+    page), up to COUNT_CAP; ``total_count_exact`` is False when it was capped.
+    """
+    try:
+        limit = page_size(args.get('limit'))
+        query = filtered_bookings(args, status)
+        bookings, next_cursor = keyset_page(query, (Booking.created_at, Booking.id), args.get('cursor'), limit)
+        total_count, exact = capped_count(query)
+    except InvalidCursor:
+        return jsonify({'message': 'Invalid cursor'}), 400
+    except ValueError:
+        return jsonify({'message': 'Invalid filter parameters'}), 400
     
-    bookings = Booking.query.filter_by(status='pending').all()
     return jsonify({
-        'bookings': [booking.to_dict() for booking in bookings]
+        'bookings': booking_serializer.dump_many(bookings, 'list'),
+        'total_count': total_count,
+        'total_count_exact': exact,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None,
+        'limit': limit
     })
 
+# Admin Routes
+@api_bp.route('/admin/bookings/pending', methods=['GET'])
+@admin_required
+def get_pending_bookings(current_user_id):
+    """Pending bookings, one keyset page at a time (?cursor=&limit=, same filters as reservations)"""
+    return booking_page(request.args, status='pending')
+
 @api_bp.route('/admin/bookings/<int:booking_id>/verify', methods=['POST'])
-@token_required
+@admin_required
 def verify_booking(current_user_id, booking_id):
-    user = User.query.get(current_user_id)
-    if not user or not user.is_admin:
-        return jsonify({'message': 'Unauthorized'}), 403
-    
     booking = Booking.query.get(booking_id)
     if not booking:
         return jsonify({'message': 'Booking not found'}), 404
@@ -738,18 +794,14 @@ def verify_booking(current_user_id, booking_id):
     db.session.commit()
     
     return jsonify({
-        'booking': booking.to_dict(),
+        'booking': booking_serializer.dump(booking),
         'message': f'Booking {action}ed successfully'
     })
 
 # Staff Routes
 @api_bp.route('/staff/attendance', methods=['POST'])
-@token_required
+@staff_required()
 def staff_attendance(current_user_id):
-    user = User.query.get(current_user_id)
-    if not user or not user.is_staff:
-        return jsonify({'message': 'Unauthorized'}), 403
-    
     try:
         # Handle both JSON and form data
         if request.is_json:
@@ -764,7 +816,7 @@ def staff_attendance(current_user_id):
             return jsonify({'success': False, 'message': 'Missing verify_id or action'}), 400
         
         # Simple verification - in real app, you'd verify the ID
-        if verify_id != str(user.id):
+        if verify_id != str(current_user_id):
             return jsonify({'success': False, 'message': 'Invalid verification ID'}), 400
         
         from datetime import datetime, date
@@ -842,24 +894,16 @@ def staff_attendance(current_user_id):
 
 # Admin Staff Management Routes
 @api_bp.route('/admin/staff', methods=['GET'])
-@token_required
+@admin_required
 def get_all_staff(current_user_id):
-    user = User.query.get(current_user_id)
-    if not user or not user.is_admin:
-        return jsonify({'message': 'Unauthorized'}), 403
-    
     staff_members = User.query.filter_by(is_staff=True).all()
     return jsonify({
-        'staff': [staff.to_dict() for staff in staff_members]
+        'staff': user_serializer.dump_many(staff_members, 'list')
     })
 
 @api_bp.route('/admin/staff', methods=['POST'])
-@token_required
+@admin_required
 def create_staff(current_user_id):
-    user = User.query.get(current_user_id)
-    if not user or not user.is_admin:
-        return jsonify({'message': 'Unauthorized'}), 403
-    
     data = request.get_json()
     
     # Validation
@@ -895,29 +939,22 @@ def create_staff(current_user_id):
     new_staff.set_password(password)
     
     db.session.add(new_staff)
+    db.session.flush()
+    
+    # Send verification email in the background; the job commits with the staff member
+    send_staff_verification_email.delay(new_staff.id)
     db.session.commit()
     
-    # Send verification email
-    if send_staff_verification_email(email, username, verification_code, password):
-        return jsonify({
-            'staff': new_staff.to_dict(),
-            'message': 'Staff member created successfully. Verification email sent.',
-            'requires_verification': True,
-            'verification_code': verification_code  # For testing purposes
-        })
-    else:
-        # If email fails, delete the staff and return error
-        db.session.delete(new_staff)
-        db.session.commit()
-        return jsonify({'message': 'Failed to send verification email. Please try again.'}), 500
+    return jsonify({
+        'staff': user_serializer.dump(new_staff),
+        'message': 'Staff member created successfully. Verification email sent.',
+        'requires_verification': True,
+        'verification_code': verification_code  # For testing purposes
+    })
 
 @api_bp.route('/admin/staff/<int:staff_id>', methods=['PUT'])
-@token_required
+@admin_required
 def update_staff(current_user_id, staff_id):
-    user = User.query.get(current_user_id)
-    if not user or not user.is_admin:
-        return jsonify({'message': 'Unauthorized'}), 403
-    
     staff_member = User.query.get(staff_id)
     if not staff_member or not staff_member.is_staff:
         return jsonify({'message': 'Staff member not found'}), 404
@@ -941,17 +978,13 @@ def update_staff(current_user_id, staff_id):
     db.session.commit()
     
     return jsonify({
-        'staff': staff_member.to_dict(),
+        'staff': user_serializer.dump(staff_member),
         'message': 'Staff member updated successfully'
     })
 
 @api_bp.route('/admin/staff/<int:staff_id>', methods=['DELETE'])
-@token_required
+@admin_required
 def delete_staff(current_user_id, staff_id):
-    user = User.query.get(current_user_id)
-    if not user or not user.is_admin:
-        return jsonify({'message': 'Unauthorized'}), 403
-    
     staff_member = User.query.get(staff_id)
     if not staff_member or not staff_member.is_staff:
         return jsonify({'message': 'Staff member not found'}), 404
@@ -965,12 +998,8 @@ def delete_staff(current_user_id, staff_id):
 
 # Admin Attendance Management Routes
 @api_bp.route('/admin/attendance', methods=['GET'])
-@token_required
+@admin_required
 def get_all_attendance(current_user_id):
-    user = User.query.get(current_user_id)
-    if not user or not user.is_admin:
-        return jsonify({'message': 'Unauthorized'}), 403
-    
     try:
         from models import Attendance
         from datetime import datetime, timedelta
@@ -1022,12 +1051,8 @@ def get_all_attendance(current_user_id):
         return jsonify({'message': f'Error fetching attendance: {str(e)}'}), 500
 
 @api_bp.route('/admin/attendance/<int:attendance_id>/approve', methods=['POST'])
-@token_required
+@admin_required
 def approve_attendance(current_user_id, attendance_id):
-    user = User.query.get(current_user_id)
-    if not user or not user.is_admin:
-        return jsonify({'message': 'Unauthorized'}), 403
-    
     try:
         from models import Attendance
         
@@ -1077,12 +1102,8 @@ def _calculate_hours_worked(clock_in, clock_out):
     return round(hours, 2)
 
 @api_bp.route('/admin/staff/<int:staff_id>/verify', methods=['POST'])
-@token_required
+@admin_required
 def verify_staff(current_user_id, staff_id):
-    user = User.query.get(current_user_id)
-    if not user or not user.is_admin:
-        return jsonify({'message': 'Unauthorized'}), 403
-    
     data = request.get_json()
     verification_code = data.get('verification_code')
     
@@ -1102,235 +1123,201 @@ def verify_staff(current_user_id, staff_id):
     db.session.commit()
     
     return jsonify({
-        'staff': staff_member.to_dict(),
+        'staff': user_serializer.dump(staff_member),
         'message': 'Staff member verified successfully'
     })
 
+# Pay Rate Routes
+def pay_rate_to_dict(rate):
+    return {
+        'id': rate.id,
+        'staff_role': rate.staff_role,
+        'hourly_rate': rate.hourly_rate,
+        'overtime_rate': rate.overtime_rate,
+        'effective_from': rate.effective_from.isoformat()
+    }
+
+@api_bp.route('/admin/pay-rates', methods=['GET'])
+@admin_required
+def get_pay_rates(current_user_id):
+    query = PayRate.query
+    if request.args.get('staff_role'):
+        query = query.filter_by(staff_role=request.args.get('staff_role'))
+    rates = query.order_by(PayRate.staff_role, PayRate.effective_from.desc()).all()
+    
+    return jsonify({
+        'pay_rates': [pay_rate_to_dict(rate) for rate in rates]
+    })
+
+@api_bp.route('/admin/pay-rates', methods=['POST'])
+@admin_required
+def create_pay_rate(current_user_id):
+    data = request.get_json() or {}
+    staff_role = data.get('staff_role')
+    hourly_rate = data.get('hourly_rate')
+    effective_from = data.get('effective_from')
+    
+    if not all([staff_role, hourly_rate is not None, effective_from]):
+        return jsonify({'message': 'staff_role, hourly_rate and effective_from are required'}), 400
+    
+    try:
+        hourly_rate = float(hourly_rate)
+        # Overtime defaults to time and a quarter; an explicit 0 is kept
+        overtime_rate = data.get('overtime_rate')
+        overtime_rate = hourly_rate * 1.25 if overtime_rate is None else float(overtime_rate)
+        effective_from = datetime.strptime(effective_from, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return jsonify({'message': 'Invalid rate or date format. Use YYYY-MM-DD'}), 400
+    
+    if not (math.isfinite(hourly_rate) and math.isfinite(overtime_rate)):
+        return jsonify({'message': 'Invalid rate or date format. Use YYYY-MM-DD'}), 400
+    if hourly_rate < 0 or overtime_rate < 0:
+        return jsonify({'message': 'Rates cannot be negative'}), 400
+    
+    # Posting the same role and date again replaces that rate
+    rate = PayRate.query.filter_by(staff_role=staff_role, effective_from=effective_from).first()
+    if rate:
+        rate.hourly_rate = hourly_rate
+        rate.overtime_rate = overtime_rate
+    else:
+        rate = PayRate(
+            staff_role=staff_role,
+            hourly_rate=hourly_rate,
+            overtime_rate=overtime_rate,
+            effective_from=effective_from
+        )
+        db.session.add(rate)
+    
+    try:
+        db.session.commit()
+        return jsonify({
+            'pay_rate': pay_rate_to_dict(rate),
+            'message': 'Pay rate saved successfully'
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 500
+
+@api_bp.route('/admin/pay-rates/<int:rate_id>', methods=['DELETE'])
+@admin_required
+def delete_pay_rate(current_user_id, rate_id):
+    rate = PayRate.query.get(rate_id)
+    if not rate:
+        return jsonify({'message': 'Pay rate not found'}), 404
+    
+    db.session.delete(rate)
+    db.session.commit()
+    
+    return jsonify({'message': 'Pay rate deleted successfully'})
+
+# Mail Dispatcher Routes
+@api_bp.route('/admin/mail/metrics', methods=['GET'])
+@admin_required
+def get_mail_metrics(current_user_id):
+    return jsonify({'mail_metrics': mailer.metrics()})
+
+@api_bp.route('/admin/payments/gateway-metrics', methods=['GET'])
+@admin_required
+def get_payment_gateway_metrics(current_user_id):
+    return jsonify({
+        'base_url': paymongo_client.base_url,
+        'latency': paymongo_client.metrics()
+    })
+
 # Reports and Analytics Routes
 @api_bp.route('/admin/reports/dashboard', methods=['GET'])
-@token_required
+@admin_required
 def get_dashboard_reports(current_user_id):
-    user = User.query.get(current_user_id)
-    if not user or not user.is_admin:
-        return jsonify({'message': 'Unauthorized'}), 403
-    
     try:
-        # Get date range (default to last 30 days)
-        from datetime import datetime, timedelta
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=30)
-        
-        # Total bookings
-        total_bookings = Booking.query.count()
-        pending_bookings = Booking.query.filter_by(status='pending').count()
-        confirmed_bookings = Booking.query.filter_by(status='confirmed').count()
-        cancelled_bookings = Booking.query.filter_by(status='cancelled').count()
-        
-        # Revenue calculations
-        confirmed_bookings_list = Booking.query.filter_by(status='confirmed').all()
-        total_revenue = sum(booking.total_price for booking in confirmed_bookings_list)
-        
-        # Recent bookings revenue (last 30 days)
-        recent_bookings = Booking.query.filter(
-            Booking.status == 'confirmed',
-            Booking.created_at >= start_date
-        ).all()
-        recent_revenue = sum(booking.total_price for booking in recent_bookings)
-        
-        # Room statistics
-        total_rooms = Room.query.count()
-        
-        # Occupancy rate calculation
-        occupied_rooms = Booking.query.filter(
-            Booking.status.in_(['confirmed', 'pending']),
-            Booking.check_in_date <= end_date,
-            Booking.check_out_date >= start_date
-        ).count()
-        
-        occupancy_rate = (occupied_rooms / total_rooms * 100) if total_rooms > 0 else 0
-        
-        # Staff statistics
-        total_staff = User.query.filter_by(is_staff=True).count()
-        active_staff = User.query.filter_by(is_staff=True, staff_status='active').count()
-        
-        # Guest statistics
-        total_guests = User.query.filter_by(is_staff=False, is_admin=False).count()
-        
-        # Average booking value
-        avg_booking_value = total_revenue / confirmed_bookings if confirmed_bookings > 0 else 0
+        stats = report_cache.get_or_load('dashboard_stats', reports.dashboard_stats)
         
         return jsonify({
-            'dashboard_stats': {
-                'total_bookings': total_bookings,
-                'pending_bookings': pending_bookings,
-                'confirmed_bookings': confirmed_bookings,
-                'cancelled_bookings': cancelled_bookings,
-                'total_revenue': total_revenue,
-                'recent_revenue': recent_revenue,
-                'total_rooms': total_rooms,
-                'occupancy_rate': round(occupancy_rate, 2),
-                'total_staff': total_staff,
-                'active_staff': active_staff,
-                'total_guests': total_guests,
-                'avg_booking_value': round(avg_booking_value, 2)
-            }
+            'dashboard_stats': stats
         })
     except Exception as e:
         return jsonify({'message': f'Error generating reports: {str(e)}'}), 500
 
 @api_bp.route('/admin/reports/revenue', methods=['GET'])
-@token_required
+@admin_required
 def get_revenue_report(current_user_id):
-    user = User.query.get(current_user_id)
-    if not user or not user.is_admin:
-        return jsonify({'message': 'Unauthorized'}), 403
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in reports.GRANULARITIES:
+        return jsonify({'message': f'granularity must be one of: {", ".join(reports.GRANULARITIES)}'}), 400
     
     try:
-        from datetime import datetime, timedelta
-        
-        # Get last 12 months of revenue data
-        monthly_revenue = []
-        current_date = datetime.now().date()
-        
-        for i in range(12):
-            month_start = current_date.replace(day=1) - timedelta(days=i*30)
-            month_end = month_start + timedelta(days=30)
-            
-            month_bookings = Booking.query.filter(
-                Booking.status == 'confirmed',
-                Booking.created_at >= month_start,
-                Booking.created_at < month_end
-            ).all()
-            
-            month_revenue = sum(booking.total_price for booking in month_bookings)
-            
-            monthly_revenue.append({
-                'month': month_start.strftime('%B %Y'),
-                'revenue': month_revenue,
-                'bookings_count': len(month_bookings)
-            })
-        
-        # Room-wise revenue
-        room_revenue = []
-        rooms = Room.query.all()
-        
-        for room in rooms:
-            room_bookings = Booking.query.filter_by(
-                room_id=room.id,
-                status='confirmed'
-            ).all()
-            
-            room_total = sum(booking.total_price for booking in room_bookings)
-            
-            room_revenue.append({
-                'room_name': room.name,
-                'revenue': room_total,
-                'bookings_count': len(room_bookings)
-            })
+        start_date, end_date = reports.parse_date_range(request.args, granularity, default_periods=12)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    try:
+        report = report_cache.get_or_load(
+            ('revenue', start_date, end_date, granularity),
+            lambda: reports.revenue_report(start_date, end_date, granularity)
+        )
         
-        return jsonify({
-            'monthly_revenue': monthly_revenue[::-1],  # Reverse to show oldest first
-            'room_revenue': sorted(room_revenue, key=lambda x: x['revenue'], reverse=True)
-        })
+        response = dict(report)
+        if granularity == 'month':
+            # Keep the original shape for existing dashboard charts
+            response['monthly_revenue'] = [
+                {'month': item['label'], 'revenue': item['revenue'], 'bookings_count': item['bookings_count']}
+                for item in report['revenue_series']
+            ]
+        return jsonify(response)
     except Exception as e:
         return jsonify({'message': f'Error generating revenue report: {str(e)}'}), 500
 
 @api_bp.route('/admin/reports/occupancy', methods=['GET'])
-@token_required
+@admin_required
 def get_occupancy_report(current_user_id):
-    user = User.query.get(current_user_id)
-    if not user or not user.is_admin:
-        return jsonify({'message': 'Unauthorized'}), 403
+    breakdown = request.args.get('breakdown')
+    if breakdown and breakdown not in reports.OCCUPANCY_BREAKDOWNS:
+        return jsonify({'message': f'breakdown must be one of: {", ".join(reports.OCCUPANCY_BREAKDOWNS)}'}), 400
     
     try:
-        from datetime import datetime, timedelta
-        
-        # Get last 30 days occupancy data
-        occupancy_data = []
-        current_date = datetime.now().date()
-        
-        for i in range(30):
-            date = current_date - timedelta(days=i)
-            
-            # Count occupied rooms for this date
-            occupied = Booking.query.filter(
-                Booking.status.in_(['confirmed', 'pending']),
-                Booking.check_in_date <= date,
-                Booking.check_out_date > date
-            ).count()
-            
-            total_rooms = Room.query.count()
-            occupancy_rate = (occupied / total_rooms * 100) if total_rooms > 0 else 0
-            
-            occupancy_data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'occupied_rooms': occupied,
-                'total_rooms': total_rooms,
-                'occupancy_rate': round(occupancy_rate, 2)
-            })
+        days = int(request.args.get('days', 30))
+        if request.args.get('forward', '').lower() in ('1', 'true', 'yes'):
+            # On-the-books occupancy from today onwards
+            start_date = datetime.now().date()
+            end_date = start_date + timedelta(days=days - 1)
+        else:
+            start_date, end_date = reports.parse_date_range(request.args, 'day', default_periods=days)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    if days < 1 or (end_date - start_date).days + 1 > reports.MAX_OCCUPANCY_DAYS:
+        return jsonify({'message': f'Window must be between 1 and {reports.MAX_OCCUPANCY_DAYS} days'}), 400
+    
+    try:
+        report = report_cache.get_or_load(
+            ('occupancy', start_date, end_date, breakdown),
+            lambda: reports.occupancy_report(start_date, end_date, breakdown)
+        )
         
-        return jsonify({
-            'occupancy_data': occupancy_data[::-1]  # Reverse to show oldest first
-        })
+        return jsonify(report)
     except Exception as e:
         return jsonify({'message': f'Error generating occupancy report: {str(e)}'}), 500
 
 @api_bp.route('/admin/reports/guests', methods=['GET'])
-@token_required
+@admin_required
 def get_guest_analytics(current_user_id):
-    user = User.query.get(current_user_id)
-    if not user or not user.is_admin:
-        return jsonify({'message': 'Unauthorized'}), 403
+    sort = request.args.get('sort', 'spent')
+    if sort not in ('spent', 'bookings'):
+        return jsonify({'message': 'sort must be one of: spent, bookings'}), 400
     
     try:
-        # Guest registration trends
-        from datetime import datetime, timedelta
-        
-        guest_trends = []
-        current_date = datetime.now().date()
-        
-        for i in range(12):
-            month_start = current_date.replace(day=1) - timedelta(days=i*30)
-            month_end = month_start + timedelta(days=30)
-            
-            new_guests = User.query.filter(
-                User.is_staff == False,
-                User.is_admin == False,
-                User.created_at >= month_start,
-                User.created_at < month_end
-            ).count()
-            
-            guest_trends.append({
-                'month': month_start.strftime('%B %Y'),
-                'new_guests': new_guests
-            })
-        
-        # Top guests by bookings
-        top_guests = []
-        guests = User.query.filter_by(is_staff=False, is_admin=False).all()
-        
-        for guest in guests:
-            booking_count = Booking.query.filter_by(user_id=guest.id).count()
-            total_spent = sum(
-                booking.total_price 
-                for booking in Booking.query.filter_by(user_id=guest.id, status='confirmed').all()
-            )
-            
-            if booking_count > 0:
-                top_guests.append({
-                    'guest_name': guest.username,
-                    'email': guest.email,
-                    'total_bookings': booking_count,
-                    'total_spent': total_spent
-                })
-        
-        # Sort by total spent
-        top_guests = sorted(top_guests, key=lambda x: x['total_spent'], reverse=True)[:10]
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', 10)), 1), 100)
+        start_date, end_date = reports.parse_date_range(request.args, 'month', default_periods=12)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    try:
+        analytics = report_cache.get_or_load(
+            ('guests', start_date, end_date, page, per_page, sort),
+            lambda: reports.guest_analytics(start_date, end_date, page, per_page, sort)
+        )
         
-        return jsonify({
-            'guest_trends': guest_trends[::-1],
-            'top_guests': top_guests
-        })
+        return jsonify(analytics)
     except Exception as e:
         return jsonify({'message': f'Error generating guest analytics: {str(e)}'}), 500
 
@@ -1340,7 +1327,7 @@ def get_guest_analytics(current_user_id):
 def get_notifications(current_user_id):
     notifications = Notification.query.filter_by(user_id=current_user_id).all()
     return jsonify({
-        'notifications': [notification.to_dict() for notification in notifications]
+        'notifications': notification_serializer.dump_many(notifications, 'list')
     })
 
 @api_bp.route('/notifications/mark-all-read', methods=['POST'])
@@ -1358,28 +1345,29 @@ def mark_notifications_read(current_user_id):
 def get_payment_methods():
     """Get available payment methods"""
     try:
-        from models import PaymentMethod
-        
-        methods = PaymentMethod.query.filter_by(is_active=True).all()
-        
-        payment_methods = []
-        for method in methods:
-            payment_methods.append({
-                'id': method.id,
-                'name': method.name,
-                'code': method.code,
-                'is_online': method.is_online,
-                'description': method.description,
-                'icon_url': method.icon_url
-            })
-        
-        return jsonify({
-            'payment_methods': payment_methods
-        })
+        return catalogue_response('payment_methods', _load_payment_methods)
         
     except Exception as e:
         return jsonify({'message': f'Error fetching payment methods: {str(e)}'}), 500
 
+def _load_payment_methods():
+    from models import PaymentMethod
+    
+    methods = PaymentMethod.query.filter_by(is_active=True).all()
+    
+    payment_methods = []
+    for method in methods:
+        payment_methods.append({
+            'id': method.id,
+            'name': method.name,
+            'code': method.code,
+            'is_online': method.is_online,
+            'description': method.description,
+            'icon_url': method.icon_url
+        })
+    
+    return {'payment_methods': payment_methods}
+
 @api_bp.route('/payment/gcash/create', methods=['POST'])
 @token_required
 def create_gcash_payment(current_user_id):
@@ -1448,13 +1436,38 @@ def verify_payment(current_user_id, payment_id):
         if not payment or payment.user_id != current_user_id:
             return jsonify({'success': False, 'message': 'Payment not found'}), 404
         
-        result = gcash_service.verify_payment(payment_id)
+        # Final states need no gateway call
+        if payment.payment_status != 'pending':
+            return jsonify({'success': True, 'status': payment.payment_status})
+        
+        # Webhooks update the payment as soon as PayMongo reports it; without
+        # them, or once a webhook looks missed, refresh from PayMongo in the background
+        stale_after = datetime.utcnow() - timedelta(seconds=RECONCILE_MIN_AGE)
+        if webhooks_enabled() and payment.created_at > stale_after:
+            return jsonify({'success': True, 'status': 'pending'})
+        enqueue_once('payments.verify', payment_id)
+        db.session.commit()
         
-        return jsonify(result)
+        return jsonify({'success': True, 'status': 'pending', 'queued': True})
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
+@api_bp.route('/payment/webhook', methods=['POST'])
+def payment_webhook():
+    """PayMongo webhook receiver"""
+    raw_body = request.get_data()
+    if not verify_signature(request.headers.get('Paymongo-Signature'), raw_body):
+        return jsonify({'message': 'Invalid signature'}), 401
+    
+    payload = request.get_json(silent=True)
+    try:
+        status = ingest_event(payload, raw_body)
+    except (KeyError, TypeError, AttributeError):
+        return jsonify({'message': 'Malformed event'}), 400
+    
+    return jsonify({'received': True, 'status': status})
+
 @api_bp.route('/payment/success', methods=['GET'])
 def payment_success():
     """Payment success callback"""
@@ -1647,37 +1660,48 @@ def payment_failed():
     """
 
 @api_bp.route('/admin/payments', methods=['GET'])
-@token_required
+@admin_required
 def get_all_payments(current_user_id):
-    """Get all payments (admin only)"""
-    user = User.query.get(current_user_id)
-    if not user or not user.is_admin:
-        return jsonify({'message': 'Unauthorized'}), 403
-    
+    """Payments, newest first, one keyset page at a time (admin only).
+
+    Query: cursor, limit, status, method, from, to (created date, YYYY-MM-DD),
+    guest_id, booking_id. ``total_payments`` counts all matches, capped like booking_page.
+    """
     try:
         from models import Payment
         
-        payments = Payment.query.order_by(Payment.created_at.desc()).all()
-        
-        payment_list = []
-        for payment in payments:
-            payment_list.append({
-                'id': payment.id,
-                'booking_id': payment.booking_id,
-                'user_id': payment.user_id,
-                'amount': payment.amount,
-                'payment_method': payment.payment_method,
-                'payment_status': payment.payment_status,
-                'gcash_phone_number': payment.gcash_phone_number,
-                'created_at': payment.created_at.isoformat(),
-                'paid_at': payment.paid_at.isoformat() if payment.paid_at else None,
-                'user_name': payment.user.username if payment.user else 'Unknown',
-                'booking_room': payment.booking.room.name if payment.booking and payment.booking.room else 'Unknown'
-            })
+        args = request.args
+        query = Payment.query.options(*payment_serializer.load_options('list'))
+        try:
+            limit = page_size(args.get('limit'))
+            if args.get('status'):
+                query = query.filter(Payment.payment_status == args['status'])
+            if args.get('method'):
+                query = query.filter(Payment.payment_method == args['method'])
+            date_from = parse_list_date(args.get('from'))
+            date_to = parse_list_date(args.get('to'))
+            if date_from:
+                query = query.filter(Payment.created_at >= datetime.combine(date_from, datetime.min.time()))
+            if date_to:
+                query = query.filter(Payment.created_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+            if args.get('guest_id'):
+                query = query.filter(Payment.user_id == int(args['guest_id']))
+            if args.get('booking_id'):
+                query = query.filter(Payment.booking_id == int(args['booking_id']))
+            payments, next_cursor = keyset_page(query, (Payment.created_at, Payment.id), args.get('cursor'), limit)
+            total_payments, exact = capped_count(query)
+        except InvalidCursor:
+            return jsonify({'message': 'Invalid cursor'}), 400
+        except ValueError:
+            return jsonify({'message': 'Invalid filter parameters'}), 400
         
         return jsonify({
-            'payments': payment_list,
-            'total_payments': len(payment_list)
+            'payments': payment_serializer.dump_many(payments, 'list'),
+            'total_payments': total_payments,
+            'total_payments_exact': exact,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+            'limit': limit
         })
         
     except Exception as e:
@@ -1687,14 +1711,10 @@ def get_all_payments(current_user_id):
 
 # 1. Front Desk Operations
 @api_bp.route('/staff/checkin/<int:booking_id>', methods=['POST'])
-@token_required
+@staff_required('Front Desk Manager', 'Receptionist')
 def process_checkin(current_user_id, booking_id):
     """Process guest check-in"""
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_staff or user.staff_role.lower() not in ['front desk manager', 'receptionist']:
-            return jsonify({'message': 'Unauthorized'}), 403
-        
         booking = Booking.query.get(booking_id)
         if not booking:
             return jsonify({'message': 'Booking not found'}), 404
@@ -1732,14 +1752,10 @@ def process_checkin(current_user_id, booking_id):
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @api_bp.route('/staff/checkout/<int:booking_id>', methods=['POST'])
-@token_required
+@staff_required('Front Desk Manager', 'Receptionist')
 def process_checkout(current_user_id, booking_id):
     """Process guest check-out"""
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_staff or user.staff_role.lower() not in ['front desk manager', 'receptionist']:
-            return jsonify({'message': 'Unauthorized'}), 403
-        
         booking = Booking.query.get(booking_id)
         if not booking:
             return jsonify({'message': 'Booking not found'}), 404
@@ -1780,30 +1796,26 @@ def process_checkout(current_user_id, booking_id):
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @api_bp.route('/staff/front-desk/bookings', methods=['GET'])
-@token_required
+@staff_required('Front Desk Manager', 'Receptionist')
 def get_front_desk_bookings(current_user_id):
     """Get bookings for front desk operations"""
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_staff or user.staff_role.lower() not in ['front desk manager', 'receptionist']:
-            return jsonify({'message': 'Unauthorized'}), 403
-        
         # Get today's check-ins and check-outs
         today = datetime.now().date()
         
-        checkins_today = Booking.query.filter(
+        checkins_today = Booking.query.options(*booking_serializer.load_options('list')).filter(
             Booking.check_in_date == today,
             Booking.status.in_(['confirmed', 'pending'])
         ).all()
         
-        checkouts_today = Booking.query.filter(
+        checkouts_today = Booking.query.options(*booking_serializer.load_options('list')).filter(
             Booking.check_out_date == today,
             Booking.status == 'checked_in'
         ).all()
         
         return jsonify({
-            'checkins_today': [booking.to_dict() for booking in checkins_today],
-            'checkouts_today': [booking.to_dict() for booking in checkouts_today]
+            'checkins_today': booking_serializer.dump_many(checkins_today, 'list'),
+            'checkouts_today': booking_serializer.dump_many(checkouts_today, 'list')
         })
         
     except Exception as e:
@@ -1811,20 +1823,16 @@ def get_front_desk_bookings(current_user_id):
 
 # 2. Housekeeping Management
 @api_bp.route('/staff/housekeeping/rooms', methods=['GET'])
-@token_required
+@staff_required('Housekeeping Supervisor', 'Housekeeper')
 def get_housekeeping_rooms(current_user_id):
     """Get room status for housekeeping"""
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_staff or user.staff_role.lower() not in ['housekeeping supervisor', 'housekeeper']:
-            return jsonify({'message': 'Unauthorized'}), 403
-        
         rooms = Room.query.all()
         room_data = []
         
         for room in rooms:
             status = RoomStatus.query.filter_by(room_id=room.id).first()
-            room_info = room.to_dict()
+            room_info = room_serializer.dump(room)
             room_info['status'] = status.status if status else 'clean'
             room_info['last_cleaned'] = status.last_cleaned.isoformat() if status and status.last_cleaned else None
             room_info['inspection_status'] = status.inspection_status if status else 'pending'
@@ -1836,14 +1844,10 @@ def get_housekeeping_rooms(current_user_id):
         return jsonify({'message': str(e)}), 500
 
 @api_bp.route('/staff/housekeeping/clean-room/<int:room_id>', methods=['POST'])
-@token_required
+@staff_required('Housekeeping Supervisor', 'Housekeeper')
 def mark_room_cleaned(current_user_id, room_id):
     """Mark room as cleaned"""
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_staff or user.staff_role.lower() not in ['housekeeping supervisor', 'housekeeper']:
-            return jsonify({'message': 'Unauthorized'}), 403
-        
         data = request.get_json()
         
         # Update or create room status
@@ -1870,14 +1874,10 @@ def mark_room_cleaned(current_user_id, room_id):
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @api_bp.route('/staff/housekeeping/tasks', methods=['GET'])
-@token_required
+@staff_required('Housekeeping Supervisor', 'Housekeeper')
 def get_cleaning_tasks(current_user_id):
     """Get cleaning tasks for staff member"""
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_staff or user.staff_role.lower() not in ['housekeeping supervisor', 'housekeeper']:
-            return jsonify({'message': 'Unauthorized'}), 403
-        
         tasks = CleaningTask.query.filter_by(assigned_to=current_user_id).filter(
             CleaningTask.status.in_(['pending', 'in_progress'])
         ).all()
@@ -1903,14 +1903,10 @@ def get_cleaning_tasks(current_user_id):
 
 # 3. Security System
 @api_bp.route('/staff/security/start-patrol', methods=['POST'])
-@token_required
+@staff_required('Security Guard')
 def start_security_patrol(current_user_id):
     """Start a security patrol"""
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_staff or user.staff_role.lower() != 'security guard':
-            return jsonify({'message': 'Unauthorized'}), 403
-        
         data = request.get_json()
         
         patrol = SecurityPatrol(
@@ -1933,14 +1929,10 @@ def start_security_patrol(current_user_id):
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @api_bp.route('/staff/security/report-incident', methods=['POST'])
-@token_required
+@staff_required()
 def report_security_incident(current_user_id):
     """Report a security incident"""
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_staff:
-            return jsonify({'message': 'Unauthorized'}), 403
-        
         data = request.get_json()
         
         incident = SecurityIncident(
@@ -1967,14 +1959,10 @@ def report_security_incident(current_user_id):
 
 # 4. Maintenance Module
 @api_bp.route('/staff/maintenance/work-orders', methods=['GET'])
-@token_required
+@staff_required('Maintenance')
 def get_work_orders(current_user_id):
     """Get work orders for maintenance staff"""
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_staff or user.staff_role.lower() != 'maintenance':
-            return jsonify({'message': 'Unauthorized'}), 403
-        
         work_orders = WorkOrder.query.filter_by(assigned_to=current_user_id).filter(
             WorkOrder.status.in_(['assigned', 'in_progress'])
         ).all()
@@ -2001,14 +1989,10 @@ def get_work_orders(current_user_id):
         return jsonify({'message': str(e)}), 500
 
 @api_bp.route('/staff/maintenance/work-order/<int:order_id>/update', methods=['POST'])
-@token_required
+@staff_required('Maintenance')
 def update_work_order(current_user_id, order_id):
     """Update work order status"""
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_staff or user.staff_role.lower() != 'maintenance':
-            return jsonify({'message': 'Unauthorized'}), 403
-        
         work_order = WorkOrder.query.get(order_id)
         if not work_order or work_order.assigned_to != current_user_id:
             return jsonify({'message': 'Work order not found'}), 404
@@ -2042,39 +2026,23 @@ def update_work_order(current_user_id, order_id):
 
 # Staff Reservations Management
 @api_bp.route('/staff/reservations/all', methods=['GET'])
-@token_required
+@staff_required()
 def get_all_reservations(current_user_id):
-    """Get all reservations for staff management"""
+    """Reservations for staff management, newest first, one keyset page at a time.
+
+    Query: cursor, limit, status, from, to, room_id, guest_id, guest.
+    """
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_staff:
-            return jsonify({'message': 'Unauthorized'}), 403
-        
-        # Get all bookings with user and room information
-        bookings = Booking.query.order_by(Booking.created_at.desc()).all()
-        
-        booking_data = []
-        for booking in bookings:
-            booking_info = booking.to_dict()
-            booking_data.append(booking_info)
-        
-        return jsonify({
-            'bookings': booking_data,
-            'total_count': len(booking_data)
-        })
+        return booking_page(request.args)
         
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
 @api_bp.route('/staff/reservations/confirm/<int:booking_id>', methods=['POST'])
-@token_required
+@staff_required()
 def confirm_reservation(current_user_id, booking_id):
     """Confirm a pending reservation"""
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_staff:
-            return jsonify({'message': 'Unauthorized'}), 403
-        
         booking = Booking.query.get(booking_id)
         if not booking:
             return jsonify({'message': 'Booking not found'}), 404
@@ -2095,14 +2063,10 @@ def confirm_reservation(current_user_id, booking_id):
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @api_bp.route('/staff/reservations/cancel/<int:booking_id>', methods=['POST'])
-@token_required
+@staff_required()
 def cancel_reservation(current_user_id, booking_id):
     """Cancel a reservation"""
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_staff:
-            return jsonify({'message': 'Unauthorized'}), 403
-        
         booking = Booking.query.get(booking_id)
         if not booking:
             return jsonify({'message': 'Booking not found'}), 404
@@ -2127,14 +2091,10 @@ def cancel_reservation(current_user_id, booking_id):
 
 # 5. Manager Dashboard
 @api_bp.route('/staff/manager/overview', methods=['GET'])
-@token_required
+@staff_required('Manager')
 def get_manager_overview(current_user_id):
     """Get manager dashboard overview"""
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_staff or user.staff_role.lower() != 'manager':
-            return jsonify({'message': 'Unauthorized'}), 403
-        
         today = datetime.now().date()
         
         # Get today's statistics
@@ -2180,81 +2140,15 @@ def get_manager_overview(current_user_id):
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
-# Helper method to add to_dict methods to models
-def add_to_dict_methods():
-    def user_to_dict(self):
-        return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'phone_number': self.phone_number,
-            'is_admin': self.is_admin,
-            'is_staff': self.is_staff,
-            'staff_role': self.staff_role,
-            'staff_status': self.staff_status,
-            'staff_shift': self.staff_shift,
-            'is_verified': self.is_verified,
-            'created_at': self.created_at.isoformat()
-        }
-    
-    def room_to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'price_per_night': self.price_per_night,
-            'capacity': self.capacity,
-            'image_url': self.image_url
-        }
-    
-    def booking_to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'room_id': self.room_id,
-            'check_in_date': self.check_in_date.isoformat(),
-            'check_out_date': self.check_out_date.isoformat(),
-            'guests': self.guests,
-            'total_price': self.total_price,
-            'status': self.status,
-            'cancellation_reason': self.cancellation_reason,
-            'cancelled_by': self.cancelled_by,
-            'created_at': self.created_at.isoformat(),
-            'room': self.room.to_dict() if self.room else None,
-            'user': self.user.to_dict() if self.user else None
-        }
-    
-    def notification_to_dict(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'message': self.message,
-            'is_read': self.is_read,
-            'created_at': self.created_at.isoformat()
-        }
-    
-    # Add methods to models
-    User.to_dict = user_to_dict
-    Room.to_dict = room_to_dict
-    Booking.to_dict = booking_to_dict
-    Notification.to_dict = notification_to_dict
-
-# Add to_dict methods
-add_to_dict_methods()
-
 # ============================================
 # RFID CARD MANAGEMENT API ROUTES
 # ============================================
 
 @api_bp.route('/rfid/register', methods=['POST'])
-@token_required
+@admin_required
 def register_rfid_card(current_user_id):
     """Register a new RFID card for a user"""
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_admin:
-            return jsonify({'message': 'Unauthorized - Admin only'}), 403
-        
         from models import RFIDCard
         data = request.get_json()
         
@@ -2421,14 +2315,10 @@ def verify_rfid_card(current_user_id):
         return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
 @api_bp.route('/rfid/cards', methods=['GET'])
-@token_required
+@admin_required
 def get_all_rfid_cards(current_user_id):
     """Get all RFID cards (admin only)"""
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_admin:
-            return jsonify({'message': 'Unauthorized - Admin only'}), 403
-        
         from models import RFIDCard
         
         cards = RFIDCard.query.all()
@@ -2462,8 +2352,7 @@ def get_user_rfid_cards(current_user_id, user_id):
     """Get RFID cards for a specific user"""
     try:
         # Users can view their own cards, admins can view any
-        user = User.query.get(current_user_id)
-        if current_user_id != user_id and (not user or not user.is_admin):
+        if current_user_id != user_id and not current_principal().is_admin:
             return jsonify({'message': 'Unauthorized'}), 403
         
         from models import RFIDCard
@@ -2491,14 +2380,10 @@ def get_user_rfid_cards(current_user_id, user_id):
         return jsonify({'message': f'Error: {str(e)}'}), 500
 
 @api_bp.route('/rfid/cards/<int:card_id>/deactivate', methods=['POST'])
-@token_required
+@admin_required
 def deactivate_rfid_card(current_user_id, card_id):
     """Deactivate an RFID card (admin only)"""
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_admin:
-            return jsonify({'message': 'Unauthorized - Admin only'}), 403
-        
         from models import RFIDCard
         
         card = RFIDCard.query.get(card_id)
@@ -2518,14 +2403,10 @@ def deactivate_rfid_card(current_user_id, card_id):
         return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
 @api_bp.route('/rfid/cards/<int:card_id>/activate', methods=['POST'])
-@token_required
+@admin_required
 def activate_rfid_card(current_user_id, card_id):
     """Activate an RFID card (admin only)"""
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_admin:
-            return jsonify({'message': 'Unauthorized - Admin only'}), 403
-        
         from models import RFIDCard
         
         card = RFIDCard.query.get(card_id)
@@ -2545,14 +2426,10 @@ def activate_rfid_card(current_user_id, card_id):
         return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
 @api_bp.route('/rfid/access-logs', methods=['GET'])
-@token_required
+@admin_required
 def get_rfid_access_logs(current_user_id):
     """Get RFID access logs (admin only)"""
     try:
-        user = User.query.get(current_user_id)
-        if not user or not user.is_admin:
-            return jsonify({'message': 'Unauthorized - Admin only'}), 403
-        
         from models import RFIDAccessLog
         from datetime import timedelta
         
@@ -2592,8 +2469,7 @@ def get_user_rfid_access_logs(current_user_id, user_id):
     """Get RFID access logs for a specific user"""
     try:
         # Users can view their own logs, admins can view any
-        user = User.query.get(current_user_id)
-        if current_user_id != user_id and (not user or not user.is_admin):
+        if current_user_id != user_id and not current_principal().is_admin:
             return jsonify({'message': 'Unauthorized'}), 403
         
         from models import RFIDAccessLog
@@ -2631,15 +2507,10 @@ def get_user_rfid_access_logs(current_user_id, user_id):
 # ==================== ADMIN ATTENDANCE MANAGEMENT ====================
 
 @api_bp.route('/admin/attendance', methods=['GET'])
-@token_required
+@admin_required
 def get_all_attendance_records(current_user_id):
     """Get all attendance records with filters (Admin only)"""
     try:
-        # Check if user is admin
-        user = User.query.get(current_user_id)
-        if not user or not user.is_admin:
-            return jsonify({'message': 'Unauthorized - Admin access required'}), 403
-
         # Get query parameters
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
@@ -2686,15 +2557,10 @@ def get_all_attendance_records(current_user_id):
 
 
 @api_bp.route('/admin/attendance/<int:attendance_id>/approve', methods=['POST'])
-@token_required
+@admin_required
 def approve_attendance_record(current_user_id, attendance_id):
     """Approve or reject an attendance record (Admin only)"""
     try:
-        # Check if user is admin
-        user = User.query.get(current_user_id)
-        if not user or not user.is_admin:
-            return jsonify({'message': 'Unauthorized - Admin access required'}), 403
-
         # Get attendance record
         attendance = Attendance.query.get(attendance_id)
         if not attendance:
@@ -2723,15 +2589,10 @@ def approve_attendance_record(current_user_id, attendance_id):
 
 
 @api_bp.route('/admin/attendance/stats', methods=['GET'])
-@token_required
+@admin_required
 def get_attendance_stats(current_user_id):
     """Get attendance statistics (Admin only)"""
     try:
-        # Check if user is admin
-        user = User.query.get(current_user_id)
-        if not user or not user.is_admin:
-            return jsonify({'message': 'Unauthorized - Admin access required'}), 403
-
         # Get date range
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
@@ -2946,22 +2807,25 @@ def get_attendance_status(current_user_id):
 def get_amenities():
     """Get all amenities from amenity_master table"""
     try:
-        from models import AmenityMaster
-        amenities = AmenityMaster.query.order_by(AmenityMaster.created_at.desc()).all()
-        
-        return jsonify({
-            'success': True,
-            'amenities': [{
-                'id': a.id,
-                'name': a.name,
-                'icon_url': a.icon_url,
-                'description': a.description,
-                'created_at': a.created_at.isoformat() if a.created_at else None
-            } for a in amenities]
-        }), 200
+        return catalogue_response('amenities', _load_amenities)
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+def _load_amenities():
+    from models import AmenityMaster
+    amenities = AmenityMaster.query.order_by(AmenityMaster.created_at.desc()).all()
+    
+    return {
+        'success': True,
+        'amenities': [{
+            'id': a.id,
+            'name': a.name,
+            'icon_url': a.icon_url,
+            'description': a.description,
+            'created_at': a.created_at.isoformat() if a.created_at else None
+        } for a in amenities]
+    }
+
 @api_bp.route('/amenities', methods=['POST'])
 @token_required
 def create_amenity(current_user_id):
@@ -3095,23 +2959,26 @@ def delete_amenity(current_user_id, amenity_id):
 def get_room_sizes():
     """Get all room sizes/types"""
     try:
-        from models import RoomSize
-        room_sizes = RoomSize.query.order_by(RoomSize.created_at.desc()).all()
-        
-        return jsonify({
-            'success': True,
-            'room_sizes': [{
-                'id': rs.id,
-                'room_type_name': rs.room_type_name,
-                'features': rs.features,
-                'max_adults': rs.max_adults,
-                'max_children': rs.max_children,
-                'created_at': rs.created_at.isoformat() if rs.created_at else None
-            } for rs in room_sizes]
-        }), 200
+        return catalogue_response('room_sizes', _load_room_sizes)
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+def _load_room_sizes():
+    from models import RoomSize
+    room_sizes = RoomSize.query.order_by(RoomSize.created_at.desc()).all()
+    
+    return {
+        'success': True,
+        'room_sizes': [{
+            'id': rs.id,
+            'room_type_name': rs.room_type_name,
+            'features': rs.features,
+            'max_adults': rs.max_adults,
+            'max_children': rs.max_children,
+            'created_at': rs.created_at.isoformat() if rs.created_at else None
+        } for rs in room_sizes]
+    }
+
 @api_bp.route('/room-sizes', methods=['POST'])
 @token_required
 def create_room_size(current_user_id):
@@ -3271,25 +3138,32 @@ def delete_room_size(current_user_id, room_size_id):
 def get_amenity_details():
     """Get all amenity-room type mappings"""
     try:
-        from models import AmenityDetail, AmenityMaster, RoomSize
-        
-        details = AmenityDetail.query.all()
-        
-        return jsonify({
-            'success': True,
-            'amenity_details': [{
-                'id': ad.id,
-                'amenity_id': ad.amenity_id,
-                'amenity_name': ad.amenity.name if ad.amenity else 'Unknown',
-                'amenity_icon': ad.amenity.icon_url if ad.amenity else '',
-                'room_size_id': ad.room_size_id,
-                'room_type_name': ad.room_size.room_type_name if ad.room_size else 'Unknown',
-                'created_at': ad.created_at.isoformat() if ad.created_at else None
-            } for ad in details]
-        }), 200
+        return catalogue_response('amenity_details', _load_amenity_details)
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+def _load_amenity_details():
+    from models import AmenityDetail
+    from sqlalchemy.orm import joinedload
+    
+    details = AmenityDetail.query.options(
+        joinedload(AmenityDetail.amenity),
+        joinedload(AmenityDetail.room_size)
+    ).all()
+    
+    return {
+        'success': True,
+        'amenity_details': [{
+            'id': ad.id,
+            'amenity_id': ad.amenity_id,
+            'amenity_name': ad.amenity.name if ad.amenity else 'Unknown',
+            'amenity_icon': ad.amenity.icon_url if ad.amenity else '',
+            'room_size_id': ad.room_size_id,
+            'room_type_name': ad.room_size.room_type_name if ad.room_size else 'Unknown',
+            'created_at': ad.created_at.isoformat() if ad.created_at else None
+        } for ad in details]
+    }
+
 @api_bp.route('/amenity-details', methods=['POST'])
 @token_required
 def create_amenity_detail(current_user_id):
@@ -3388,26 +3262,30 @@ def delete_amenity_detail(current_user_id, detail_id):
 def get_floor_plans():
     """Get all floor plans"""
     try:
-        from models import FloorPlan, RoomSize
-        
-        floor_plans = FloorPlan.query.all()
-        
-        return jsonify({
-            'success': True,
-            'floor_plans': [{
-                'id': fp.id,
-                'floor_name': fp.floor_name,
-                'room_size_id': fp.room_size_id,
-                'room_type_name': fp.room_size.room_type_name if fp.room_size else 'Unknown',
-                'number_of_rooms': fp.number_of_rooms,
-                'start_room_number': fp.start_room_number,
-                'generated_room_numbers': fp.generate_room_numbers(),
-                'created_at': fp.created_at.isoformat() if fp.created_at else None
-            } for fp in floor_plans]
-        }), 200
+        return catalogue_response('floor_plans', _load_floor_plans)
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+def _load_floor_plans():
+    from models import FloorPlan
+    from sqlalchemy.orm import joinedload
+    
+    floor_plans = FloorPlan.query.options(joinedload(FloorPlan.room_size)).all()
+    
+    return {
+        'success': True,
+        'floor_plans': [{
+            'id': fp.id,
+            'floor_name': fp.floor_name,
+            'room_size_id': fp.room_size_id,
+            'room_type_name': fp.room_size.room_type_name if fp.room_size else 'Unknown',
+            'number_of_rooms': fp.number_of_rooms,
+            'start_room_number': fp.start_room_number,
+            'generated_room_numbers': fp.generate_room_numbers(),
+            'created_at': fp.created_at.isoformat() if fp.created_at else None
+        } for fp in floor_plans]
+    }
+
 @api_bp.route('/floor-plans', methods=['POST'])
 @token_required
 def create_floor_plan(current_user_id):
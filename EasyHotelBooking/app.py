@@ -15,7 +15,9 @@ logging.basicConfig(level=logging.DEBUG)
 # create the app
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "easy_hotel_secret_key")
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)  # needed for url_for to generate with https
+# needed for url_for to generate with https; x_for gives remote_addr the client
+# address the router forwards, which the login rate limiter keys on
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1)
 
 # Enable CORS for Flutter web and mobile
 CORS(app, resources={r"/api/*": {"origins": [
@@ -75,6 +77,34 @@ with app.app_context():
     # Create initial data
     from init_data import create_initial_data
     create_initial_data()
+    
+    # Room-night ledger rebuild command
+    from reservations import init_reservations
+    init_reservations(app)
+    
+    # Daily report rollup command and optional scheduler
+    from rollups import init_rollups
+    init_rollups(app)
+    
+    # Background job worker commands and optional in-process workers
+    from jobs import init_jobs
+    init_jobs(app)
+    
+    # API token maintenance commands
+    from auth import init_auth
+    init_auth(app)
+    
+    # Periodic reconciler for payments the webhooks missed
+    from payment_reconciliation import init_payment_reconciliation
+    init_payment_reconciliation(app)
+    
+    # Query-plan audit command for the hot endpoint queries
+    from query_audit import init_query_audit
+    init_query_audit(app)
+    
+    # Faster JSON responses when orjson is installed
+    from serializers import init_serializers
+    init_serializers(app)
 
 # Add Jinja filter for Philippine time
 @app.template_filter('to_ph_time')
@@ -0,0 +1,300 @@
+"""
+API Authentication
+JWT issuing and checking for the API blueprint. Tokens carry the user's role
+claims (admin, staff, staff role), so role checks are answered from the token
+instead of a User query per request. Each process keeps a short-TTL cache of
+users' current claims; a token whose claims no longer match (role changed,
+staff removed, user deleted) is rejected. Committed changes to those fields
+bump the 'auth' version in the shared version store, which clears the cache
+in every worker.
+
+Access tokens are short-lived; clients renew them with a refresh token
+(POST /api/auth/refresh), which is rotated on every use. Revocations (logout,
+used refresh tokens, password changes, deactivated staff) are stored in the
+revoked_token table and mirrored in every process as an in-memory set of
+token ids plus per-user cut-off times, so checking a token stays a couple of
+dictionary lookups. The set is reloaded when the 'revocations' version bumps
+and at least every REVOCATION_CACHE_TTL seconds (default 5), so workers that
+do not share a version store still honour a revocation within that window.
+Refresh rotation does not depend on the cache: the used token id is inserted
+under a unique key, so a refresh token can be exchanged only once.
+
+Usage:
+    @api_bp.route('/admin/things')
+    @admin_required
+    def list_things(current_user_id): ...
+
+    @staff_required('front desk manager', 'receptionist')
+    def check_in(current_user_id): ...
+
+    flask --app app purge-revoked-tokens     # drop revocations of expired tokens
+"""
+
+import os
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+import click
+import jwt
+from flask import g, jsonify, request
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import User, RevokedToken
+from cache import VersionedCache, version_store
+
+# JWT Secret Key (should be in environment variables in production)
+JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-here')
+JWT_ALGORITHM = 'HS256'
+
+# Token lifetimes in seconds
+ACCESS_TOKEN_TTL = int(os.environ.get('ACCESS_TOKEN_TTL', 15 * 60))
+REFRESH_TOKEN_TTL = int(os.environ.get('REFRESH_TOKEN_TTL', 30 * 24 * 3600))
+
+# User fields that are embedded in tokens; changing one invalidates the user's tokens
+CLAIM_FIELDS = ('is_admin', 'is_staff', 'staff_role')
+
+Principal = namedtuple('Principal', 'user_id is_admin is_staff staff_role')
+
+
+def normalize_role(role):
+    """Canonical form used to compare staff roles ('Front Desk Manager' -> 'front desk manager')"""
+    return role.strip().lower() if role else None
+
+
+def principal_for(user):
+    return Principal(user.id, bool(user.is_admin), bool(user.is_staff), normalize_role(user.staff_role))
+
+
+def _load_principal(user_id):
+    row = db.session.query(User.id, *(getattr(User, field) for field in CLAIM_FIELDS)) \
+        .filter(User.id == user_id).first()
+    return principal_for(row) if row else None
+
+
+def load_principal(user_id):
+    """Current claims for ``user_id`` (None if the user is gone), cached per process"""
+    return auth_cache.get_or_load(user_id, lambda: _load_principal(user_id))
+
+
+def current_principal():
+    """Claims of the user authenticated by token_required for this request"""
+    return g.principal
+
+
+def _encode(payload, ttl):
+    now = datetime.now(timezone.utc)
+    payload.update({
+        'jti': str(uuid.uuid4()),
+        'iat': now.timestamp(),
+        'exp': now + timedelta(seconds=ttl)
+    })
+    return jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+
+
+def generate_token(user):
+    """Short-lived access token carrying the user's role claims"""
+    principal = principal_for(user)
+    return _encode({
+        'user_id': user.id,
+        'typ': 'access',
+        'adm': principal.is_admin,
+        'stf': principal.is_staff,
+        'role': principal.staff_role
+    }, ACCESS_TOKEN_TTL)
+
+
+def generate_refresh_token(user):
+    return _encode({'user_id': user.id, 'typ': 'refresh'}, REFRESH_TOKEN_TTL)
+
+
+def issue_tokens(user):
+    """Access/refresh token pair for a login or refresh response"""
+    return {
+        'token': generate_token(user),
+        'refresh_token': generate_refresh_token(user),
+        'expires_in': ACCESS_TOKEN_TTL
+    }
+
+
+def decode_token(token, token_type='access'):
+    """Claims of a valid, unrevoked token of ``token_type``; raises jwt.InvalidTokenError otherwise"""
+    data = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    # Tokens issued before refresh tokens existed have no type and are access tokens
+    if data.get('typ', 'access') != token_type:
+        raise jwt.InvalidTokenError('Wrong token type')
+    if is_revoked(data):
+        raise jwt.InvalidTokenError('Token has been revoked')
+    return data
+
+
+# Revocation ----------------------------------------------------------------
+
+def _load_revocations():
+    now = datetime.utcnow()
+    token_ids = set()
+    cutoffs = {}
+    rows = db.session.query(RevokedToken.jti, RevokedToken.user_id, RevokedToken.revoked_at) \
+        .filter(RevokedToken.expires_at > now).all()
+    for jti, user_id, revoked_at in rows:
+        if jti:
+            token_ids.add(jti)
+        else:
+            cutoff = revoked_at.replace(tzinfo=timezone.utc).timestamp()
+            cutoffs[user_id] = max(cutoff, cutoffs.get(user_id, cutoff))
+    return frozenset(token_ids), cutoffs
+
+
+def is_revoked(data):
+    """O(1) check of token claims against the in-memory revocation set"""
+    token_ids, cutoffs = revocation_cache.get_or_load('revocations', _load_revocations)
+    if data.get('jti') in token_ids:
+        return True
+    cutoff = cutoffs.get(data.get('user_id'))
+    return cutoff is not None and data.get('iat', 0) < cutoff
+
+
+def revoke_token(data, reason='logout'):
+    """Revoke one decoded token; the caller commits"""
+    if data.get('jti'):
+        db.session.add(RevokedToken(
+            jti=data['jti'],
+            user_id=data.get('user_id'),
+            reason=reason,
+            expires_at=datetime.utcfromtimestamp(data['exp'])
+        ))
+
+
+def revoke_user_tokens(user_id, reason):
+    """Revoke every token issued to ``user_id`` so far; the caller commits"""
+    db.session.add(RevokedToken(
+        user_id=user_id,
+        reason=reason,
+        revoked_at=datetime.utcnow(),
+        expires_at=datetime.utcnow() + timedelta(seconds=max(ACCESS_TOKEN_TTL, REFRESH_TOKEN_TTL))
+    ))
+
+
+def purge_revoked_tokens():
+    """Delete revocations whose tokens have expired anyway"""
+    count = RevokedToken.query.filter(RevokedToken.expires_at <= datetime.utcnow()) \
+        .delete(synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+# Decorators ----------------------------------------------------------------
+
+def token_required(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = request.headers.get('Authorization')
+        if not token:
+            return jsonify({'message': 'Token is missing'}), 401
+
+        try:
+            if token.startswith('Bearer '):
+                token = token[7:]
+            data = decode_token(token)
+            current_user_id = data['user_id']
+        except Exception:
+            return jsonify({'message': 'Token is invalid'}), 401
+
+        principal = load_principal(current_user_id)
+        if principal is None:
+            return jsonify({'message': 'Token is invalid'}), 401
+        # Tokens issued before claims were added carry none; their user is checked above
+        if 'adm' in data and (data['adm'], data['stf'], data['role']) != principal[1:]:
+            return jsonify({'message': 'Token is no longer valid, please log in again'}), 401
+
+        g.principal = principal
+        g.token_claims = data
+        return f(current_user_id, *args, **kwargs)
+    return decorated
+
+
+def admin_required(f):
+    """token_required plus an admin check"""
+    @wraps(f)
+    def decorated(current_user_id, *args, **kwargs):
+        if not g.principal.is_admin:
+            return jsonify({'message': 'Unauthorized'}), 403
+        return f(current_user_id, *args, **kwargs)
+    return token_required(decorated)
+
+
+def staff_required(*roles):
+    """token_required plus a staff check, limited to ``roles`` when given (case-insensitive)"""
+    allowed = {normalize_role(role) for role in roles}
+
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user_id, *args, **kwargs):
+            principal = g.principal
+            if not principal.is_staff or (allowed and principal.staff_role not in allowed):
+                return jsonify({'message': 'Unauthorized'}), 403
+            return f(current_user_id, *args, **kwargs)
+        return token_required(decorated)
+    return decorator
+
+
+def init_auth(app):
+    """Register token maintenance commands"""
+
+    @app.cli.command('purge-revoked-tokens')
+    def purge_revoked_tokens_command():
+        """Delete revocations of tokens that have expired"""
+        click.echo(f"Deleted {purge_revoked_tokens()} revocation(s)")
+
+
+# Initialize auth and revocation caches
+auth_cache = VersionedCache('auth', version_store, ttl=float(os.environ.get('AUTH_CACHE_TTL', 30)))
+revocation_cache = VersionedCache('revocations', version_store,
+                                  ttl=float(os.environ.get('REVOCATION_CACHE_TTL', 5)))
+_DIRTY_KEY = 'auth_dirty'
+_REVOKED_KEY = 'revocations_dirty'
+
+
+@event.listens_for(Session, 'before_flush')
+def _revoke_on_credential_change(session, flush_context, instances):
+    # A new password or a deactivated staff account ends every existing session
+    for obj in list(session.dirty):
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if state.attrs.password_hash.history.has_changes() and not getattr(obj, 'password_rehashed', False):
+                revoke_user_tokens(obj.id, 'password_changed')
+            elif state.attrs.staff_status.history.has_changes() and obj.staff_status != 'active':
+                revoke_user_tokens(obj.id, 'staff_deactivated')
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_auth_changes(session, flush_context):
+    if any(isinstance(obj, RevokedToken) for obj in session.new):
+        session.info[_REVOKED_KEY] = True
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            session.info[_DIRTY_KEY] = True
+            return
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in CLAIM_FIELDS):
+                session.info[_DIRTY_KEY] = True
+                return
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_auth_version(session):
+    if session.info.pop(_DIRTY_KEY, False):
+        auth_cache.bump()
+    if session.info.pop(_REVOKED_KEY, False):
+        revocation_cache.bump()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_auth_changes(session):
+    session.info.pop(_DIRTY_KEY, None)
+    session.info.pop(_REVOKED_KEY, None)
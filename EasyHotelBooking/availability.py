@@ -0,0 +1,228 @@
+"""
+Room Availability Engine
+Keeps an in-memory, per-room interval index of every non-cancelled booking so
+that "is room X free" and "which rooms are free" can be answered without
+hitting the database once per room. It serves the multi-room searches;
+single-room checks on booking paths use the room-night ledger
+(reservations.is_room_free), which is always current.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import Booking
+
+# Bookings with these statuses never block a room
+NON_BLOCKING_STATUSES = ('cancelled',)
+
+
+class RoomIntervals:
+    """Sorted [check_in, check_out) intervals for a single room.
+
+    Dates are stored as ordinals. ``max_ends[i]`` is the latest check-out of
+    intervals ``0..i`` so an overlap test is a single bisect, even when legacy
+    data already contains overlapping bookings.
+    """
+
+    __slots__ = ('starts', 'intervals', 'max_ends')
+
+    def __init__(self):
+        self.starts = []
+        self.intervals = []
+        self.max_ends = []
+
+    def add(self, start, end, booking_id):
+        insort(self.intervals, (start, end, booking_id))
+        self._reindex()
+
+    def remove(self, booking_id):
+        self.intervals = [iv for iv in self.intervals if iv[2] != booking_id]
+        self._reindex()
+
+    def _reindex(self):
+        self.starts = [iv[0] for iv in self.intervals]
+        self.max_ends = []
+        latest = None
+        for _, end, _ in self.intervals:
+            latest = end if latest is None or end > latest else latest
+            self.max_ends.append(latest)
+
+    def overlaps(self, start, end, exclude_booking_id=None):
+        if exclude_booking_id is not None:
+            return any(
+                s < end and e > start
+                for s, e, booking_id in self.intervals
+                if booking_id != exclude_booking_id
+            )
+        idx = bisect_left(self.starts, end)
+        return idx > 0 and self.max_ends[idx - 1] > start
+
+    def __len__(self):
+        return len(self.intervals)
+
+
+class AvailabilityIndex:
+    """Process-wide availability index shared by every booking path.
+
+    The index is loaded with one query on first use, kept in sync with
+    bookings committed by this process through session events, and fully
+    reloaded after ``max_age`` seconds to pick up writes from other workers.
+    Write paths should call :meth:`refresh_room` before their final check.
+    """
+
+    def __init__(self, max_age=None):
+        if max_age is None:
+            max_age = float(os.environ.get('AVAILABILITY_INDEX_MAX_AGE', 60))
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._rooms = {}
+        self._booking_rooms = {}
+        self._loaded_at = None
+
+    # Loading ---------------------------------------------------------------
+
+    def _blocking_bookings(self):
+        return db.session.query(
+            Booking.id, Booking.room_id, Booking.check_in_date, Booking.check_out_date
+        ).filter(Booking.status.notin_(NON_BLOCKING_STATUSES))
+
+    def reload(self):
+        """Rebuild the whole index from the database in a single query"""
+        rows = self._blocking_bookings().all()
+        rooms = {}
+        booking_rooms = {}
+        for booking_id, room_id, check_in, check_out in rows:
+            intervals = rooms.setdefault(room_id, RoomIntervals())
+            intervals.intervals.append((check_in.toordinal(), check_out.toordinal(), booking_id))
+            booking_rooms[booking_id] = room_id
+        for intervals in rooms.values():
+            intervals.intervals.sort()
+            intervals._reindex()
+        with self._lock:
+            self._rooms = rooms
+            self._booking_rooms = booking_rooms
+            self._loaded_at = time.monotonic()
+
+    def refresh_room(self, room_id):
+        """Reload the intervals of a single room straight from the database"""
+        self._ensure_loaded()
+        rows = self._blocking_bookings().filter(Booking.room_id == room_id).all()
+        intervals = RoomIntervals()
+        intervals.intervals = sorted(
+            (check_in.toordinal(), check_out.toordinal(), booking_id)
+            for booking_id, _, check_in, check_out in rows
+        )
+        intervals._reindex()
+        with self._lock:
+            for booking_id, mapped_room in list(self._booking_rooms.items()):
+                if mapped_room == room_id:
+                    del self._booking_rooms[booking_id]
+            for booking_id, _, _, _ in rows:
+                self._booking_rooms[booking_id] = room_id
+            self._rooms[room_id] = intervals
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.max_age:
+            self.reload()
+
+    # Queries ---------------------------------------------------------------
+
+    def is_room_available(self, room_id, check_in, check_out, exclude_booking_id=None):
+        """True when no blocking booking overlaps [check_in, check_out)"""
+        self._ensure_loaded()
+        room_id = int(room_id)
+        with self._lock:
+            intervals = self._rooms.get(room_id)
+            if not intervals:
+                return True
+            return not intervals.overlaps(check_in.toordinal(), check_out.toordinal(), exclude_booking_id)
+
+    def available_room_ids(self, check_in, check_out, room_ids):
+        """Return the subset of ``room_ids`` that is free for [check_in, check_out)"""
+        self._ensure_loaded()
+        start, end = check_in.toordinal(), check_out.toordinal()
+        with self._lock:
+            rooms = self._rooms
+            return [
+                room_id for room_id in room_ids
+                if room_id not in rooms or not rooms[room_id].overlaps(start, end)
+            ]
+
+    def unavailable_room_ids(self, check_in, check_out):
+        """Return the ids of every room with a blocking booking in [check_in, check_out)"""
+        self._ensure_loaded()
+        start, end = check_in.toordinal(), check_out.toordinal()
+        with self._lock:
+            return {room_id for room_id, intervals in self._rooms.items() if intervals.overlaps(start, end)}
+
+    # Synchronisation -------------------------------------------------------
+
+    def apply_changes(self, changes):
+        """Apply committed booking snapshots ``(id, room_id, in, out, blocking)``"""
+        if self._loaded_at is None:
+            return
+        with self._lock:
+            for booking_id, room_id, check_in, check_out, blocking in changes:
+                previous_room = self._booking_rooms.pop(booking_id, None)
+                if previous_room is not None and previous_room in self._rooms:
+                    self._rooms[previous_room].remove(booking_id)
+                if blocking and room_id is not None and check_in and check_out:
+                    self._rooms.setdefault(room_id, RoomIntervals()).add(
+                        check_in.toordinal(), check_out.toordinal(), booking_id
+                    )
+                    self._booking_rooms[booking_id] = room_id
+
+
+def parse_room_id(room_id):
+    try:
+        return int(room_id)
+    except (TypeError, ValueError):
+        return None
+
+
+# Session hooks: collect booking changes on flush, apply them on commit
+_PENDING_KEY = 'availability_pending'
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_booking_changes(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for obj in session.new.union(session.dirty):
+        if isinstance(obj, Booking) and obj.id is not None:
+            pending[obj.id] = (
+                obj.id,
+                parse_room_id(obj.room_id),
+                obj.check_in_date,
+                obj.check_out_date,
+                obj.status not in NON_BLOCKING_STATUSES,
+            )
+    for obj in session.deleted:
+        if isinstance(obj, Booking) and obj.id is not None:
+            pending[obj.id] = (obj.id, None, None, None, False)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_booking_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        availability_index.apply_changes(pending.values())
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_booking_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# Initialize availability index
+availability_index = AvailabilityIndex()
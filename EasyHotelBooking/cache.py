@@ -0,0 +1,208 @@
+"""
+Catalogue and Report Caches
+Versioned in-process cache for data that rarely changes (rooms, room types,
+amenities, floor plans, payment methods). Every cached entry remembers the
+version it was built for; bumping the version invalidates all entries.
+Admin reports use a plain TTL cache instead.
+
+The version counter lives in a version store. The default store is local to
+the process; set CACHE_VERSION_STORE=sqlite:////path/to/cache.db to share the
+counter through a SQLite file so every gunicorn worker invalidates together.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import Room, RoomSize, AmenityMaster, AmenityDetail, FloorPlan, Amenity, PaymentMethod
+
+
+class LocalVersionStore:
+    """Version counters kept in this process only"""
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        return self._versions.get(name, 0)
+
+    def bump(self, name):
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+            return self._versions[name]
+
+
+class SQLiteVersionStore:
+    """Version counters shared between processes through a SQLite file"""
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache_version '
+                '(name TEXT PRIMARY KEY, version INTEGER NOT NULL)'
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    def get(self, name):
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT version FROM cache_version WHERE name = ?', (name,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else 0
+
+    def bump(self, name):
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT INTO cache_version (name, version) VALUES (?, 1) '
+                'ON CONFLICT(name) DO UPDATE SET version = version + 1',
+                (name,)
+            )
+            row = conn.execute('SELECT version FROM cache_version WHERE name = ?', (name,)).fetchone()
+        finally:
+            conn.close()
+        return row[0]
+
+
+def create_version_store(url=None):
+    """Build a version store from a CACHE_VERSION_STORE style URL"""
+    if not url or url == 'local':
+        return LocalVersionStore()
+    if url.startswith('sqlite:///'):
+        return SQLiteVersionStore(url[len('sqlite:///'):])
+    raise ValueError(f'Unsupported cache version store: {url}')
+
+
+class VersionedCache:
+    """Cache whose entries are dropped whenever the namespace version changes.
+
+    The shared version is read at most once every ``check_interval`` seconds,
+    so other workers see a bump within that interval. With ``ttl`` entries
+    also expire after that many seconds, for data that can change behind the
+    ORM's back.
+    """
+
+    def __init__(self, namespace, store, check_interval=1.0, ttl=None):
+        self.namespace = namespace
+        self.store = store
+        self.check_interval = check_interval
+        self.ttl = ttl
+        self._entries = {}
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        now = time.monotonic()
+        if self._version is None or now - self._checked_at > self.check_interval:
+            self._version = self.store.get(self.namespace)
+            self._checked_at = now
+        return self._version
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for ``key``, building it with ``loader`` when stale"""
+        version = self.version
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version and (entry[1] is None or entry[1] > now):
+            return entry[2]
+        value = loader()
+        with self._lock:
+            self._entries[key] = (version, None if self.ttl is None else now + self.ttl, value)
+        return value
+
+    def bump(self):
+        """Invalidate every entry in this process and in every process sharing the store"""
+        version = self.store.bump(self.namespace)
+        with self._lock:
+            self._entries.clear()
+            self._version = version
+            self._checked_at = time.monotonic()
+        return version
+
+
+class TTLCache:
+    """In-process cache whose entries expire ``ttl`` seconds after being built"""
+
+    def __init__(self, ttl=60.0):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Return the cached value for ``key``, building it with ``loader`` once expired"""
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        value = loader()
+        with self._lock:
+            self._entries[key] = (now + (self.ttl if ttl is None else ttl), value)
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one entry, or every entry when ``key`` is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+# Initialize shared version store and catalogue cache
+version_store = create_version_store(os.environ.get('CACHE_VERSION_STORE'))
+catalogue_cache = VersionedCache('catalogue', version_store)
+
+# Short-lived cache for admin reports and analytics
+report_cache = TTLCache(ttl=float(os.environ.get('REPORT_CACHE_TTL', 60)))
+
+
+def catalogue_response(key, loader):
+    """Serve a catalogue payload from the versioned cache with a content ETag.
+
+    The payload is encoded once per catalogue version; If-None-Match is answered with 304.
+    """
+    def encode():
+        body = jsonify(loader()).get_data()
+        return body, hashlib.sha1(body).hexdigest()
+
+    body, etag = catalogue_cache.get_or_load(key, encode)
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+# Any committed change to these models invalidates the catalogue
+CATALOGUE_MODELS = (Room, RoomSize, AmenityMaster, AmenityDetail, FloorPlan, Amenity, PaymentMethod)
+_DIRTY_KEY = 'catalogue_dirty'
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_catalogue_changes(session, flush_context):
+    for objects in (session.new, session.dirty, session.deleted):
+        if any(isinstance(obj, CATALOGUE_MODELS) for obj in objects):
+            session.info[_DIRTY_KEY] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_catalogue_version(session):
+    if session.info.pop(_DIRTY_KEY, False):
+        catalogue_cache.bump()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_catalogue_changes(session):
+    session.info.pop(_DIRTY_KEY, None)
@@ -0,0 +1,107 @@
+"""
+Fake PayMongo Server
+A small in-memory stand-in for the PayMongo endpoints the payment service
+uses, so the payment flow can be exercised without network access or real
+keys. Repeated POSTs with the same Idempotency-Key return the original
+response, like the real gateway.
+
+Usage:
+    python fake_paymongo.py --port 8765
+    PAYMONGO_BASE_URL=http://127.0.0.1:8765/v1 python app.py
+
+Test helpers:
+    POST /v1/_fake/payment_intents/<id>/status   {"status": "succeeded"}
+    FAKE_PAYMONGO_FAILURE_RATE   fraction of requests answered with a 503
+    FAKE_PAYMONGO_LATENCY        seconds added to every request
+"""
+
+import argparse
+import os
+import random
+import time
+import uuid
+
+from flask import Flask, jsonify, request
+
+
+def create_fake_paymongo(failure_rate=None, latency=None):
+    """Build the fake gateway app with fresh in-memory state"""
+    app = Flask(__name__)
+    failure_rate = float(failure_rate if failure_rate is not None else os.environ.get('FAKE_PAYMONGO_FAILURE_RATE', 0))
+    latency = float(latency if latency is not None else os.environ.get('FAKE_PAYMONGO_LATENCY', 0))
+    state = {'intents': {}, 'sources': {}, 'refunds': {}, 'idempotency': {}}
+    app.config['FAKE_PAYMONGO_STATE'] = state
+
+    def resource(prefix, kind, attributes):
+        return {'id': f'{prefix}_{uuid.uuid4().hex[:24]}', 'type': kind, 'attributes': attributes}
+
+    @app.before_request
+    def simulate_network():
+        if latency:
+            time.sleep(latency)
+        if failure_rate and random.random() < failure_rate and not request.path.startswith('/v1/_fake'):
+            return jsonify({'errors': [{'code': 'service_unavailable', 'detail': 'Simulated outage'}]}), 503
+        key = request.headers.get('Idempotency-Key')
+        if request.method == 'POST' and key in state['idempotency']:
+            body, status = state['idempotency'][key]
+            return jsonify(body), status
+
+    @app.after_request
+    def remember_response(response):
+        key = request.headers.get('Idempotency-Key')
+        if request.method == 'POST' and key and response.status_code < 500:
+            state['idempotency'].setdefault(key, (response.get_json(), response.status_code))
+        return response
+
+    @app.route('/v1/payment_intents', methods=['POST'])
+    def create_payment_intent():
+        attributes = dict(request.get_json()['data']['attributes'])
+        attributes.update({'status': 'awaiting_payment_method', 'client_key': uuid.uuid4().hex})
+        intent = resource('pi', 'payment_intent', attributes)
+        state['intents'][intent['id']] = intent
+        return jsonify({'data': intent})
+
+    @app.route('/v1/payment_intents/<intent_id>', methods=['GET'])
+    def get_payment_intent(intent_id):
+        intent = state['intents'].get(intent_id)
+        if intent is None:
+            return jsonify({'errors': [{'code': 'resource_not_found'}]}), 404
+        return jsonify({'data': intent})
+
+    @app.route('/v1/sources', methods=['POST'])
+    def create_source():
+        attributes = dict(request.get_json()['data']['attributes'])
+        source = resource('src', 'source', attributes)
+        attributes.update({
+            'status': 'pending',
+            'redirect': dict(attributes.get('redirect', {}),
+                             checkout_url=f'{request.host_url}checkout/{source["id"]}')
+        })
+        state['sources'][source['id']] = source
+        return jsonify({'data': source})
+
+    @app.route('/v1/refunds', methods=['POST'])
+    def create_refund():
+        attributes = dict(request.get_json()['data']['attributes'])
+        attributes['status'] = 'succeeded'
+        refund = resource('ref', 'refund', attributes)
+        state['refunds'][refund['id']] = refund
+        return jsonify({'data': refund})
+
+    @app.route('/v1/_fake/payment_intents/<intent_id>/status', methods=['POST'])
+    def set_payment_intent_status(intent_id):
+        intent = state['intents'].get(intent_id)
+        if intent is None:
+            return jsonify({'errors': [{'code': 'resource_not_found'}]}), 404
+        intent['attributes']['status'] = request.get_json().get('status', 'succeeded')
+        return jsonify({'data': intent})
+
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a fake PayMongo API for local testing')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    create_fake_paymongo().run(host=args.host, port=args.port, threaded=True)
@@ -1,7 +1,25 @@
+from datetime import date
+
 from extensions import db
-from models import User, Room, Amenity, RoomSize, FloorPlan
+from models import User, Room, Amenity, RoomSize, FloorPlan, PayRate
+
+def create_default_pay_rates():
+    # Seed role rates once; they are edited through the admin API afterwards
+    if PayRate.query.count() > 0:
+        return
+    
+    for role, hourly_rate in (('Front Desk', 100.0), ('Bell Boy', 90.0), ('Housekeeping', 89.375)):
+        db.session.add(PayRate(
+            staff_role=role,
+            hourly_rate=hourly_rate,
+            overtime_rate=hourly_rate * 1.25,
+            effective_from=date(2000, 1, 1)
+        ))
+    db.session.commit()
 
 def create_initial_data():
+    create_default_pay_rates()
+    
     # Check if we already have data
     if User.query.count() > 0:
         return
@@ -0,0 +1,339 @@
+"""
+Background Job Queue
+Database-backed queue for work that should not run inside a request (SMTP,
+payment gateway calls). Routes enqueue a job and return immediately; worker
+processes claim due jobs, run them, and retry failures with exponential
+backoff and jitter. Jobs that exhaust their attempts are copied to the
+dead-letter table.
+
+Usage:
+    @task('email.verification')
+    def send_verification_email(user_id): ...
+
+    send_verification_email.delay(user.id)
+    db.session.commit()                        # the job is saved with the caller's work
+
+    flask --app app run-worker --threads 4     # start a worker process
+    flask --app app jobs-replay-dead           # requeue dead-lettered jobs
+
+Deployment: run worker processes next to the web processes (the Procfile's
+``worker`` entry) and set JOB_WORKER=external on the web processes. Without
+that, each web process starts one worker thread when it serves its first
+request, so jobs are always delivered; set JOB_WORKER_THREADS to choose how
+many threads that is, or JOBS_EAGER=1 to run every task inline (local
+development).
+"""
+
+import json
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+
+import click
+
+from extensions import db
+from models import Job, DeadLetterJob
+
+DEFAULT_MAX_ATTEMPTS = 5
+
+# Retry delay: BACKOFF_BASE * 2^(attempt - 1) seconds, capped, with jitter
+BACKOFF_BASE = float(os.environ.get('JOB_BACKOFF_BASE', 5))
+BACKOFF_MAX = float(os.environ.get('JOB_BACKOFF_MAX', 3600))
+
+# Running jobs whose worker died are requeued after this many seconds
+LOCK_TIMEOUT = float(os.environ.get('JOB_LOCK_TIMEOUT', 600))
+
+# Registered tasks by name
+TASKS = {}
+
+
+class Task:
+    """A function that can be called directly or queued with ``delay``"""
+
+    def __init__(self, func, name, max_attempts):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Queue this task with JSON-serializable arguments"""
+        return enqueue(self.name, *args, **kwargs)
+
+
+def task(name, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Register a function as a background task"""
+    def decorator(func):
+        TASKS[name] = Task(func, name, max_attempts)
+        return TASKS[name]
+    return decorator
+
+
+def eager():
+    return os.environ.get('JOBS_EAGER') == '1'
+
+
+def enqueue(task_name, *args, **kwargs):
+    """Add a job for ``task_name`` to the caller's session and flush. Returns the job id.
+
+    Nothing is committed here: the job is saved by the caller's commit, together
+    with the work that queued it, and disappears if that work is rolled back.
+    """
+    registered = TASKS[task_name]
+    if eager():
+        try:
+            registered.func(*args, **kwargs)
+        except Exception as e:
+            print(f"Task {task_name} failed: {str(e)}")
+        return None
+
+    job = Job(
+        task=task_name,
+        payload=json.dumps({'args': list(args), 'kwargs': kwargs}),
+        max_attempts=registered.max_attempts,
+        run_at=datetime.utcnow()
+    )
+    db.session.add(job)
+    db.session.flush()
+    return job.id
+
+
+def enqueue_once(task_name, *args, **kwargs):
+    """Like :func:`enqueue`, but skip when an identical job is already waiting or running"""
+    payload = json.dumps({'args': list(args), 'kwargs': kwargs})
+    pending = Job.query.filter(
+        Job.task == task_name,
+        Job.payload == payload,
+        Job.status.in_(('queued', 'running'))
+    ).first()
+    if pending is not None:
+        return pending.id
+    return enqueue(task_name, *args, **kwargs)
+
+
+def backoff_delay(attempts):
+    """Seconds to wait before retry number ``attempts``, with jitter against retry storms"""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** max(attempts - 1, 0))
+    return random.uniform(delay / 2, delay)
+
+
+# Worker side ---------------------------------------------------------------
+
+def requeue_stale():
+    """Give jobs locked by a crashed worker back to the queue"""
+    cutoff = datetime.utcnow() - timedelta(seconds=LOCK_TIMEOUT)
+    count = Job.query.filter(Job.status == 'running', Job.locked_at < cutoff).update(
+        {'status': 'queued', 'locked_by': None, 'locked_at': None}, synchronize_session=False
+    )
+    db.session.commit()
+    return count
+
+
+def claim_jobs(worker_id, limit=10):
+    """Atomically lock up to ``limit`` due jobs for this worker"""
+    now = datetime.utcnow()
+    due = db.session.query(Job.id).filter(
+        Job.status == 'queued',
+        Job.run_at <= now
+    ).order_by(Job.run_at, Job.id).limit(limit)
+    if db.engine.dialect.name == 'postgresql':
+        due = due.with_for_update(skip_locked=True)
+    job_ids = [job_id for (job_id,) in due.all()]
+    if not job_ids:
+        db.session.commit()
+        return []
+
+    # The status check makes the claim safe when two workers race for a job
+    claim = f'{worker_id}:{uuid.uuid4().hex[:8]}'
+    Job.query.filter(Job.id.in_(job_ids), Job.status == 'queued').update(
+        {'status': 'running', 'locked_by': claim, 'locked_at': now, 'attempts': Job.attempts + 1},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return Job.query.filter_by(locked_by=claim, status='running').order_by(Job.run_at, Job.id).all()
+
+
+def _fail(job, error):
+    job.last_error = error
+    job.locked_by = None
+    job.locked_at = None
+    if job.attempts >= job.max_attempts or job.task not in TASKS:
+        job.status = 'dead'
+        job.finished_at = datetime.utcnow()
+        db.session.add(DeadLetterJob(
+            job_id=job.id,
+            task=job.task,
+            payload=job.payload,
+            attempts=job.attempts,
+            last_error=error
+        ))
+        print(f"Job {job.id} ({job.task}) moved to dead letters after {job.attempts} attempt(s)")
+    else:
+        job.status = 'queued'
+        job.run_at = datetime.utcnow() + timedelta(seconds=backoff_delay(job.attempts))
+
+
+def run_job(job):
+    """Run one claimed job and record the outcome"""
+    job_id = job.id
+    registered = TASKS.get(job.task)
+    if registered is None:
+        _fail(job, f'Unknown task: {job.task}')
+        db.session.commit()
+        return False
+
+    payload = json.loads(job.payload)
+    try:
+        registered.func(*payload.get('args', []), **payload.get('kwargs', {}))
+    except Exception:
+        error = traceback.format_exc(limit=5)
+        db.session.rollback()
+        _fail(Job.query.get(job_id), error)
+        db.session.commit()
+        return False
+
+    job = Job.query.get(job_id)
+    job.status = 'done'
+    job.finished_at = datetime.utcnow()
+    job.last_error = None
+    job.locked_by = None
+    db.session.commit()
+    return True
+
+
+def work(worker_id=None, batch_size=10, poll_interval=1.0, burst=False, stop_event=None):
+    """Process jobs until stopped; with ``burst`` return once the queue is empty"""
+    worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+    stop_event = stop_event or threading.Event()
+    processed = 0
+    last_stale_check = 0.0
+    while not stop_event.is_set():
+        if time.monotonic() - last_stale_check > LOCK_TIMEOUT / 2:
+            requeue_stale()
+            last_stale_check = time.monotonic()
+        jobs = claim_jobs(worker_id, batch_size)
+        for job in jobs:
+            run_job(job)
+            processed += 1
+        if not jobs:
+            if burst:
+                break
+            stop_event.wait(poll_interval)
+    return processed
+
+
+def replay_dead(ids=None):
+    """Requeue dead-lettered jobs (all of them, or only ``ids``) with fresh attempts"""
+    query = DeadLetterJob.query
+    if ids:
+        query = query.filter(DeadLetterJob.id.in_(ids))
+    dead = query.all()
+    for entry in dead:
+        db.session.add(Job(
+            task=entry.task,
+            payload=entry.payload,
+            max_attempts=TASKS[entry.task].max_attempts if entry.task in TASKS else DEFAULT_MAX_ATTEMPTS,
+            run_at=datetime.utcnow()
+        ))
+        db.session.delete(entry)
+    db.session.commit()
+    return len(dead)
+
+
+def purge_finished(days=7):
+    """Delete finished jobs older than ``days``"""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    count = Job.query.filter(Job.status.in_(('done', 'dead')), Job.finished_at < cutoff) \
+        .delete(synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+def start_worker_threads(app, count, poll_interval=1.0):
+    """Run ``count`` workers on daemon threads inside this process"""
+    stop_event = threading.Event()
+
+    def run():
+        with app.app_context():
+            while not stop_event.is_set():
+                try:
+                    work(poll_interval=poll_interval, stop_event=stop_event)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Job worker error: {str(e)}")
+                    stop_event.wait(poll_interval)
+            db.session.remove()
+
+    for _ in range(count):
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+    return stop_event
+
+
+def init_jobs(app):
+    """Register worker CLI commands and start in-process workers when configured"""
+
+    @app.cli.command('run-worker')
+    @click.option('--threads', default=1, help='Worker threads in this process')
+    @click.option('--batch-size', default=10, help='Jobs claimed per poll')
+    @click.option('--poll-interval', default=1.0, help='Seconds to wait when the queue is empty')
+    @click.option('--burst', is_flag=True, help='Exit once the queue is empty')
+    def run_worker(threads, batch_size, poll_interval, burst):
+        """Process queued background jobs"""
+        if threads == 1 or burst:
+            processed = work(batch_size=batch_size, poll_interval=poll_interval, burst=burst)
+            click.echo(f"Processed {processed} job(s)")
+            return
+        stop_event = start_worker_threads(app, threads, poll_interval)
+        click.echo(f"Started {threads} worker thread(s); press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            stop_event.set()
+
+    @app.cli.command('jobs-replay-dead')
+    @click.option('--id', 'ids', multiple=True, type=int, help='Dead-letter id to replay (repeatable)')
+    def jobs_replay_dead(ids):
+        """Requeue dead-lettered jobs"""
+        click.echo(f"Requeued {replay_dead(list(ids))} job(s)")
+
+    @app.cli.command('jobs-purge')
+    @click.option('--days', default=7, help='Keep finished jobs for this many days')
+    def jobs_purge(days):
+        """Delete old finished jobs"""
+        click.echo(f"Deleted {purge_finished(days)} job(s)")
+
+    threads = os.environ.get('JOB_WORKER_THREADS')
+    if threads:
+        start_worker_threads(app, int(threads))
+    elif os.environ.get('JOB_WORKER') != 'external' and not eager():
+        start_fallback_worker(app)
+
+
+def start_fallback_worker(app):
+    """Start one in-process worker thread on the first request this process serves.
+
+    Used when no worker is configured. Waiting for a request keeps CLI commands
+    such as ``db upgrade`` or ``run-worker`` from starting one.
+    """
+    lock = threading.Lock()
+    started = []
+
+    @app.before_request
+    def start_job_worker():
+        if started:
+            return
+        with lock:
+            if not started:
+                started.append(start_worker_threads(app, 1))
+                print("No job worker configured; running one in this process "
+                      "(set JOB_WORKER=external when run-worker processes are deployed)")
@@ -0,0 +1,257 @@
+"""
+Mail Dispatcher
+Sends outbound email over a small pool of persistent, authenticated SMTP
+connections instead of a new TLS handshake and login per message. Bulk sends
+are batched over one connection, dropped connections are reopened and the
+message retried once, and throughput counters are kept for monitoring.
+
+Configuration (environment):
+    MAIL_BACKEND       smtp (default), file or console
+    MAIL_SERVER, MAIL_PORT, MAIL_USE_TLS, MAIL_USERNAME, MAIL_PASSWORD, MAIL_FROM
+                       MAIL_USERNAME and MAIL_PASSWORD are required by the smtp
+                       backend unless MAIL_SERVER names a relay without login
+    MAIL_POOL_SIZE     connections kept open (default 2)
+    MAIL_IDLE_TIMEOUT  seconds before an idle connection is reopened (default 60)
+    MAIL_BATCH_SIZE    messages sent per connection before it is recycled (default 50)
+    MAIL_FILE_DIR      where the file backend writes .eml files
+
+For local testing use MAIL_BACKEND=file, or point MAIL_SERVER/MAIL_PORT at a
+debugging SMTP server (e.g. ``python -m aiosmtpd -n``) with MAIL_USE_TLS=0.
+"""
+
+import os
+import queue
+import smtplib
+import threading
+import time
+import uuid
+from email.mime.text import MIMEText
+from email.utils import formatdate, make_msgid
+
+
+class MailConfigError(RuntimeError):
+    """The configured backend is missing required settings"""
+
+
+class SMTPConnection:
+    """One authenticated SMTP session with its usage bookkeeping"""
+
+    def __init__(self, server):
+        self.server = server
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class MailDispatcher:
+    """Pooled SMTP sender with batching, reconnects and metrics"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or os.environ.get('MAIL_BACKEND', 'smtp')
+        self.host = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+        self.port = int(os.environ.get('MAIL_PORT', 587))
+        self.use_tls = os.environ.get('MAIL_USE_TLS', '1') not in ('0', 'false', 'False')
+        self.username = os.environ.get('MAIL_USERNAME')
+        self.password = os.environ.get('MAIL_PASSWORD')
+        self.sender = os.environ.get('MAIL_FROM', 'no-reply@easyhotel.com')
+        self.pool_size = int(os.environ.get('MAIL_POOL_SIZE', 2))
+        self.idle_timeout = float(os.environ.get('MAIL_IDLE_TIMEOUT', 60))
+        self.batch_size = int(os.environ.get('MAIL_BATCH_SIZE', 50))
+        self.file_dir = os.environ.get('MAIL_FILE_DIR', os.path.join('instance', 'mail'))
+
+        self._pool = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._lock = threading.Lock()
+        self._metrics = {
+            'sent': 0,
+            'failed': 0,
+            'connections_opened': 0,
+            'reconnects': 0,
+            'send_seconds': 0.0
+        }
+        self._started = time.time()
+
+        missing = self.missing_settings()
+        if missing:
+            print(f"⚠️ Email is not configured: set {' and '.join(missing)} "
+                  f"(or MAIL_BACKEND=file for local testing); sending will fail until then")
+
+    def missing_settings(self):
+        """Environment variables the configured backend needs but lacks"""
+        if self.backend != 'smtp':
+            return []
+        if self.username:
+            return [] if self.password else ['MAIL_PASSWORD']
+        # Only a relay named explicitly may be used without login
+        if os.environ.get('MAIL_SERVER'):
+            return []
+        return ['MAIL_USERNAME', 'MAIL_PASSWORD']
+
+    # Messages --------------------------------------------------------------
+
+    def build_message(self, to_email, subject, body):
+        msg = MIMEText(body)
+        msg['Subject'] = subject
+        msg['From'] = self.sender
+        msg['To'] = to_email
+        msg['Date'] = formatdate(localtime=True)
+        msg['Message-ID'] = make_msgid(domain=self.sender.split('@')[-1])
+        return msg
+
+    # Connections -----------------------------------------------------------
+
+    def _open(self):
+        missing = self.missing_settings()
+        if missing:
+            raise MailConfigError(f"Email is not configured: set {' and '.join(missing)}")
+        server = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.use_tls:
+            server.starttls()
+        if self.username:
+            server.login(self.username, self.password)
+        self._count('connections_opened')
+        return SMTPConnection(server)
+
+    def _close(self, connection):
+        try:
+            connection.server.quit()
+        except Exception:
+            pass
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    connection = self._pool.get_nowait()
+                except queue.Empty:
+                    return self._open()
+                if time.monotonic() - connection.last_used < self.idle_timeout:
+                    return connection
+                self._close(connection)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, connection):
+        if connection is not None and connection.server is not None:
+            if connection.sent >= self.batch_size:
+                # Recycle long-lived sessions; many providers cap messages per connection
+                self._close(connection)
+            else:
+                connection.last_used = time.monotonic()
+                self._pool.put(connection)
+        self._slots.release()
+
+    def close(self):
+        """Close every pooled connection"""
+        while True:
+            try:
+                self._close(self._pool.get_nowait())
+            except queue.Empty:
+                return
+
+    # Sending ---------------------------------------------------------------
+
+    def _deliver(self, connection, msg):
+        """Send on ``connection``, reopening it once if the server dropped it"""
+        if connection.server is None:
+            # An earlier reconnect in this batch failed
+            self._reconnect(connection)
+        try:
+            connection.server.sendmail(self.sender, [msg['To']], msg.as_string())
+        except smtplib.SMTPServerDisconnected:
+            self._reconnect(connection)
+            connection.server.sendmail(self.sender, [msg['To']], msg.as_string())
+        except smtplib.SMTPException:
+            # Rejections (bad recipient, message refused) are not connection problems
+            raise
+        except OSError:
+            self._reconnect(connection)
+            connection.server.sendmail(self.sender, [msg['To']], msg.as_string())
+        connection.sent += 1
+
+    def _reconnect(self, connection):
+        if connection.server is not None:
+            self._close(connection)
+        self._count('reconnects')
+        try:
+            connection.server = self._open().server
+        except Exception:
+            # Never hand a dead session back to the pool
+            connection.server = None
+            raise
+        connection.sent = 0
+
+    def _write_file(self, msg):
+        os.makedirs(self.file_dir, exist_ok=True)
+        path = os.path.join(self.file_dir, f'{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}.eml')
+        with open(path, 'w') as handle:
+            handle.write(msg.as_string())
+
+    def send(self, to_email, subject, body):
+        """Send one message, raising on failure"""
+        self.send_many([(to_email, subject, body)], raise_errors=True)
+
+    def send_many(self, messages, raise_errors=False):
+        """Send ``(to, subject, body)`` tuples over pooled connections.
+
+        Returns the list of ``(message, error)`` pairs that could not be sent.
+        """
+        failures = []
+        started = time.monotonic()
+        messages = list(messages)
+        for offset in range(0, len(messages), self.batch_size):
+            batch = messages[offset:offset + self.batch_size]
+            connection = None
+            if self.backend == 'smtp':
+                try:
+                    connection = self._acquire()
+                except Exception as e:
+                    self._count('failed', len(batch))
+                    if raise_errors:
+                        raise
+                    failures.extend((message, str(e)) for message in batch)
+                    continue
+            try:
+                for message in batch:
+                    msg = self.build_message(*message)
+                    try:
+                        if self.backend == 'smtp':
+                            self._deliver(connection, msg)
+                        elif self.backend == 'file':
+                            self._write_file(msg)
+                        else:
+                            print(msg.as_string())
+                        self._count('sent')
+                    except Exception as e:
+                        self._count('failed')
+                        if raise_errors:
+                            raise
+                        failures.append((message, str(e)))
+            finally:
+                if self.backend == 'smtp':
+                    self._release(connection)
+        self._count('send_seconds', time.monotonic() - started)
+        return failures
+
+    # Metrics ---------------------------------------------------------------
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._metrics[key] += amount
+
+    def metrics(self):
+        """Counters since start plus derived throughput"""
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics['backend'] = self.backend
+        metrics['pooled_connections'] = self._pool.qsize()
+        metrics['uptime_seconds'] = round(time.time() - self._started, 1)
+        metrics['messages_per_second'] = round(metrics['sent'] / metrics['send_seconds'], 2) \
+            if metrics['send_seconds'] > 0 else 0.0
+        metrics['send_seconds'] = round(metrics['send_seconds'], 3)
+        return metrics
+
+
+# Initialize mail dispatcher
+mailer = MailDispatcher()
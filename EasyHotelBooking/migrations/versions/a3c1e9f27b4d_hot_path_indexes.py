@@ -0,0 +1,81 @@
+"""Hot-path indexes and room-night ledger rate
+
+Revision ID: a3c1e9f27b4d
+Revises: 
+Create Date: 2026-10-18 09:12:44.518203
+
+New tables are created by db.create_all() at startup; this revision adds what
+create_all cannot: the room_night.rate column and the indexes on tables that
+already exist. Each step checks the live schema first, so it is safe on
+databases that already have some of them. On PostgreSQL the indexes are
+built CONCURRENTLY so bookings keep flowing while they build.
+
+After upgrading an existing database run ``flask --app app rebuild-room-nights``
+to fill in the nightly rates.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c1e9f27b4d'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (index, table, columns, partial WHERE per dialect)
+INDEXES = [
+    ('ix_booking_room_id_status_dates', 'booking', ['room_id', 'status', 'check_in_date', 'check_out_date'], None),
+    ('ix_booking_user_id_created_at', 'booking', ['user_id', 'created_at'], None),
+    ('ix_booking_status_created_at', 'booking', ['status', 'created_at'], None),
+    ('ix_attendance_user_id_date', 'attendance', ['user_id', 'date'], None),
+    ('ix_attendance_date', 'attendance', ['date'], None),
+    ('ix_notification_user_id_created_at', 'notification', ['user_id', 'created_at'], None),
+    ('ix_notification_unread_user_id', 'notification', ['user_id'],
+     {'sqlite': 'is_read = 0', 'postgresql': 'is_read = false'}),
+    ('ix_rfid_access_log_access_time', 'rfid_access_log', ['access_time'], None),
+    ('ix_payment_status_created_at', 'payment', ['payment_status', 'created_at'], None),
+    ('ix_payment_status_id', 'payment', ['payment_status', 'id'], None),
+    ('ix_payment_gateway_transaction_id', 'payment', ['gateway_transaction_id'], None),
+    ('ix_room_night_night', 'room_night', ['night'], None),
+]
+
+
+def _existing_indexes(inspector):
+    return {table: {index['name'] for index in inspector.get_indexes(table)}
+            for table in {table for _, table, _, _ in INDEXES}}
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    dialect = bind.dialect.name
+
+    if 'rate' not in {column['name'] for column in inspector.get_columns('room_night')}:
+        op.add_column('room_night', sa.Column('rate', sa.Float(), nullable=False, server_default='0'))
+
+    existing = _existing_indexes(inspector)
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            if name in existing[table]:
+                continue
+            options = {}
+            if where and dialect in where:
+                options[f'{dialect}_where'] = sa.text(where[dialect])
+            if dialect == 'postgresql':
+                options['postgresql_concurrently'] = True
+            op.create_index(name, table, columns, **options)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    existing = _existing_indexes(inspector)
+    for name, table, _, _ in reversed(INDEXES):
+        if name in existing[table]:
+            op.drop_index(name, table_name=table)
+
+    if 'rate' in {column['name'] for column in inspector.get_columns('room_night')}:
+        with op.batch_alter_table('room_night') as batch_op:
+            batch_op.drop_column('rate')
@@ -0,0 +1,47 @@
+"""Keyset indexes for booking and payment listings
+
+Revision ID: b7d2f4e8c915
+Revises: a3c1e9f27b4d
+Create Date: 2026-10-18 11:40:07.291655
+
+Booking and payment listings page newest first on (created_at, id); these
+indexes let each page be a single index range read instead of a sort of the
+whole table. Built CONCURRENTLY on PostgreSQL and skipped when present.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2f4e8c915'
+down_revision = 'a3c1e9f27b4d'
+branch_labels = None
+depends_on = None
+
+# (index, table, columns)
+INDEXES = [
+    ('ix_booking_created_at_id', 'booking', ['created_at', 'id']),
+    ('ix_payment_created_at_id', 'payment', ['created_at', 'id']),
+]
+
+
+def _existing_indexes(inspector):
+    return {table: {index['name'] for index in inspector.get_indexes(table)}
+            for table in {table for _, table, _ in INDEXES}}
+
+
+def upgrade():
+    bind = op.get_bind()
+    existing = _existing_indexes(sa.inspect(bind))
+    options = {'postgresql_concurrently': True} if bind.dialect.name == 'postgresql' else {}
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            if name not in existing[table]:
+                op.create_index(name, table, columns, **options)
+
+
+def downgrade():
+    existing = _existing_indexes(sa.inspect(op.get_bind()))
+    for name, table, _ in reversed(INDEXES):
+        if name in existing[table]:
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,35 @@
+"""Purge queued and dead-lettered emails that carried secrets
+
+Revision ID: c4e8a1d2f6b3
+Revises: b7d2f4e8c915
+Create Date: 2026-10-18 15:12:44.508213
+
+Verification, staff account, walk-in account and password reset jobs used to
+carry a plaintext password or code in their payload, and failed ones were
+kept in dead_letter_job. These tasks now take a user id or a nonce, so the old
+rows can neither run nor be replayed; delete them. Not reversible.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a1d2f6b3'
+down_revision = 'b7d2f4e8c915'
+branch_labels = None
+depends_on = None
+
+TASKS = ('email.verification', 'email.staff_verification', 'email.staff_account', 'email.walkin_account',
+         'email.password_reset')
+
+
+def upgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    for table in ('job', 'dead_letter_job'):
+        if table in tables:
+            job = sa.table(table, sa.column('task'))
+            op.execute(job.delete().where(job.c.task.in_(TASKS)))
+
+
+def downgrade():
+    pass
@@ -0,0 +1,42 @@
+"""One DailyReport row per day
+
+Revision ID: d5f2b9c3a7e1
+Revises: c4e8a1d2f6b3
+Create Date: 2026-10-18 19:05:12.730418
+
+Two rollup runs at the same time could each insert a row for the same day,
+and revenue charts then counted that day twice. Keep the newest row of each
+day and make report_date unique.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f2b9c3a7e1'
+down_revision = 'c4e8a1d2f6b3'
+branch_labels = None
+depends_on = None
+
+INDEX = 'uq_daily_report_report_date'
+
+
+def _has_index(inspector):
+    return INDEX in {index['name'] for index in inspector.get_indexes('daily_report')}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'daily_report' not in inspector.get_table_names() or _has_index(inspector):
+        return
+    op.execute(
+        'DELETE FROM daily_report WHERE id NOT IN '
+        '(SELECT keep_id FROM (SELECT MAX(id) AS keep_id FROM daily_report GROUP BY report_date) AS newest)'
+    )
+    op.create_index(INDEX, 'daily_report', ['report_date'], unique=True)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'daily_report' in inspector.get_table_names() and _has_index(inspector):
+        op.drop_index(INDEX, table_name='daily_report')
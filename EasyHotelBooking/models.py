@@ -1,8 +1,21 @@
+import os
 from datetime import datetime
+from functools import lru_cache
 from extensions import db
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
+# Werkzeug hash method, e.g. 'pbkdf2:sha256:600000' or 'scrypt:32768:8:1'.
+# Changing it rehashes each password the next time its user logs in.
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2')
+
+
+@lru_cache(maxsize=None)
+def password_hash_prefix():
+    """The method/parameter part ('pbkdf2:sha256:600000') of hashes made with the current settings"""
+    return generate_password_hash('', method=PASSWORD_HASH_METHOD).split('$', 1)[0]
+
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False)
@@ -24,14 +37,33 @@ class User(UserMixin, db.Model):
     notifications = db.relationship('Notification', backref='user', lazy='dynamic')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+        self.password_rehashed = False
         
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Verify ``password``; a hash made with outdated parameters is upgraded in place (caller commits)"""
+        if not check_password_hash(self.password_hash, password):
+            return False
+        if self.password_hash.split('$', 1)[0] != password_hash_prefix():
+            self.set_password(password)
+            # Same password, so existing sessions stay valid
+            self.password_rehashed = True
+        return True
         
     def __repr__(self):
         return f'<User {self.username}>'
 
+class RevokedToken(db.Model):
+    """Revoked API token (by jti), or a cut-off revoking every token a user was issued before it"""
+    __tablename__ = 'revoked_token'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True)  # Empty for user-wide revocations
+    user_id = db.Column(db.Integer, index=True)  # No foreign key: rows outlive deleted users
+    reason = db.Column(db.String(50))
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # Row is useless after the token expires
+
 # ============================================
 # NEW HOTEL MANAGEMENT MODELS
 # ============================================
@@ -207,10 +239,30 @@ class Booking(db.Model):
     
     # Relationships
     booking_amenities = db.relationship('BookingAmenity', backref='booking', lazy='dynamic')
+    room_nights = db.relationship('RoomNight', backref='booking', cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        db.Index('ix_booking_room_id_status_dates', 'room_id', 'status', 'check_in_date', 'check_out_date'),
+        db.Index('ix_booking_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_booking_status_created_at', 'status', 'created_at'),
+        db.Index('ix_booking_created_at_id', 'created_at', 'id'),  # Keyset order of booking listings
+    )
     
     def __repr__(self):
         return f'<Booking {self.id}>'
 
+class RoomNight(db.Model):
+    """Ledger entry: one night of one room held by a booking; the unique key makes double-booking impossible"""
+    __tablename__ = 'room_night'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    room_id = db.Column(db.Integer, db.ForeignKey('room.id'), nullable=False)
+    night = db.Column(db.Date, nullable=False, index=True)  # Date the stay starts that night
+    booking_id = db.Column(db.Integer, db.ForeignKey('booking.id', ondelete='CASCADE'), nullable=False, index=True)
+    rate = db.Column(db.Float, nullable=False, default=0.0)  # Share of the booking's total_price earned this night
+    
+    __table_args__ = (db.UniqueConstraint('room_id', 'night', name='uq_room_night_room_id_night'),)
+
 class BookingAmenity(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     booking_id = db.Column(db.Integer, db.ForeignKey('booking.id'), nullable=False)
@@ -248,6 +300,13 @@ class Notification(db.Model):
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_notification_user_id_created_at', 'user_id', 'created_at'),
+        # Partial: only unread rows, which is all the unread badge and list ever read
+        db.Index('ix_notification_unread_user_id', 'user_id',
+                 sqlite_where=db.text('is_read = 0'), postgresql_where=db.text('is_read = false')),
+    )
+    
     def __repr__(self):
         return f'<Notification {self.id}>'
 
@@ -260,6 +319,11 @@ class Attendance(db.Model):
     verified_by_id = db.Column(db.String(64))  # e.g., staff ID or admin ID
     id_image = db.Column(db.String(255))  # Path to uploaded ID image
     approved = db.Column(db.Boolean, default=False)  # Admin approval
+    
+    __table_args__ = (
+        db.Index('ix_attendance_user_id_date', 'user_id', 'date'),
+        db.Index('ix_attendance_date', 'date'),
+    )
 
 class LeaveRequest(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -306,6 +370,22 @@ User.base_salary = db.Column(db.Float, default=0.0)
 User.hourly_rate = db.Column(db.Float, default=0.0)
 User.overtime_rate = db.Column(db.Float, default=0.0)
 
+class PayRate(db.Model):
+    """Hourly and overtime rates for a staff role, effective from a given date"""
+    __tablename__ = 'pay_rate'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    staff_role = db.Column(db.String(50), nullable=False)
+    hourly_rate = db.Column(db.Float, nullable=False)
+    overtime_rate = db.Column(db.Float, nullable=False)
+    effective_from = db.Column(db.Date, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (db.UniqueConstraint('staff_role', 'effective_from', name='_pay_rate_role_effective_uc'),)
+    
+    def __repr__(self):
+        return f'<PayRate {self.staff_role} {self.hourly_rate} from {self.effective_from}>'
+
 class Payment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     booking_id = db.Column(db.Integer, db.ForeignKey('booking.id'), nullable=False)
@@ -321,7 +401,7 @@ class Payment(db.Model):
     
     # Payment gateway fields
     gateway_response = db.Column(db.Text)  # Store full response from payment gateway
-    gateway_transaction_id = db.Column(db.String(100))
+    gateway_transaction_id = db.Column(db.String(100), index=True)
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -331,9 +411,32 @@ class Payment(db.Model):
     booking = db.relationship('Booking', backref=db.backref('payments', lazy='dynamic'))
     user = db.relationship('User', backref=db.backref('payments', lazy='dynamic'))
     
+    __table_args__ = (
+        db.Index('ix_payment_status_created_at', 'payment_status', 'created_at'),
+        # The reconciler pages through pending payments by id
+        db.Index('ix_payment_status_id', 'payment_status', 'id'),
+        db.Index('ix_payment_created_at_id', 'created_at', 'id'),  # Keyset order of the payments listing
+    )
+    
     def __repr__(self):
         return f'<Payment {self.id} - {self.payment_method} - {self.amount}>'
 
+class PaymentEvent(db.Model):
+    """Gateway webhook event, stored once per event id so redeliveries are ignored"""
+    __tablename__ = 'payment_event'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.String(100), unique=True, nullable=False)  # PayMongo evt_... id
+    event_type = db.Column(db.String(50), nullable=False)  # 'payment.paid', 'payment.failed', ...
+    resource_id = db.Column(db.String(100))  # Payment intent the event refers to
+    status = db.Column(db.String(20), default='received')  # received, processed, unmatched, ignored
+    payload = db.Column(db.Text)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<PaymentEvent {self.event_id} - {self.event_type}>'
+
 class PaymentMethod(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)  # 'GCash', 'PayMaya', 'Cash', 'Card'
@@ -376,7 +479,7 @@ class RFIDAccessLog(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     access_type = db.Column(db.String(30), nullable=False)  # 'attendance', 'room_access', 'checkpoint'
     access_location = db.Column(db.String(100))  # 'front_desk', 'room_101', 'checkpoint_a'
-    access_time = db.Column(db.DateTime, default=datetime.utcnow)
+    access_time = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     access_granted = db.Column(db.Boolean, default=True)
     denial_reason = db.Column(db.String(100))  # If access denied
     
@@ -548,6 +651,11 @@ class DailyReport(db.Model):
     guest_satisfaction = db.Column(db.Float, default=0.0)  # average rating
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # One row per day; concurrent rollups cannot double-count a day
+        db.Index('uq_daily_report_report_date', 'report_date', unique=True),
+    )
 
 class StaffPerformance(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -567,3 +675,35 @@ class StaffPerformance(db.Model):
     # Relationships
     staff = db.relationship('User', foreign_keys=[staff_id], backref='performance_evaluations')
     evaluator = db.relationship('User', foreign_keys=[evaluated_by], backref='staff_evaluations_given')
+
+# 6. Background Job Queue
+class Job(db.Model):
+    """Queued unit of background work, picked up by a worker"""
+    __tablename__ = 'job'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    task = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON: {"args": [...], "kwargs": {...}}
+    status = db.Column(db.String(20), default='queued', nullable=False)  # queued, running, done, dead
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=5, nullable=False)
+    run_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    
+    __table_args__ = (db.Index('ix_job_status_run_at', 'status', 'run_at'),)
+
+class DeadLetterJob(db.Model):
+    """Job that exhausted its retries, kept for inspection and manual replay"""
+    __tablename__ = 'dead_letter_job'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id'))
+    task = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False)
+    last_error = db.Column(db.Text)
+    failed_at = db.Column(db.DateTime, default=datetime.utcnow)
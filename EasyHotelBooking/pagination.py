@@ -0,0 +1,104 @@
+"""
+Keyset Pagination
+Cursor pages for the long staff and admin listings. A page is read with a
+seek on the sort key (``WHERE (created_at, id) < (:created_at, :id)``)
+instead of an OFFSET, so every page costs the same index range scan however
+deep the client pages, and rows inserted meanwhile never shift or repeat
+entries. The sort always ends with the primary key, which keeps it total and
+stable.
+
+Cursors are opaque URL-safe tokens; clients send back ``next_cursor`` as
+``cursor`` and should not build them. Listings also report how many rows match
+their filters, counted up to COUNT_CAP so the count stays cheap on big tables.
+
+Usage:
+    rows, next_cursor = keyset_page(query, (Booking.created_at, Booking.id), cursor, limit)
+"""
+
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import func, inspect, tuple_
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+# Listing totals stop counting here
+COUNT_CAP = 10000
+
+
+class InvalidCursor(ValueError):
+    """The cursor is malformed or belongs to a listing with a different sort"""
+
+
+def _dump(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _load(value, column):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values):
+    raw = json.dumps([_dump(value) for value in values], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Sort-key values stored in ``cursor``; raises InvalidCursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError('Wrong number of sort values')
+        return [_load(value, column) for value, column in zip(values, columns)]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Requested page size clamped to 1..MAX_PAGE_SIZE; raises ValueError if not a number"""
+    if value in (None, ''):
+        return default
+    return min(max(int(value), 1), MAX_PAGE_SIZE)
+
+
+def keyset_page(query, columns, cursor=None, limit=DEFAULT_PAGE_SIZE, descending=True):
+    """One page of ``query`` ordered by ``columns``, which must end with the primary key.
+
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    if cursor:
+        key = tuple_(*columns)
+        values = tuple(decode_cursor(cursor, columns))
+        query = query.filter(key < values if descending else key > values)
+    order = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], column.key) for column in columns])
+    return rows, next_cursor
+
+
+def capped_count(query, cap=COUNT_CAP):
+    """``(count, exact)`` for the rows ``query`` matches, counting at most ``cap``.
+
+    ``exact`` is False when there are more than ``cap`` rows; ``count`` is then ``cap``.
+    """
+    primary_key = inspect(query.column_descriptions[0]['entity']).primary_key
+    matching = query.enable_eagerloads(False).with_entities(*primary_key) \
+        .order_by(None).limit(cap + 1).subquery()
+    count = query.session.query(func.count()).select_from(matching).scalar()
+    return min(count, cap), count <= cap
@@ -0,0 +1,268 @@
+"""
+Payment Reconciliation
+Moves GCash payments out of ``pending`` from PayMongo webhooks instead of
+client polling. Webhook deliveries are checked against the Paymongo-Signature
+HMAC, stored once per event id (redeliveries are acknowledged and ignored)
+and applied to Payment and Booking in the same transaction. A periodic
+reconciler catches anything the webhooks missed by checking only payments
+that are still pending after RECONCILE_MIN_AGE seconds.
+
+Usage:
+    flask --app app reconcile-payments --workers 8 --page-size 100
+    flask --app app reconcile-payments --min-age 0 --dry-run
+
+Configuration (environment):
+    PAYMONGO_WEBHOOK_SECRET     webhook signing secret (whsk_...); without it
+                                the verify endpoint falls back to polling, and
+                                with it the endpoint still polls payments left
+                                pending after RECONCILE_MIN_AGE
+    PAYMONGO_WEBHOOK_TOLERANCE  max signature age in seconds (default 300)
+    PAYMENT_RECONCILE_INTERVAL  seconds between reconciler runs (optional)
+    PAYMENT_RECONCILE_MIN_AGE   seconds a payment may stay pending before the
+                                reconciler asks the gateway (default 600)
+    PAYMENT_RECONCILE_BATCH     payments checked per scheduled run (default 200)
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+
+from extensions import db
+from models import Payment, PaymentEvent
+from paymongo_client import paymongo_client
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_TOLERANCE = int(os.environ.get('PAYMONGO_WEBHOOK_TOLERANCE', 300))
+RECONCILE_MIN_AGE = int(os.environ.get('PAYMENT_RECONCILE_MIN_AGE', 600))
+# Payments checked per scheduled run; the CLI has no limit by default
+RECONCILE_BATCH_LIMIT = int(os.environ.get('PAYMENT_RECONCILE_BATCH', 200))
+
+# Gateway status -> Payment.payment_status; anything else leaves the payment pending
+GATEWAY_STATUSES = {
+    'succeeded': 'completed',
+    'paid': 'completed',
+    'failed': 'failed'
+}
+
+# Webhook event type -> gateway status it reports
+EVENT_STATUSES = {
+    'payment.paid': 'paid',
+    'payment.failed': 'failed'
+}
+
+
+def webhook_secret():
+    return os.environ.get('PAYMONGO_WEBHOOK_SECRET', '')
+
+
+def webhooks_enabled():
+    return bool(webhook_secret())
+
+
+def apply_gateway_status(payment, gateway_status, gateway_response=None):
+    """Apply a gateway status to a pending payment and its booking without committing.
+
+    Returns the payment's resulting status. Completed, failed and refunded
+    payments are never moved, so late or out-of-order events are harmless.
+    """
+    new_status = GATEWAY_STATUSES.get(gateway_status)
+    if new_status is None or payment.payment_status != 'pending':
+        return payment.payment_status
+
+    payment.payment_status = new_status
+    if gateway_response is not None:
+        payment.gateway_response = json.dumps(gateway_response)
+    if new_status == 'completed':
+        payment.paid_at = datetime.utcnow()
+        payment.booking.status = 'confirmed'
+    return new_status
+
+
+# Webhooks ------------------------------------------------------------------
+
+def verify_signature(header, body, secret=None, tolerance=WEBHOOK_TOLERANCE, now=None):
+    """Check a ``t=...,te=...,li=...`` Paymongo-Signature header against the raw body"""
+    secret = secret if secret is not None else webhook_secret()
+    if not header or not secret:
+        return False
+    parts = dict(item.strip().split('=', 1) for item in header.split(',') if '=' in item)
+    try:
+        timestamp = int(parts.get('t', ''))
+    except ValueError:
+        return False
+    if abs((now or time.time()) - timestamp) > tolerance:
+        return False
+
+    expected = hmac.new(secret.encode(), f'{timestamp}.'.encode() + body, hashlib.sha256).hexdigest()
+    # te is set for test-mode events, li for live-mode events
+    return any(hmac.compare_digest(expected, parts[key]) for key in ('te', 'li') if parts.get(key))
+
+
+def ingest_event(payload, raw_body=None):
+    """Store a webhook event and apply it. Returns the event status or 'duplicate'."""
+    data = payload['data']
+    attributes = data['attributes']
+    event_type = attributes['type']
+    resource = attributes.get('data') or {}
+    resource_attributes = resource.get('attributes') or {}
+    intent_id = resource_attributes.get('payment_intent_id') or resource.get('id')
+
+    event = PaymentEvent(
+        event_id=data['id'],
+        event_type=event_type,
+        resource_id=intent_id,
+        payload=raw_body.decode() if raw_body is not None else json.dumps(payload)
+    )
+    gateway_status = EVENT_STATUSES.get(event_type)
+    if gateway_status is None:
+        event.status = 'ignored'
+    else:
+        payment = Payment.query.filter_by(gateway_transaction_id=intent_id).first()
+        if payment is None:
+            event.status = 'unmatched'
+        else:
+            apply_gateway_status(payment, gateway_status, resource)
+            event.status = 'processed'
+    event.processed_at = datetime.utcnow()
+
+    db.session.add(event)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Event id already stored: PayMongo redelivered it
+        db.session.rollback()
+        return 'duplicate'
+    return event.status
+
+
+# Reconciler ----------------------------------------------------------------
+
+def pending_gateway_payments(min_age=RECONCILE_MIN_AGE):
+    """Query for GCash payments still pending after ``min_age`` seconds"""
+    cutoff = datetime.utcnow() - timedelta(seconds=min_age)
+    return Payment.query.filter(
+        Payment.payment_method == 'gcash',
+        Payment.payment_status == 'pending',
+        Payment.gateway_transaction_id.isnot(None),
+        Payment.created_at <= cutoff
+    )
+
+
+def _fetch_intent(client, intent_id):
+    """(gateway status, intent) for one payment intent, or (None, error message)"""
+    try:
+        response = client.get(f'/payment_intents/{intent_id}')
+    except Exception as e:
+        return None, str(e)
+    if response.status_code != 200:
+        return None, f'HTTP {response.status_code}'
+    # A malformed body only skips this payment, like a failed request
+    try:
+        intent = response.json()
+        status = intent['data']['attributes']['status']
+    except (ValueError, TypeError, KeyError) as e:
+        return None, f'Malformed gateway response: {e!r}'
+    if not isinstance(status, str):
+        return None, f'Malformed gateway response: status {status!r}'
+    return status, intent
+
+
+def reconcile_payments(min_age=RECONCILE_MIN_AGE, page_size=100, workers=8, limit=None,
+                       dry_run=False, client=None):
+    """Check stale pending payments with the gateway, one keyset page at a time.
+
+    Each page's gateway lookups run concurrently on a bounded thread pool
+    (database work stays on this thread) and the page's status changes are
+    committed together. Returns a summary dict.
+    """
+    client = client or paymongo_client
+    summary = {'checked': 0, 'completed': 0, 'failed': 0, 'pending': 0, 'errors': 0,
+               'pages': 0, 'error_payment_ids': []}
+    started = time.monotonic()
+    last_id = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while limit is None or summary['checked'] < limit:
+            size = page_size if limit is None else min(page_size, limit - summary['checked'])
+            page = pending_gateway_payments(min_age).options(joinedload(Payment.booking)) \
+                .filter(Payment.id > last_id).order_by(Payment.id).limit(size).all()
+            if not page:
+                break
+            last_id = page[-1].id
+            summary['pages'] += 1
+
+            results = pool.map(lambda intent_id: _fetch_intent(client, intent_id),
+                               [payment.gateway_transaction_id for payment in page])
+            for payment, (gateway_status, detail) in zip(page, results):
+                summary['checked'] += 1
+                if gateway_status is None:
+                    logger.warning("Reconcile of payment %s failed: %s", payment.id, detail)
+                    summary['errors'] += 1
+                    summary['error_payment_ids'].append(payment.id)
+                    continue
+                status = apply_gateway_status(payment, gateway_status, detail)
+                summary[status] = summary.get(status, 0) + 1
+
+            if dry_run:
+                db.session.rollback()
+            else:
+                db.session.commit()
+    summary['elapsed_seconds'] = round(time.monotonic() - started, 2)
+    return summary
+
+
+def start_reconciler(app, interval):
+    """Run the reconciler every ``interval`` seconds on a daemon thread"""
+    def run():
+        with app.app_context():
+            try:
+                summary = reconcile_payments(limit=RECONCILE_BATCH_LIMIT)
+                if summary['checked']:
+                    logger.info("Payment reconcile: %s", summary)
+            except Exception:
+                db.session.rollback()
+                logger.exception("Payment reconcile failed")
+            finally:
+                db.session.remove()
+        timer = threading.Timer(interval, run)
+        timer.daemon = True
+        timer.start()
+
+    timer = threading.Timer(interval, run)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+def init_payment_reconciliation(app):
+    """Register the reconcile CLI command and start the periodic reconciler when configured"""
+
+    @app.cli.command('reconcile-payments')
+    @click.option('--min-age', default=RECONCILE_MIN_AGE, help='Only payments pending at least this many seconds')
+    @click.option('--page-size', default=100, help='Payments loaded and committed per page')
+    @click.option('--workers', default=8, help='Concurrent gateway requests')
+    @click.option('--limit', type=int, help='Stop after checking this many payments')
+    @click.option('--dry-run', is_flag=True, help='Report what would change without saving')
+    def reconcile_payments_command(min_age, page_size, workers, limit, dry_run):
+        """Reconcile pending GCash payments with PayMongo"""
+        summary = reconcile_payments(min_age, page_size, workers, limit, dry_run)
+        click.echo(f"Checked {summary['checked']} payment(s) in {summary['pages']} page(s) "
+                   f"in {summary['elapsed_seconds']}s{' (dry run)' if dry_run else ''}")
+        for status in ('completed', 'failed', 'pending', 'errors'):
+            click.echo(f"  {status:<10} {summary[status]}")
+        if summary['error_payment_ids']:
+            click.echo(f"  error ids  {', '.join(str(i) for i in summary['error_payment_ids'])}")
+
+    interval = os.environ.get('PAYMENT_RECONCILE_INTERVAL')
+    if interval:
+        start_reconciler(app, float(interval))
@@ -5,29 +5,26 @@ This service handles real GCash payments using PayMongo API (GCash's official pa
 
 import requests
 import json
-import base64
 from datetime import datetime, timedelta
 from models import Payment, PaymentMethod, Booking, User
 from extensions import db
+from paymongo_client import paymongo_client
+from payment_reconciliation import apply_gateway_status
 
 class GCashPaymentService:
-    def __init__(self):
+    def __init__(self, client=None):
         # PayMongo API Configuration (GCash's official partner)
-        self.base_url = "https://api.paymongo.com/v1"
-        # PayMongo API keys - Replace with your actual test keys
+        # Pooled client; base URL and keys come from PAYMONGO_* environment variables
         # Get your keys from: https://dashboard.paymongo.com/
+        self.client = client or paymongo_client
+        self.base_url = self.client.base_url
         
         # 🧪 TEST KEYS (Use these for development/testing)
         self.public_key = "pk_test_gxqMAQDTK1uXckrJArm3R45s"
-        self.secret_key = "sk_test_UvqPUfgisgY85i2vGndtLXoT"
         
         # 💰 LIVE KEYS (Use these for production - ONLY after business verification)
         # self.public_key = "pk_live_YOUR_ACTUAL_LIVE_PUBLIC_KEY_HERE"
-        # self.secret_key = "sk_live_YOUR_ACTUAL_LIVE_SECRET_KEY_HERE"
-        
-        # Create authorization header
-        auth_string = f"{self.secret_key}:"
-        self.auth_header = base64.b64encode(auth_string.encode()).decode()
+        # PAYMONGO_SECRET_KEY=sk_live_YOUR_ACTUAL_LIVE_SECRET_KEY_HERE
     
     def create_gcash_payment_intent(self, booking_id, amount, user_phone):
         """
@@ -42,12 +39,6 @@ class GCashPaymentService:
             amount_centavos = int(amount * 100)
             
             # Create payment intent
-            url = f"{self.base_url}/payment_intents"
-            headers = {
-                "Authorization": f"Basic {self.auth_header}",
-                "Content-Type": "application/json"
-            }
-            
             payload = {
                 "data": {
                     "attributes": {
@@ -73,7 +64,7 @@ class GCashPaymentService:
                 }
             }
             
-            response = requests.post(url, headers=headers, json=payload)
+            response = self.client.post('/payment_intents', json=payload)
             
             if response.status_code == 200:
                 payment_intent = response.json()
@@ -113,12 +104,6 @@ class GCashPaymentService:
         Create GCash payment source
         """
         try:
-            url = f"{self.base_url}/sources"
-            headers = {
-                "Authorization": f"Basic {self.auth_header}",
-                "Content-Type": "application/json"
-            }
-            
             payload = {
                 "data": {
                     "attributes": {
@@ -136,7 +121,7 @@ class GCashPaymentService:
                 }
             }
             
-            response = requests.post(url, headers=headers, json=payload)
+            response = self.client.post('/sources', json=payload, idempotency_key=f"source-{payment_intent_id}")
             
             if response.status_code == 200:
                 source = response.json()
@@ -164,37 +149,16 @@ class GCashPaymentService:
                 return {"success": False, "message": "Payment not found"}
             
             # Get payment intent status
-            url = f"{self.base_url}/payment_intents/{payment.gateway_transaction_id}"
-            headers = {
-                "Authorization": f"Basic {self.auth_header}",
-                "Content-Type": "application/json"
-            }
-            
-            response = requests.get(url, headers=headers)
+            response = self.client.get(f"/payment_intents/{payment.gateway_transaction_id}")
             
             if response.status_code == 200:
                 payment_intent = response.json()
-                status = payment_intent['data']['attributes']['status']
                 
-                if status == 'succeeded':
-                    # Update payment status
-                    payment.payment_status = 'completed'
-                    payment.paid_at = datetime.utcnow()
-                    payment.gateway_response = json.dumps(payment_intent)
-                    
-                    # Update booking status
-                    booking = payment.booking
-                    booking.status = 'confirmed'
-                    
-                    db.session.commit()
-                    
-                    return {"success": True, "status": "completed"}
-                elif status == 'failed':
-                    payment.payment_status = 'failed'
-                    db.session.commit()
-                    return {"success": True, "status": "failed"}
-                else:
-                    return {"success": True, "status": "pending"}
+                # Same transition rules as the webhook and the reconciler
+                status = apply_gateway_status(payment, payment_intent['data']['attributes']['status'], payment_intent)
+                db.session.commit()
+                
+                return {"success": True, "status": status}
             else:
                 return {
                     "success": False,
@@ -214,12 +178,6 @@ class GCashPaymentService:
                 return {"success": False, "message": "Payment not eligible for refund"}
             
             # Create refund
-            url = f"{self.base_url}/refunds"
-            headers = {
-                "Authorization": f"Basic {self.auth_header}",
-                "Content-Type": "application/json"
-            }
-            
             payload = {
                 "data": {
                     "attributes": {
@@ -234,7 +192,8 @@ class GCashPaymentService:
                 }
             }
             
-            response = requests.post(url, headers=headers, json=payload)
+            # One refund per payment, even if the call is retried
+            response = self.client.post('/refunds', json=payload, idempotency_key=f"refund-{payment.id}")
             
             if response.status_code == 200:
                 refund = response.json()
@@ -0,0 +1,150 @@
+"""
+PayMongo HTTP Client
+Shared gateway client for the payment service. One pooled requests.Session
+keeps TLS connections alive between calls; every call has connect/read
+timeouts; transient failures (connection errors, timeouts, 429 and 5xx) are
+retried with exponential backoff and jitter. POSTs carry an Idempotency-Key
+that stays the same across retries, so a retried create cannot charge twice.
+Per-endpoint latency histograms are kept for monitoring.
+
+Configuration (environment):
+    PAYMONGO_BASE_URL      default https://api.paymongo.com/v1; point it at
+                           fake_paymongo.py (http://127.0.0.1:8765/v1) for tests
+    PAYMONGO_SECRET_KEY    API secret key (required; any value works against
+                           fake_paymongo.py)
+    PAYMONGO_TIMEOUT       read timeout in seconds (default 15)
+    PAYMONGO_MAX_RETRIES   retries after the first attempt (default 2)
+"""
+
+import base64
+import os
+import random
+import re
+import threading
+import time
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Upper bounds (milliseconds) of the latency histogram buckets
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class PayMongoConfigError(RuntimeError):
+    """PAYMONGO_SECRET_KEY is not set"""
+
+
+class PayMongoClient:
+    """Pooled, retrying PayMongo API client"""
+
+    def __init__(self, base_url=None, secret_key=None, connect_timeout=5.0, read_timeout=None,
+                 max_retries=None, backoff=0.5, pool_size=10):
+        self.base_url = (base_url or os.environ.get('PAYMONGO_BASE_URL', 'https://api.paymongo.com/v1')).rstrip('/')
+        self.secret_key = secret_key or os.environ.get('PAYMONGO_SECRET_KEY')
+        self.timeout = (connect_timeout, float(read_timeout or os.environ.get('PAYMONGO_TIMEOUT', 15)))
+        self.max_retries = int(max_retries if max_retries is not None else os.environ.get('PAYMONGO_MAX_RETRIES', 2))
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        auth = base64.b64encode(f"{self.secret_key or ''}:".encode()).decode()
+        self.session.headers.update({
+            'Authorization': f'Basic {auth}',
+            'Content-Type': 'application/json'
+        })
+
+        self._lock = threading.Lock()
+        self._latency = {}
+
+        if not self.secret_key:
+            print("⚠️ PAYMONGO_SECRET_KEY is not set; PayMongo requests will fail until it is")
+
+    # Requests --------------------------------------------------------------
+
+    def request(self, method, path, json=None, idempotency_key=None, timeout=None):
+        """Send ``method path`` and return the final requests.Response.
+
+        Raises requests.RequestException when every attempt failed to get a response,
+        and PayMongoConfigError when no secret key is configured.
+        """
+        if not self.secret_key:
+            raise PayMongoConfigError('PayMongo is not configured: set PAYMONGO_SECRET_KEY')
+        headers = {}
+        if method.upper() == 'POST':
+            headers['Idempotency-Key'] = idempotency_key or uuid.uuid4().hex
+        url = f'{self.base_url}/{path.lstrip("/")}'
+        endpoint = f'{method.upper()} {self._template(path)}'
+
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, json=json, headers=headers,
+                                                timeout=timeout or self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self._observe(endpoint, time.monotonic() - started, 'error')
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                self._observe(endpoint, time.monotonic() - started, response.status_code)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+            time.sleep(self._retry_delay(attempt))
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, json=None, **kwargs):
+        return self.request('POST', path, json=json, **kwargs)
+
+    def _retry_delay(self, attempt):
+        delay = self.backoff * 2 ** attempt
+        return random.uniform(0, delay)
+
+    @staticmethod
+    def _template(path):
+        # /payment_intents/pi_abc123 -> /payment_intents/:id
+        return re.sub(r'/[a-z]+_(?=[A-Za-z]*[0-9])[A-Za-z0-9]+', '/:id', '/' + path.strip('/'))
+
+    # Metrics ---------------------------------------------------------------
+
+    def _observe(self, endpoint, seconds, outcome):
+        elapsed_ms = seconds * 1000
+        with self._lock:
+            stats = self._latency.setdefault(endpoint, {
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                'outcomes': {}
+            })
+            stats['count'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            index = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if elapsed_ms <= bound),
+                         len(LATENCY_BUCKETS_MS))
+            stats['buckets'][index] += 1
+            stats['outcomes'][str(outcome)] = stats['outcomes'].get(str(outcome), 0) + 1
+
+    def metrics(self):
+        """Latency histogram and outcome counts per endpoint"""
+        labels = [f'<={bound}ms' for bound in LATENCY_BUCKETS_MS] + [f'>{LATENCY_BUCKETS_MS[-1]}ms']
+        with self._lock:
+            return {
+                endpoint: {
+                    'count': stats['count'],
+                    'avg_ms': round(stats['total_ms'] / stats['count'], 1),
+                    'max_ms': round(stats['max_ms'], 1),
+                    'histogram': dict(zip(labels, stats['buckets'])),
+                    'outcomes': dict(stats['outcomes'])
+                }
+                for endpoint, stats in self._latency.items()
+            }
+
+
+# Initialize shared client
+paymongo_client = PayMongoClient()
@@ -0,0 +1,201 @@
+"""
+Payroll Engine
+Generates payroll for every active staff member of a pay period in one batch:
+approved attendance for the period is loaded with a single query, hours and
+pay are computed for all staff at once with NumPy, and the Payroll rows are
+bulk-inserted. A dry run returns the same lines without writing anything.
+
+Role rates come from the PayRate table. Each attendance day is paid at the
+rate effective on that day, so rate changes inside a period are prorated and
+historical periods can be recomputed with the rates that applied back then.
+"""
+
+from bisect import bisect_right
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import User, Attendance, Payroll, PayRate
+from cache import VersionedCache, version_store
+
+# Hours per day paid at the regular rate; anything above is overtime
+REGULAR_HOURS_PER_DAY = 8.0
+
+
+class PayRateResolver:
+    """Effective-dated role rates loaded from PayRate in one query"""
+
+    def __init__(self, rows):
+        self._rates = {}
+        for staff_role, effective_from, hourly_rate, overtime_rate in sorted(rows, key=lambda r: (r[0], r[1])):
+            dates, rates = self._rates.setdefault(staff_role, ([], []))
+            dates.append(effective_from.toordinal())
+            rates.append((hourly_rate, overtime_rate))
+
+    @property
+    def roles(self):
+        return sorted(self._rates)
+
+    def rate_for(self, staff_role, day):
+        """(hourly, overtime) for ``staff_role`` on ``day``, or None when no rate applies"""
+        entry = self._rates.get(staff_role)
+        if entry is None:
+            return None
+        index = bisect_right(entry[0], day.toordinal()) - 1
+        return entry[1][index] if index >= 0 else None
+
+
+def _load_resolver():
+    return PayRateResolver(db.session.query(
+        PayRate.staff_role, PayRate.effective_from, PayRate.hourly_rate, PayRate.overtime_rate
+    ).all())
+
+
+def pay_rate_resolver():
+    """Cached resolver, rebuilt whenever a PayRate row is committed"""
+    return pay_rate_cache.get_or_load('resolver', _load_resolver)
+
+
+def staff_rates(resolver, staff_role, hourly_rate, overtime_rate, day):
+    """Hourly and overtime rate for a staff member on ``day``"""
+    rate = resolver.rate_for(staff_role, day)
+    if rate is not None:
+        return rate
+    # Roles without a rate table entry use the rates stored on the user
+    hourly = hourly_rate or 0.0
+    return hourly, overtime_rate or hourly
+
+
+def _seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6
+
+
+def compute_payroll(period_start, period_end):
+    """Payroll lines for every active staff member for [period_start, period_end]"""
+    staff = db.session.query(
+        User.id, User.username, User.staff_role, User.salary_type,
+        User.base_salary, User.hourly_rate, User.overtime_rate
+    ).filter(
+        User.is_staff == True,  # noqa: E712
+        User.staff_status == 'active'
+    ).order_by(User.id).all()
+    if not staff:
+        return []
+    positions = {row.id: index for index, row in enumerate(staff)}
+
+    existing = {
+        staff_id for (staff_id,) in db.session.query(Payroll.staff_id).filter(
+            Payroll.period_start == period_start,
+            Payroll.period_end == period_end
+        )
+    }
+
+    attendance = db.session.query(
+        Attendance.user_id, Attendance.date, Attendance.clock_in, Attendance.clock_out
+    ).join(User, User.id == Attendance.user_id).filter(
+        User.is_staff == True,  # noqa: E712
+        User.staff_status == 'active',
+        Attendance.approved == True,  # noqa: E712
+        Attendance.date >= period_start,
+        Attendance.date <= period_end,
+        Attendance.clock_in.isnot(None),
+        Attendance.clock_out.isnot(None)
+    ).all()
+
+    # One row per attendance day, each with the rates effective on that day
+    resolver = pay_rate_resolver()
+    owners = np.array([positions[user_id] for user_id, _, _, _ in attendance], dtype=np.int64)
+    clock_in = np.array([_seconds(value) for _, _, value, _ in attendance], dtype=np.float64)
+    clock_out = np.array([_seconds(value) for _, _, _, value in attendance], dtype=np.float64)
+    rates = []
+    for user_id, day, _, _ in attendance:
+        member = staff[positions[user_id]]
+        rates.append(staff_rates(resolver, member.staff_role, member.hourly_rate, member.overtime_rate, day))
+    rates = np.array(rates, dtype=np.float64).reshape(-1, 2)
+
+    worked = (clock_out - clock_in) / 3600.0
+    overtime = np.maximum(worked - REGULAR_HOURS_PER_DAY, 0.0)
+    day_pay = (worked - overtime) * rates[:, 0] + overtime * rates[:, 1]
+
+    total_hours = np.bincount(owners, weights=worked, minlength=len(staff))
+    overtime_hours = np.bincount(owners, weights=overtime, minlength=len(staff))
+    hourly_pay = np.bincount(owners, weights=day_pay, minlength=len(staff))
+
+    lines = []
+    for index, row in enumerate(staff):
+        gross_pay = (row.base_salary or 0.0) if row.salary_type == 'fixed' else float(hourly_pay[index])
+        # Deductions/Bonuses (manual for now)
+        deductions = 0.0
+        bonuses = 0.0
+        lines.append({
+            'staff_id': row.id,
+            'staff_name': row.username,
+            'staff_role': row.staff_role,
+            'total_hours': float(total_hours[index]),
+            'overtime_hours': float(overtime_hours[index]),
+            'gross_pay': gross_pay,
+            'deductions': deductions,
+            'bonuses': bonuses,
+            'net_pay': gross_pay + bonuses - deductions,
+            'already_generated': row.id in existing
+        })
+    return lines
+
+
+def generate_payroll(period_start, period_end, dry_run=False):
+    """Compute payroll for the period and bulk-insert rows for staff not yet paid.
+
+    Returns ``(lines, created)``; with ``dry_run`` nothing is written.
+    """
+    lines = compute_payroll(period_start, period_end)
+    pending = [line for line in lines if not line['already_generated']]
+    if dry_run or not pending:
+        return lines, 0
+
+    issued = datetime.utcnow()
+    db.session.bulk_insert_mappings(Payroll, [
+        {
+            'staff_id': line['staff_id'],
+            'period_start': period_start,
+            'period_end': period_end,
+            'total_hours': line['total_hours'],
+            'overtime_hours': line['overtime_hours'],
+            'gross_pay': line['gross_pay'],
+            'deductions': line['deductions'],
+            'bonuses': line['bonuses'],
+            'net_pay': line['net_pay'],
+            'date_issued': issued,
+            'status': 'pending',
+            'archived': False
+        }
+        for line in pending
+    ])
+    db.session.commit()
+    return lines, len(pending)
+
+
+# Initialize pay rate cache
+pay_rate_cache = VersionedCache('pay_rates', version_store)
+_DIRTY_KEY = 'pay_rates_dirty'
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_pay_rate_changes(session, flush_context):
+    for objects in (session.new, session.dirty, session.deleted):
+        if any(isinstance(obj, PayRate) for obj in objects):
+            session.info[_DIRTY_KEY] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_pay_rate_version(session):
+    if session.info.pop(_DIRTY_KEY, False):
+        pay_rate_cache.bump()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pay_rate_changes(session):
+    session.info.pop(_DIRTY_KEY, None)
@@ -0,0 +1,171 @@
+"""
+Query Plan Audit
+Runs EXPLAIN for the queries behind the hot endpoints and reports every full
+table scan and temporary sort, so a dropped or unusable index is caught
+before it shows up as latency. Queries are explained with bound parameters,
+exactly as the application sends them.
+
+SQLite plans come from EXPLAIN QUERY PLAN. On PostgreSQL the audit uses
+EXPLAIN (FORMAT JSON) with sequential scans disabled for the transaction, so
+the planner picks an index whenever one can serve the query, even while the
+tables are still small.
+
+Usage:
+    flask --app app audit-queries             # report scans
+    flask --app app audit-queries --verbose   # also print each plan
+    flask --app app audit-queries --strict    # exit 1 when a query scans a table
+"""
+
+import json
+import sys
+from datetime import date, datetime, timedelta
+
+import click
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from extensions import db
+from models import Booking, RoomNight, Attendance, Notification, RFIDAccessLog, Payment
+from payment_reconciliation import pending_gateway_payments
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN wrapper that compiles ``statement`` with its parameters bound"""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    prefix = 'EXPLAIN QUERY PLAN ' if compiler.dialect.name == 'sqlite' else 'EXPLAIN (FORMAT JSON) '
+    return prefix + compiler.process(element.statement, **kw)
+
+
+def hot_queries():
+    """(name, statement) for each query the busiest pages and endpoints run"""
+    today = date.today()
+    now = datetime.utcnow()
+    month_start = datetime.combine(today.replace(day=1), datetime.min.time())
+    return [
+        ('guest bookings',
+         select(Booking).where(Booking.user_id == 1).order_by(Booking.created_at.desc())),
+        ('room active bookings',
+         select(func.count(Booking.id)).where(Booking.room_id == 1, Booking.status.in_(['pending', 'confirmed']))),
+        ('booking listing page',
+         select(Booking).where(tuple_(Booking.created_at, Booking.id) < (now, 2 ** 31))
+         .order_by(Booking.created_at.desc(), Booking.id.desc()).limit(26)),
+        ('bookings by status page',
+         select(Booking).where(Booking.status == 'pending', tuple_(Booking.created_at, Booking.id) < (now, 2 ** 31))
+         .order_by(Booking.created_at.desc(), Booking.id.desc()).limit(26)),
+        ('confirmed revenue this month',
+         select(func.sum(Booking.total_price)).where(Booking.status == 'confirmed', Booking.created_at >= month_start)),
+        ('room night availability',
+         select(RoomNight.id).where(RoomNight.room_id == 1, RoomNight.night >= today,
+                                    RoomNight.night < today + timedelta(days=3)).limit(1)),
+        ('nightly occupancy',
+         select(RoomNight.night, func.count(RoomNight.id)).where(
+             RoomNight.night >= today, RoomNight.night < today + timedelta(days=30)).group_by(RoomNight.night)),
+        ('staff attendance today',
+         select(Attendance).where(Attendance.user_id == 1, Attendance.date == today)),
+        ('attendance on date',
+         select(func.count(Attendance.id)).where(Attendance.date == today, Attendance.clock_in.isnot(None))),
+        ('unread notifications',
+         select(Notification).where(Notification.user_id == 1, Notification.is_read == False)),  # noqa: E712
+        ('notification list',
+         select(Notification).where(Notification.user_id == 1).order_by(Notification.created_at.desc())),
+        ('rfid access logs',
+         select(RFIDAccessLog).where(RFIDAccessLog.access_time >= now - timedelta(days=30))
+         .order_by(RFIDAccessLog.access_time.desc())),
+        ('payment listing page',
+         select(Payment).where(tuple_(Payment.created_at, Payment.id) < (now, 2 ** 31))
+         .order_by(Payment.created_at.desc(), Payment.id.desc()).limit(26)),
+        ('payments by status',
+         select(Payment).where(Payment.payment_status == 'completed', Payment.created_at >= month_start)),
+        ('payment by gateway id',
+         select(Payment).where(Payment.gateway_transaction_id == 'pi_0')),
+        ('pending gateway payments',
+         pending_gateway_payments(0).filter(Payment.id > 0).order_by(Payment.id).limit(100).statement),
+    ]
+
+
+def _sqlite_findings(rows):
+    plan = [row[3] for row in rows]
+    scans = [line.split()[1] for line in plan if line.startswith('SCAN ') and ' USING ' not in line]
+    sorts = [line for line in plan if line.startswith('USE TEMP B-TREE')]
+    return plan, scans, sorts
+
+
+def _postgresql_findings(rows):
+    document = rows[0][0]
+    if isinstance(document, str):
+        document = json.loads(document)
+    plan, scans, sorts = [], [], []
+
+    def walk(node, depth):
+        relation = f" on {node['Relation Name']}" if 'Relation Name' in node else ''
+        index = f" using {node['Index Name']}" if 'Index Name' in node else ''
+        plan.append(f"{'  ' * depth}{node['Node Type']}{relation}{index}")
+        if node['Node Type'] == 'Seq Scan':
+            scans.append(node['Relation Name'])
+        elif node['Node Type'] in ('Sort', 'Incremental Sort'):
+            sorts.append(node['Node Type'])
+        for child in node.get('Plans', []):
+            walk(child, depth + 1)
+
+    walk(document[0]['Plan'], 0)
+    return plan, scans, sorts
+
+
+def explain(statement):
+    """(plan lines, scanned tables, temporary sorts) for one statement"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        db.session.execute(text('SET LOCAL enable_seqscan = off'))
+    rows = db.session.execute(Explain(statement)).all()
+    if dialect == 'sqlite':
+        return _sqlite_findings(rows)
+    if dialect == 'postgresql':
+        return _postgresql_findings(rows)
+    return [str(row) for row in rows], [], []
+
+
+def audit_queries(queries=None):
+    """Explain every hot query; returns one result dict per query"""
+    results = []
+    try:
+        for name, statement in queries or hot_queries():
+            plan, scans, sorts = explain(statement)
+            results.append({'name': name, 'plan': plan, 'scans': scans, 'sorts': sorts})
+    finally:
+        # Nothing is written; this also resets enable_seqscan on PostgreSQL
+        db.session.rollback()
+    return results
+
+
+def init_query_audit(app):
+    """Register the query-plan audit command"""
+
+    @app.cli.command('audit-queries')
+    @click.option('--verbose', is_flag=True, help='Print the plan of every query')
+    @click.option('--strict', is_flag=True, help='Exit with status 1 when any query scans a table')
+    def audit_queries_command(verbose, strict):
+        """EXPLAIN the hot endpoint queries and report table scans"""
+        results = audit_queries()
+        scanning = 0
+        for result in results:
+            if result['scans']:
+                scanning += 1
+                status = f"SCAN {', '.join(result['scans'])}"
+            else:
+                status = 'ok'
+            sort_note = f" (+{len(result['sorts'])} sort)" if result['sorts'] else ''
+            click.echo(f"{result['name']:<32} {status}{sort_note}")
+            if verbose:
+                for line in result['plan']:
+                    click.echo(f"    {line}")
+        click.echo(f"{len(results)} queries on {db.engine.dialect.name}, {scanning} with table scans")
+        if strict and scanning:
+            sys.exit(1)
@@ -0,0 +1,64 @@
+"""
+Login Rate Limiting
+In-memory token buckets that cap login attempts per client IP and per email
+before any password hash is computed, so credential stuffing and login bursts
+cannot tie up every CPU core on hashing. Buckets refill continuously; the
+least recently used buckets are dropped beyond ``max_keys``.
+
+Limits are per process. The client IP is ``request.remote_addr``, which
+app.py's ProxyFix takes from the router's X-Forwarded-For header, so clients
+behind the router get separate buckets. Configuration (environment):
+    LOGIN_IP_RATE      attempts per minute per client IP (default 20)
+    LOGIN_EMAIL_RATE   attempts per minute per email address (default 5)
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets holding up to ``burst`` tokens, refilled at ``rate`` per second"""
+
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key, cost=1.0):
+        """Take ``cost`` tokens for ``key``. Returns 0 when allowed, else seconds until it would be."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+def _per_minute(name, default):
+    per_minute = float(os.environ.get(name, default))
+    return TokenBucketLimiter(rate=per_minute / 60.0, burst=max(per_minute, 1.0))
+
+
+def login_retry_after(ip, email):
+    """Seconds the client must wait before another login attempt (0 if allowed)"""
+    wait = ip_limiter.acquire(ip or 'unknown')
+    if email:
+        wait = max(wait, email_limiter.acquire(email.strip().lower()))
+    return math.ceil(wait)
+
+
+# Initialize login limiters
+ip_limiter = _per_minute('LOGIN_IP_RATE', 20)
+email_limiter = _per_minute('LOGIN_EMAIL_RATE', 5)
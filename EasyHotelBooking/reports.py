@@ -0,0 +1,496 @@
+"""
+Reporting Engine
+Aggregations behind the admin dashboard and analytics endpoints. Every report
+is computed with grouped SQL aggregates instead of loading rows into Python.
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import case, func, select
+
+from extensions import db
+from models import Booking, Room, RoomNight, RoomSize, FloorPlan, User, DailyReport
+
+# Bookings with these statuses occupy a room for occupancy reporting
+OCCUPYING_STATUSES = ('confirmed', 'pending')
+
+# Longest occupancy window served in one request (three years of nights)
+MAX_OCCUPANCY_DAYS = 3 * 366
+
+# Occupancy breakdown dimensions: (room column, label column)
+OCCUPANCY_BREAKDOWNS = {
+    'room_type': (Room.room_size_id, RoomSize.room_type_name),
+    'floor': (Room.floor_id, FloorPlan.floor_name)
+}
+
+# Supported report granularities and how each period is labelled
+GRANULARITIES = ('day', 'week', 'month', 'year')
+PERIOD_LABELS = {
+    'day': '%Y-%m-%d',
+    'week': 'Week of %b %d, %Y',
+    'month': '%B %Y',
+    'year': '%Y'
+}
+
+# Compact labels for chart axes
+CHART_LABELS = {
+    'day': '%b %d',
+    'week': '%b %d',
+    'month': '%b %Y',
+    'year': '%Y'
+}
+
+
+# Calendar periods ----------------------------------------------------------
+
+def period_start(day, granularity):
+    """First day of the calendar period containing ``day`` (weeks start on Monday)"""
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'year':
+        return day.replace(month=1, day=1)
+    raise ValueError(f'Unsupported granularity: {granularity}')
+
+
+def next_period(start, granularity):
+    """First day of the period following the one starting at ``start``"""
+    if granularity == 'day':
+        return start + timedelta(days=1)
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    if granularity == 'month':
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    if granularity == 'year':
+        return date(start.year + 1, 1, 1)
+    raise ValueError(f'Unsupported granularity: {granularity}')
+
+
+def shift_periods(start, granularity, count):
+    """Move ``count`` periods back from ``start`` (which must be a period start)"""
+    if granularity == 'month':
+        months = start.year * 12 + start.month - 1 - count
+        return date(months // 12, months % 12 + 1, 1)
+    if granularity == 'year':
+        return date(start.year - count, 1, 1)
+    step = 7 if granularity == 'week' else 1
+    return start - timedelta(days=step * count)
+
+
+def iter_periods(start_date, end_date, granularity):
+    """Yield the start of every period overlapping [start_date, end_date]"""
+    current = period_start(start_date, granularity)
+    while current <= end_date:
+        yield current
+        current = next_period(current, granularity)
+
+
+def period_bucket(column, granularity):
+    """SQL expression mapping a date/datetime column to its period start as 'YYYY-MM-DD'"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Unsupported granularity: {granularity}')
+    if db.engine.dialect.name == 'postgresql':
+        return func.to_char(func.date_trunc(granularity, column), 'YYYY-MM-DD')
+    # SQLite date modifiers
+    modifiers = {
+        'day': (),
+        'week': ('-6 days', 'weekday 1'),
+        'month': ('start of month',),
+        'year': ('start of year',)
+    }[granularity]
+    return func.date(column, *modifiers)
+
+
+def parse_date_range(args, granularity, default_periods):
+    """Read ``start_date``/``end_date`` (YYYY-MM-DD) from request args.
+
+    Missing bounds default to the last ``default_periods`` whole periods
+    ending with the current one.
+    """
+    try:
+        end_date = datetime.strptime(args['end_date'], '%Y-%m-%d').date() if args.get('end_date') \
+            else datetime.now().date()
+        if args.get('start_date'):
+            start_date = datetime.strptime(args['start_date'], '%Y-%m-%d').date()
+        else:
+            start_date = shift_periods(period_start(end_date, granularity), granularity, default_periods - 1)
+    except ValueError:
+        raise ValueError('Invalid date format. Use YYYY-MM-DD')
+    if start_date > end_date:
+        raise ValueError('start_date must be on or before end_date')
+    return start_date, end_date
+
+
+def dashboard_stats(today=None):
+    """Headline booking, revenue, room and staff numbers for the admin dashboard"""
+    end_date = today or datetime.now().date()
+    start_date = end_date - timedelta(days=30)
+
+    # One pass over bookings, grouped by status
+    booking_rows = db.session.query(
+        Booking.status,
+        func.count(Booking.id),
+        func.coalesce(func.sum(Booking.total_price), 0.0),
+        func.coalesce(func.sum(case((Booking.created_at >= start_date, Booking.total_price), else_=0.0)), 0.0),
+        func.coalesce(func.sum(case(
+            (
+                (Booking.check_in_date <= end_date) & (Booking.check_out_date >= start_date),
+                1
+            ),
+            else_=0
+        )), 0)
+    ).group_by(Booking.status).all()
+
+    status_counts = {}
+    total_revenue = 0.0
+    recent_revenue = 0.0
+    occupied_rooms = 0
+    for status, count, revenue, recent, overlapping in booking_rows:
+        status_counts[status] = count
+        if status == 'confirmed':
+            total_revenue = float(revenue)
+            recent_revenue = float(recent)
+        if status in ('confirmed', 'pending'):
+            occupied_rooms += int(overlapping)
+
+    # Rooms and people in a second pass
+    total_rooms, total_staff, active_staff, total_guests = db.session.query(
+        select(func.count(Room.id)).scalar_subquery(),
+        func.coalesce(func.sum(case((User.is_staff == True, 1), else_=0)), 0),  # noqa: E712
+        func.coalesce(func.sum(case(((User.is_staff == True) & (User.staff_status == 'active'), 1), else_=0)), 0),  # noqa: E712
+        func.coalesce(func.sum(case(((User.is_staff == False) & (User.is_admin == False), 1), else_=0)), 0)  # noqa: E712
+    ).select_from(User).one()
+
+    confirmed_bookings = status_counts.get('confirmed', 0)
+    occupancy_rate = (occupied_rooms / total_rooms * 100) if total_rooms > 0 else 0
+    avg_booking_value = total_revenue / confirmed_bookings if confirmed_bookings > 0 else 0
+
+    return {
+        'total_bookings': sum(status_counts.values()),
+        'pending_bookings': status_counts.get('pending', 0),
+        'confirmed_bookings': confirmed_bookings,
+        'cancelled_bookings': status_counts.get('cancelled', 0),
+        'total_revenue': total_revenue,
+        'recent_revenue': recent_revenue,
+        'total_rooms': total_rooms,
+        'occupancy_rate': round(occupancy_rate, 2),
+        'total_staff': int(total_staff),
+        'active_staff': int(active_staff),
+        'total_guests': int(total_guests),
+        'avg_booking_value': round(avg_booking_value, 2)
+    }
+
+
+def _confirmed_created_between(start_date, end_date):
+    """Filter for confirmed bookings created on a day in [start_date, end_date]"""
+    return (
+        Booking.status == 'confirmed',
+        Booking.created_at >= datetime.combine(start_date, datetime.min.time()),
+        Booking.created_at < datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+    )
+
+
+def first_booking_date():
+    """Creation date of the oldest confirmed booking, or None"""
+    first = db.session.query(func.min(Booking.created_at)).filter(Booking.status == 'confirmed').scalar()
+    return first.date() if first else None
+
+
+def _rolled_up_revenue(start_date, end_date, granularity):
+    """Revenue per period from DailyReport rows, or None unless every day in range is rolled up"""
+    bucket = period_bucket(DailyReport.report_date, granularity)
+    rows = db.session.query(
+        bucket,
+        func.count(func.distinct(DailyReport.report_date)),
+        func.coalesce(func.sum(DailyReport.total_revenue), 0.0)
+    ).filter(
+        DailyReport.report_date >= start_date,
+        DailyReport.report_date <= end_date
+    ).group_by(bucket).all()
+    if sum(days for _, days, _ in rows) != (end_date - start_date).days + 1:
+        return None
+    return {period: float(revenue) for period, _, revenue in rows}
+
+
+def _booking_revenue(start_date, end_date, granularity):
+    bucket = period_bucket(Booking.created_at, granularity)
+    return dict(db.session.query(
+        bucket,
+        func.coalesce(func.sum(Booking.total_price), 0.0)
+    ).filter(*_confirmed_created_between(start_date, end_date)).group_by(bucket).all())
+
+
+def revenue_series(start_date, end_date, granularity):
+    """Chart-ready confirmed revenue per period: ``{'labels': [...], 'data': [...]}``.
+
+    Past days are read from the DailyReport rollups when they cover the whole
+    range; today and any gap fall back to scanning bookings.
+    """
+    today = datetime.now().date()
+    totals = None
+    if start_date < today:
+        totals = _rolled_up_revenue(start_date, min(end_date, today - timedelta(days=1)), granularity)
+    if totals is None:
+        totals = _booking_revenue(start_date, end_date, granularity)
+    elif end_date >= today:
+        for period, revenue in _booking_revenue(today, end_date, granularity).items():
+            totals[period] = totals.get(period, 0.0) + revenue
+
+    periods = list(iter_periods(start_date, end_date, granularity))
+    label_format = CHART_LABELS[granularity]
+    return {
+        'granularity': granularity,
+        'periods': [start.isoformat() for start in periods],
+        'labels': [start.strftime(label_format) for start in periods],
+        'data': [float(totals.get(start.isoformat(), 0.0)) for start in periods]
+    }
+
+
+def revenue_report(start_date, end_date, granularity='month'):
+    """Confirmed revenue per calendar period and per room, from a single grouped scan.
+
+    Bookings are attributed to the period in which they were created. Periods
+    without bookings are reported with zero revenue.
+    """
+    bucket = period_bucket(Booking.created_at, granularity)
+    rows = db.session.query(
+        bucket,
+        Booking.room_id,
+        func.count(Booking.id),
+        func.coalesce(func.sum(Booking.total_price), 0.0)
+    ).filter(*_confirmed_created_between(start_date, end_date)).group_by(bucket, Booking.room_id).all()
+
+    periods = {}
+    rooms = {}
+    for period, room_id, count, revenue in rows:
+        period_totals = periods.setdefault(period, [0.0, 0])
+        period_totals[0] += float(revenue)
+        period_totals[1] += count
+        room_totals = rooms.setdefault(room_id, [0.0, 0])
+        room_totals[0] += float(revenue)
+        room_totals[1] += count
+
+    label_format = PERIOD_LABELS[granularity]
+    series = []
+    for start in iter_periods(start_date, end_date, granularity):
+        revenue, count = periods.get(start.isoformat(), (0.0, 0))
+        series.append({
+            'period': start.isoformat(),
+            'label': start.strftime(label_format),
+            'revenue': revenue,
+            'bookings_count': count
+        })
+
+    room_revenue = []
+    for room_id, name in db.session.query(Room.id, Room.name).all():
+        revenue, count = rooms.get(room_id, (0.0, 0))
+        room_revenue.append({
+            'room_id': room_id,
+            'room_name': name,
+            'revenue': revenue,
+            'bookings_count': count
+        })
+    room_revenue.sort(key=lambda x: x['revenue'], reverse=True)
+
+    return {
+        'granularity': granularity,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'revenue_series': series,
+        'room_revenue': room_revenue
+    }
+
+
+def nightly_occupancy(start_date, nights, group_column=None, group_index=None):
+    """Occupied rooms and room revenue per night, counted from the room_night ledger.
+
+    One grouped COUNT/SUM per night (and per value of ``group_column`` when
+    given, ``group_index`` mapping each value to a row) over the ledger's night
+    index. Returns two ``(groups, nights)`` arrays: rooms sold and the revenue
+    those nights earned.
+    """
+    group_count = len(group_index) if group_column is not None else 1
+    occupied = np.zeros((group_count, nights), dtype=np.int64)
+    revenue = np.zeros((group_count, nights))
+
+    columns = [RoomNight.night] + ([group_column] if group_column is not None else [])
+    query = db.session.query(
+        *columns, func.count(RoomNight.id), func.coalesce(func.sum(RoomNight.rate), 0.0)
+    ).join(Booking, Booking.id == RoomNight.booking_id)
+    if group_column is not None:
+        query = query.join(Room, Room.id == RoomNight.room_id)
+    rows = query.filter(
+        Booking.status.in_(OCCUPYING_STATUSES),
+        RoomNight.night >= start_date,
+        RoomNight.night < start_date + timedelta(days=nights)
+    ).group_by(*columns).all()
+
+    for row in rows:
+        row_index = 0 if group_column is None else group_index.get(row[1])
+        if row_index is None:
+            continue
+        offset = (row[0] - start_date).days
+        occupied[row_index, offset] = row[-2]
+        revenue[row_index, offset] = row[-1]
+    return occupied, revenue
+
+
+def occupancy_report(start_date, end_date, breakdown=None):
+    """Nightly occupancy and room revenue for [start_date, end_date], optionally split by room type or floor.
+
+    Counts and revenue come from the room_night ledger, so a night's revenue is
+    the exact share of each booking's price allocated to that night. Future
+    nights report on-the-books occupancy.
+    """
+    nights = (end_date - start_date).days + 1
+
+    total_rooms = db.session.query(func.count(Room.id)).scalar()
+    occupied, revenue = nightly_occupancy(start_date, nights)
+    occupied, revenue = occupied[0], revenue[0]
+    rates = occupied / total_rooms * 100 if total_rooms > 0 else np.zeros(nights)
+
+    occupancy_data = []
+    for offset in range(nights):
+        occupancy_data.append({
+            'date': (start_date + timedelta(days=offset)).strftime('%Y-%m-%d'),
+            'occupied_rooms': int(occupied[offset]),
+            'total_rooms': total_rooms,
+            'occupancy_rate': round(float(rates[offset]), 2),
+            'room_revenue': round(float(revenue[offset]), 2)
+        })
+
+    room_nights_available = total_rooms * nights
+    room_nights_sold = int(occupied.sum())
+    room_revenue = round(float(revenue.sum()), 2)
+    report = {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'occupancy_data': occupancy_data,
+        'summary': {
+            'nights': nights,
+            'room_nights_sold': room_nights_sold,
+            'room_nights_available': room_nights_available,
+            'average_occupancy_rate': round(room_nights_sold / room_nights_available * 100, 2)
+            if room_nights_available > 0 else 0,
+            'peak_occupied_rooms': int(occupied.max()) if nights else 0,
+            'room_revenue': room_revenue,
+            'average_daily_rate': round(room_revenue / room_nights_sold, 2) if room_nights_sold else 0,
+            'revpar': round(room_revenue / room_nights_available, 2) if room_nights_available > 0 else 0
+        }
+    }
+
+    if breakdown:
+        report['breakdown'] = _occupancy_breakdown(start_date, nights, breakdown)
+    return report
+
+
+def _occupancy_breakdown(start_date, nights, breakdown):
+    key_column, label_column = OCCUPANCY_BREAKDOWNS[breakdown]
+    rooms = db.session.query(Room.id, key_column, label_column) \
+        .join(RoomSize, Room.room_size_id == RoomSize.id) \
+        .join(FloorPlan, Room.floor_id == FloorPlan.id).all()
+
+    group_index = {}
+    group_labels = []
+    group_sizes = []
+    for room_id, key, label in rooms:
+        if key not in group_index:
+            group_index[key] = len(group_labels)
+            group_labels.append((key, label))
+            group_sizes.append(0)
+        group_sizes[group_index[key]] += 1
+
+    occupied, revenue = nightly_occupancy(start_date, nights, key_column, group_index)
+    sizes = np.array(group_sizes, dtype=np.float64).reshape(-1, 1)
+    rates = np.divide(occupied * 100, sizes, out=np.zeros(occupied.shape), where=sizes > 0)
+
+    result = []
+    for index, (key, label) in enumerate(group_labels):
+        result.append({
+            'id': key,
+            'name': label,
+            'total_rooms': group_sizes[index],
+            'occupied_rooms': occupied[index].tolist(),
+            'occupancy_rates': np.round(rates[index], 2).tolist(),
+            'average_occupancy_rate': round(float(rates[index].mean()), 2) if nights else 0,
+            'room_revenue': round(float(revenue[index].sum()), 2)
+        })
+    return result
+
+
+def guest_analytics(start_date, end_date, page=1, per_page=10, sort='spent'):
+    """New-guest trend per calendar month plus a paginated guest leaderboard.
+
+    Bookings are aggregated per guest in SQL (GROUP BY user_id) and only the
+    requested page of the leaderboard is ever loaded.
+    """
+    is_guest = (User.is_staff == False) & (User.is_admin == False)  # noqa: E712
+
+    # New guests per calendar month
+    bucket = period_bucket(User.created_at, 'month')
+    signups = dict(db.session.query(bucket, func.count(User.id)).filter(
+        is_guest,
+        User.created_at >= datetime.combine(start_date, datetime.min.time()),
+        User.created_at < datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+    ).group_by(bucket).all())
+    guest_trends = [
+        {'month': start.strftime(PERIOD_LABELS['month']), 'period': start.isoformat(),
+         'new_guests': signups.get(start.isoformat(), 0)}
+        for start in iter_periods(start_date, end_date, 'month')
+    ]
+
+    # Per-guest booking aggregates
+    per_guest = db.session.query(
+        Booking.user_id.label('user_id'),
+        func.count(Booking.id).label('total_bookings'),
+        func.coalesce(func.sum(case((Booking.status == 'confirmed', Booking.total_price), else_=0.0)), 0.0)
+            .label('total_spent'),
+        func.max(Booking.created_at).label('last_booking_at')
+    ).group_by(Booking.user_id).subquery()
+
+    guests_with_bookings, repeat_guests, avg_bookings = db.session.query(
+        func.count(per_guest.c.user_id),
+        func.coalesce(func.sum(case((per_guest.c.total_bookings > 1, 1), else_=0)), 0),
+        func.avg(per_guest.c.total_bookings)
+    ).join(User, User.id == per_guest.c.user_id).filter(is_guest).one()
+
+    if sort == 'bookings':
+        order = (per_guest.c.total_bookings.desc(), per_guest.c.total_spent.desc())
+    else:
+        order = (per_guest.c.total_spent.desc(), per_guest.c.total_bookings.desc())
+    rows = db.session.query(
+        User.id, User.username, User.email,
+        per_guest.c.total_bookings, per_guest.c.total_spent, per_guest.c.last_booking_at
+    ).join(per_guest, User.id == per_guest.c.user_id).filter(is_guest) \
+        .order_by(*order, User.id) \
+        .offset((page - 1) * per_page).limit(per_page).all()
+
+    top_guests = [
+        {
+            'guest_id': guest_id,
+            'guest_name': username,
+            'email': email,
+            'total_bookings': total_bookings,
+            'total_spent': float(total_spent),
+            'last_booking_at': last_booking_at.isoformat() if last_booking_at else None
+        }
+        for guest_id, username, email, total_bookings, total_spent, last_booking_at in rows
+    ]
+
+    return {
+        'guest_trends': guest_trends,
+        'top_guests': top_guests,
+        'booking_frequency': {
+            'guests_with_bookings': guests_with_bookings,
+            'repeat_guests': int(repeat_guests),
+            'average_bookings_per_guest': round(float(avg_bookings or 0), 2)
+        },
+        'page': page,
+        'per_page': per_page,
+        'total': guests_with_bookings,
+        'pages': (guests_with_bookings + per_page - 1) // per_page
+    }
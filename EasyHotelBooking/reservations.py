@@ -0,0 +1,252 @@
+"""
+Room Reservations
+The room_night table is the room inventory ledger: one row per night a
+blocking booking holds a room, with the share of the booking's price earned
+that night. Its unique (room_id, night) key lets the database itself reject a
+second booking for the same room and night. The check is atomic in every
+worker and needs no application lock: on PostgreSQL a concurrent insert of
+the same key waits for the first transaction and then fails, and SQLite
+serializes writers.
+
+The rows are kept in sync by a before_flush hook, so every path that creates,
+cancels or edits a booking (API, web checkout, walk-in, staff actions)
+reserves or releases nights in the same transaction. Booking paths call
+:func:`reserve_booking` so a lost race surfaces as :class:`RoomUnavailable`
+instead of a raw IntegrityError. Single-room availability is an indexed range
+lookup on the ledger (:func:`is_room_free`); occupancy and room revenue
+reports count and sum its rows per night.
+
+Usage:
+    flask --app app rebuild-room-nights             # regenerate from bookings
+    flask --app app rebuild-room-nights --dry-run   # only report conflicts
+
+Run the rebuild once after deploying the ledger (and after restoring bookings
+from a backup); nothing backfills it at startup. Until it has run, availability
+checks fall back to overlapping bookings (:func:`ledger_ready`).
+"""
+
+from datetime import date, timedelta
+
+import click
+from sqlalchemy import delete, event, exists, insert, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import Booking, RoomNight
+from availability import NON_BLOCKING_STATUSES, parse_room_id
+
+# Booking fields that decide which nights it holds and what they earn
+RESERVATION_FIELDS = ('room_id', 'check_in_date', 'check_out_date', 'status', 'total_price')
+
+# Ledger rows inserted per statement during a rebuild
+REBUILD_BATCH_SIZE = 1000
+
+_ledger_ready = False
+_ledger_warned = False
+
+
+class RoomUnavailable(Exception):
+    """The room is already reserved for at least one of the requested nights"""
+
+
+def stay_nights(check_in, check_out):
+    """Nights of a stay: check-in day up to, not including, check-out day"""
+    return [check_in + timedelta(days=offset) for offset in range((check_out - check_in).days)]
+
+
+def night_rates(total_price, nights):
+    """Split ``total_price`` over ``nights`` in whole cents; the rates add up to the total exactly"""
+    if nights <= 0:
+        return []
+    base, remainder = divmod(int(round((total_price or 0) * 100)), nights)
+    return [(base + (1 if offset < remainder else 0)) / 100 for offset in range(nights)]
+
+
+def wanted_nights(booking):
+    """{(room_id, night): rate} the booking should hold in its current state"""
+    room_id = parse_room_id(booking.room_id)
+    if booking.status in NON_BLOCKING_STATUSES or room_id is None \
+            or not booking.check_in_date or not booking.check_out_date:
+        return {}
+    nights = stay_nights(booking.check_in_date, booking.check_out_date)
+    rates = night_rates(booking.total_price, len(nights))
+    return {(room_id, night): rate for night, rate in zip(nights, rates)}
+
+
+def sync_room_nights(booking, session):
+    """Add, update and remove RoomNight rows so they match the booking.
+
+    Nights the booking gives up are deleted at once with a statement. The unit
+    of work would insert new rows before deleting old ones, so a night another
+    booking takes over in the same flush would trip the (room_id, night) key.
+    """
+    wanted = wanted_nights(booking)
+    held = set()
+    stale = []
+    for room_night in list(booking.room_nights):
+        key = (room_night.room_id, room_night.night)
+        if key in wanted:
+            held.add(key)
+            if room_night.rate != wanted[key]:
+                room_night.rate = wanted[key]
+        elif room_night.id is None:
+            booking.room_nights.remove(room_night)
+        else:
+            stale.append(room_night)
+    if stale:
+        session.execute(delete(RoomNight).where(RoomNight.id.in_([room_night.id for room_night in stale])),
+                        execution_options={'synchronize_session': False})
+        for room_night in stale:
+            session.expunge(room_night)
+        # Reloaded on the next access, without the deleted rows
+        session.expire(booking, ['room_nights'])
+    for room_id, night in sorted(set(wanted) - held):
+        booking.room_nights.append(RoomNight(room_id=room_id, night=night, rate=wanted[(room_id, night)]))
+
+
+def ledger_ready():
+    """True when every current blocking booking holds its nights in the ledger.
+
+    Until then (an upgraded database before ``rebuild-room-nights`` has run)
+    availability checks fall back to overlapping Booking rows, so the guard
+    never fails open. Once true it stays true for the process: the flush hook
+    keeps the ledger complete from then on.
+    """
+    global _ledger_ready, _ledger_warned
+    if not _ledger_ready:
+        # Pending bookings in the session are not part of the question
+        with db.session.no_autoflush:
+            unledgered = db.session.query(Booking.id).filter(
+                Booking.status.notin_(NON_BLOCKING_STATUSES),
+                Booking.check_out_date > date.today(),
+                Booking.check_out_date > Booking.check_in_date,
+                ~exists().where(RoomNight.booking_id == Booking.id)
+            ).first()
+        _ledger_ready = unledgered is None
+        if not _ledger_ready and not _ledger_warned:
+            _ledger_warned = True
+            print("⚠️ Room-night ledger is incomplete; checking availability against bookings until "
+                  "`flask --app app rebuild-room-nights` has run")
+    return _ledger_ready
+
+
+def _overlapping_booking(room_id, check_in, check_out, exclude_booking_id=None):
+    query = db.session.query(Booking.id).filter(
+        Booking.room_id == room_id,
+        Booking.status.notin_(NON_BLOCKING_STATUSES),
+        Booking.check_in_date < check_out,
+        Booking.check_out_date > check_in
+    )
+    if exclude_booking_id is not None:
+        query = query.filter(Booking.id != exclude_booking_id)
+    with db.session.no_autoflush:
+        return query.first()
+
+
+def is_room_free(room_id, check_in, check_out, exclude_booking_id=None):
+    """True when no night of [check_in, check_out) is held; one lookup on the (room_id, night) key"""
+    if not ledger_ready():
+        return _overlapping_booking(room_id, check_in, check_out, exclude_booking_id) is None
+    query = db.session.query(RoomNight.id).filter(
+        RoomNight.room_id == room_id,
+        RoomNight.night >= check_in,
+        RoomNight.night < check_out
+    )
+    if exclude_booking_id is not None:
+        query = query.filter(RoomNight.booking_id != exclude_booking_id)
+    return query.first() is None
+
+
+def is_room_night_conflict(error):
+    return 'room_night' in str(getattr(error, 'orig', error)).lower()
+
+
+def reserve_booking(booking):
+    """Add ``booking`` and flush, holding its nights. Raises RoomUnavailable on a clash.
+
+    The session is rolled back on a clash; the caller commits on success.
+    """
+    if not ledger_ready() and booking.status not in NON_BLOCKING_STATUSES and \
+            _overlapping_booking(parse_room_id(booking.room_id), booking.check_in_date, booking.check_out_date,
+                                 booking.id) is not None:
+        db.session.rollback()
+        raise RoomUnavailable()
+    db.session.add(booking)
+    try:
+        db.session.flush()
+    except IntegrityError as e:
+        db.session.rollback()
+        if is_room_night_conflict(e):
+            raise RoomUnavailable() from e
+        raise
+
+
+def rebuild_room_nights(dry_run=False, batch_size=REBUILD_BATCH_SIZE):
+    """Regenerate the whole ledger from bookings in one transaction.
+
+    Bookings are replayed in id order, so when legacy data holds overlapping
+    bookings the earliest one keeps the night; each clash is reported as a
+    conflict and left for staff to resolve. Returns a summary dict.
+    """
+    summary = {'bookings': 0, 'nights': 0, 'conflicts': []}
+    holders = {}
+    rows = []
+    bookings = db.session.query(
+        Booking.id, Booking.room_id, Booking.check_in_date, Booking.check_out_date,
+        Booking.status, Booking.total_price
+    ).order_by(Booking.id).yield_per(batch_size)
+    for booking in bookings:
+        wanted = wanted_nights(booking)
+        if not wanted:
+            continue
+        summary['bookings'] += 1
+        for (room_id, night), rate in sorted(wanted.items()):
+            if (room_id, night) in holders:
+                summary['conflicts'].append({
+                    'booking_id': booking.id,
+                    'room_id': room_id,
+                    'night': night.isoformat(),
+                    'held_by': holders[(room_id, night)]
+                })
+                continue
+            holders[(room_id, night)] = booking.id
+            rows.append({'room_id': room_id, 'night': night, 'booking_id': booking.id, 'rate': rate})
+    summary['nights'] = len(rows)
+
+    if dry_run:
+        return summary
+    try:
+        RoomNight.query.delete(synchronize_session=False)
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(insert(RoomNight), rows[start:start + batch_size])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return summary
+
+
+def init_reservations(app):
+    """Register the ledger rebuild command"""
+
+    @app.cli.command('rebuild-room-nights')
+    @click.option('--dry-run', is_flag=True, help='Report conflicts without rewriting the ledger')
+    def rebuild_room_nights_command(dry_run):
+        """Regenerate the room_night ledger from bookings"""
+        summary = rebuild_room_nights(dry_run=dry_run)
+        click.echo(f"{summary['nights']} night(s) from {summary['bookings']} booking(s)"
+                   f"{' (dry run)' if dry_run else ''}")
+        for conflict in summary['conflicts']:
+            click.echo(f"  conflict: booking {conflict['booking_id']} room {conflict['room_id']} "
+                       f"night {conflict['night']} already held by booking {conflict['held_by']}")
+
+
+@event.listens_for(Session, 'before_flush')
+def _sync_reservations(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Booking):
+            continue
+        state = inspect(obj)
+        if state.pending or any(state.attrs[field].history.has_changes() for field in RESERVATION_FIELDS):
+            sync_room_nights(obj, session)
@@ -0,0 +1,209 @@
+"""
+Daily Report Rollups
+Materializes one DailyReport row per day from bookings, check-ins/outs,
+security incidents, work orders, attendance and ratings so dashboards and
+revenue charts can read pre-aggregated rows instead of transactional tables.
+
+Every metric is computed for a whole date range with one GROUP BY day query,
+so a backfill of several years costs the same handful of queries as a single
+day. Only completed days (up to yesterday) are rolled up, so readers can treat
+every row as final; recent days are still recomputed on every run to pick up
+late changes such as cancellations or confirmations.
+
+Usage:
+    flask --app app rollup-daily-reports              # incremental
+    flask --app app rollup-daily-reports --start 2024-01-01 --end 2024-12-31
+
+Set DAILY_ROLLUP_INTERVAL (seconds) to also run the incremental rollup from a
+background thread. Overlapping runs (several processes, or the CLI during a
+scheduled run) are safe: report_date is unique and rows are updated in place.
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import (Booking, CheckInOut, SecurityIncident, WorkOrder, Attendance, Rating,
+                    DailyReport, User)
+import reports
+
+# Days before today that are recomputed on every incremental run
+LOOKBACK_DAYS = int(os.environ.get('ROLLUP_LOOKBACK_DAYS', 7))
+
+
+def _day_counts(column, start_date, end_date, *criteria, value=None):
+    """``{'YYYY-MM-DD': aggregate}`` for rows whose ``column`` falls on a day in the range"""
+    bucket = reports.period_bucket(column, 'day')
+    aggregate = func.count() if value is None else value
+    return dict(db.session.query(bucket, aggregate).filter(
+        column >= datetime.combine(start_date, datetime.min.time()),
+        column < datetime.combine(end_date + timedelta(days=1), datetime.min.time()),
+        *criteria
+    ).group_by(bucket).all())
+
+
+def compute_daily_metrics(start_date, end_date):
+    """Compute DailyReport values for every day in [start_date, end_date]"""
+    days = (end_date - start_date).days + 1
+
+    bookings_bucket = reports.period_bucket(Booking.created_at, 'day')
+    booking_rows = db.session.query(
+        bookings_bucket,
+        func.count(Booking.id),
+        func.coalesce(func.sum(case((Booking.status == 'cancelled', 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Booking.status == 'confirmed', Booking.total_price), else_=0.0)), 0.0)
+    ).filter(
+        Booking.created_at >= datetime.combine(start_date, datetime.min.time()),
+        Booking.created_at < datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+    ).group_by(bookings_bucket).all()
+    bookings = {day: (count, cancelled, revenue) for day, count, cancelled, revenue in booking_rows}
+
+    checkins = _day_counts(CheckInOut.action_time, start_date, end_date, CheckInOut.action_type == 'check_in')
+    checkouts = _day_counts(CheckInOut.action_time, start_date, end_date, CheckInOut.action_type == 'check_out')
+    incidents = _day_counts(SecurityIncident.incident_time, start_date, end_date)
+    work_orders = _day_counts(WorkOrder.created_at, start_date, end_date)
+    ratings = _day_counts(Rating.created_at, start_date, end_date, value=func.avg(Rating.overall_rating))
+
+    # Attendance.date is a plain date column
+    attendance = dict(db.session.query(Attendance.date, func.count(func.distinct(Attendance.user_id))).filter(
+        Attendance.date >= start_date,
+        Attendance.date <= end_date
+    ).group_by(Attendance.date).all())
+    active_staff = db.session.query(func.count(User.id)).filter(
+        User.is_staff == True,  # noqa: E712
+        User.staff_status == 'active'
+    ).scalar()
+
+    occupancy = reports.occupancy_report(start_date, end_date)['occupancy_data']
+
+    metrics = {}
+    for offset in range(days):
+        day = start_date + timedelta(days=offset)
+        key = day.isoformat()
+        new_bookings, cancelled, revenue = bookings.get(key, (0, 0, 0.0))
+        present = attendance.get(day, 0)
+        metrics[day] = {
+            'total_revenue': float(revenue),
+            'occupancy_rate': occupancy[offset]['occupancy_rate'],
+            'new_bookings': new_bookings,
+            'cancelled_bookings': int(cancelled),
+            'checkins': checkins.get(key, 0),
+            'checkouts': checkouts.get(key, 0),
+            'maintenance_requests': work_orders.get(key, 0),
+            'security_incidents': incidents.get(key, 0),
+            'staff_attendance': round(present / active_staff * 100, 2) if active_staff else 0.0,
+            'guest_satisfaction': round(float(ratings[key]), 2) if ratings.get(key) is not None else 0.0
+        }
+    return metrics
+
+
+def last_complete_day(today=None):
+    return (today or datetime.now().date()) - timedelta(days=1)
+
+
+def _write_rollups(metrics):
+    existing = {
+        row.report_date: row
+        for row in DailyReport.query.filter(DailyReport.report_date.in_(list(metrics)))
+    }
+    new_rows = []
+    for day, values in metrics.items():
+        row = existing.get(day)
+        if row is None:
+            new_rows.append(dict(values, report_date=day))
+        else:
+            for column, value in values.items():
+                setattr(row, column, value)
+    if new_rows:
+        db.session.bulk_insert_mappings(DailyReport, new_rows)
+    db.session.commit()
+
+
+def rollup_range(start_date, end_date, today=None):
+    """Write DailyReport rows for [start_date, end_date] in one transaction.
+
+    Days from today on are skipped: their totals are still changing. Existing
+    rows are updated in place; when a concurrent run inserted some of the same
+    days first (report_date is unique), the write is retried as an update.
+    """
+    end_date = min(end_date, last_complete_day(today))
+    if end_date < start_date:
+        return 0
+    metrics = compute_daily_metrics(start_date, end_date)
+    try:
+        _write_rollups(metrics)
+    except IntegrityError:
+        db.session.rollback()
+        _write_rollups(metrics)
+    return len(metrics)
+
+
+def latest_rollup_date():
+    return db.session.query(func.max(DailyReport.report_date)).scalar()
+
+
+def rollup_incremental(today=None):
+    """Roll up every completed day since the last run, always including the lookback window"""
+    today = today or datetime.now().date()
+    end_date = last_complete_day(today)
+    start_date = today - timedelta(days=LOOKBACK_DAYS)
+    latest = latest_rollup_date()
+    if latest is None:
+        # First run: backfill from the oldest booking
+        first = db.session.query(func.min(Booking.created_at)).scalar()
+        if first is not None:
+            start_date = min(start_date, first.date())
+    elif latest + timedelta(days=1) < start_date:
+        start_date = latest + timedelta(days=1)
+    return start_date, end_date, rollup_range(start_date, end_date, today)
+
+
+# Scheduler -----------------------------------------------------------------
+
+def start_scheduler(app, interval):
+    """Run the incremental rollup every ``interval`` seconds on a daemon thread"""
+    def run():
+        with app.app_context():
+            try:
+                start_date, end_date, days = rollup_incremental()
+                print(f"Daily rollup refreshed {days} day(s) from {start_date} to {end_date}")
+            except Exception as e:
+                db.session.rollback()
+                print(f"Daily rollup failed: {str(e)}")
+            finally:
+                db.session.remove()
+        timer = threading.Timer(interval, run)
+        timer.daemon = True
+        timer.start()
+
+    timer = threading.Timer(interval, run)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+def init_rollups(app):
+    """Register the rollup CLI command and start the scheduler when configured"""
+
+    @app.cli.command('rollup-daily-reports')
+    @click.option('--start', 'start', help='First day to roll up (YYYY-MM-DD)')
+    @click.option('--end', 'end', help='Last day to roll up (YYYY-MM-DD), at most and by default yesterday')
+    def rollup_daily_reports(start, end):
+        """Materialize DailyReport rows (incremental unless --start is given)"""
+        if start:
+            start_date = datetime.strptime(start, '%Y-%m-%d').date()
+            end_date = datetime.strptime(end, '%Y-%m-%d').date() if end else last_complete_day()
+            end_date = min(end_date, last_complete_day())
+            days = rollup_range(start_date, end_date)
+        else:
+            start_date, end_date, days = rollup_incremental()
+        click.echo(f"Rolled up {days} day(s) from {start_date} to {end_date}")
+
+    interval = os.environ.get('DAILY_ROLLUP_INTERVAL')
+    if interval:
+        start_scheduler(app, float(interval))
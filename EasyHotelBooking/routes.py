@@ -6,23 +6,22 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from app import app
 from extensions import db, login_manager
 from models import User, Room, Amenity, Booking, BookingAmenity, Rating, Notification, Attendance, LeaveRequest, Payroll
+from availability import availability_index, parse_room_id
+from reservations import reserve_booking, is_room_free, RoomUnavailable
+from cache import report_cache, catalogue_response
+import reports
+from payroll import generate_payroll, pay_rate_resolver
+from ratelimit import login_retry_after
+from pagination import keyset_page, InvalidCursor
+from sqlalchemy.orm import joinedload
+from tasks import (send_signup_verification_email, send_staff_code_email, send_walkin_account_email,
+                   send_password_reset_email, signup_code)
 import re
 import random
-import smtplib
-from email.mime.text import MIMEText
 from flask_dance.contrib.google import make_google_blueprint, google
 import os
 from werkzeug.utils import secure_filename
-from flask_mail import Message
 import secrets
-from flask_mail import Mail
-
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = 'hoteleasy244@gmail.com'
-app.config['MAIL_PASSWORD'] = 'jler dwhq hzms pzom'
-mail = Mail(app)
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -51,6 +50,10 @@ def login():
         email = request.form.get('email')
         password = request.form.get('password')
         
+        if login_retry_after(request.remote_addr, email):
+            flash('Too many login attempts. Please wait a minute and try again.', 'danger')
+            return render_template('login.html'), 429
+        
         user = User.query.filter_by(email=email).first()
         
         # Prevent admin from logging in via user login
@@ -59,6 +62,7 @@ def login():
             return render_template('login.html')
         
         if user and user.check_password(password):
+            db.session.commit()
             login_user(user)
             if user.is_admin:
                 return redirect(url_for('admin_dashboard'))
@@ -80,9 +84,14 @@ def admin_login():
         email = request.form.get('email')
         password = request.form.get('password')
         
+        if login_retry_after(request.remote_addr, email):
+            flash('Too many login attempts. Please wait a minute and try again.', 'danger')
+            return render_template('admin_login.html'), 429
+        
         user = User.query.filter_by(email=email).first()
         
         if user and user.check_password(password) and user.is_admin:
+            db.session.commit()
             login_user(user)
             return redirect(url_for('admin_dashboard'))
         else:
@@ -105,7 +114,9 @@ def register():
         
         # If we're verifying the code
         if verification_code:
-            if verification_code == session.get('email_verification'):
+            if session.get('email_verification') and \
+                    verification_code == signup_code(session.get('email_verification_email', ''),
+                                                     session['email_verification']):
                 user_data = session.pop('pending_user')
                 new_user = User(username=user_data['username'], email=user_data['email'], phone_number=user_data['phone_number'])
                 new_user.set_password(user_data['password'])
@@ -154,9 +165,9 @@ def register():
             flash('Username or email already exists', 'danger')
             return render_template('register.html')
         
-        # Generate and send verification code
-        code = str(random.randint(100000, 999999))
-        session['email_verification'] = code
+        # Send a verification code; the session and the job only hold the nonce it is derived from
+        nonce = secrets.token_urlsafe(16)
+        session['email_verification'] = nonce
         session['email_verification_email'] = email
         session['pending_user'] = {
             'username': username,
@@ -165,39 +176,60 @@ def register():
             'phone_number': phone_number
         }
         
-        # Send verification email
-        try:
-            msg = MIMEText(f'''
-            Welcome to Easy Hotel!
-            
-            Your verification code is: {code}
-            
-            Please enter this code to complete your registration.
-            
-            If you did not request this registration, please ignore this email.
-            
-            Best regards,
-            Easy Hotel Team
-            ''')
-            msg['Subject'] = 'Easy Hotel - Email Verification'
-            msg['From'] = 'no-reply@easyhotel.com'
-            msg['To'] = email
-            
-            with smtplib.SMTP('smtp.gmail.com', 587) as server:
-                server.starttls()
-                server.login('hoteleasy244@gmail.com', 'jler dwhq hzms pzom')
-                server.sendmail('no-reply@easyhotel.com', [email], msg.as_string())
-            
-            flash('Verification code has been sent to your email. Please check your inbox.', 'info')
-            return render_template('register.html', require_code=True, email=email)
-            
-        except Exception as e:
-            print(f"Email error: {str(e)}")  # For debugging
-            flash('Failed to send verification email. Please try again later.', 'danger')
-            return render_template('register.html')
+        # Send verification email in the background
+        send_signup_verification_email.delay(email, nonce)
+        db.session.commit()
+        
+        flash('Verification code has been sent to your email. Please check your inbox.', 'info')
+        return render_template('register.html', require_code=True, email=email)
     
     return render_template('register.html')
 
+@app.route('/forgot-password', methods=['GET', 'POST'])
+def forgot_password():
+    if request.method == 'POST':
+        email = request.form.get('email')
+        user = User.query.filter_by(email=email).first() if email else None
+        if user:
+            user.verification_code = str(random.randint(100000, 999999))
+            # Send reset email in the background; the job commits with the reset code
+            send_password_reset_email.delay(user.id)
+            db.session.commit()
+        # Don't reveal if email exists or not for security
+        flash('If an account with this email exists, a password reset code has been sent.', 'info')
+        return redirect(url_for('set_password', email=email))
+    return render_template('forgot_password.html')
+
+@app.route('/set-password', methods=['GET', 'POST'])
+def set_password():
+    """Choose a new password with an emailed code (password reset or walk-in account)"""
+    email = request.values.get('email', '')
+    if request.method == 'POST':
+        code = request.form.get('code')
+        password = request.form.get('password')
+        confirm_password = request.form.get('confirm_password')
+        
+        if not re.match(r'^(?=.*\d).{8,}$', password or ''):
+            flash('Password must be at least 8 characters and include a number.', 'danger')
+            return render_template('set_password.html', email=email)
+        
+        if password != confirm_password:
+            flash('Passwords do not match', 'danger')
+            return render_template('set_password.html', email=email)
+        
+        user = User.query.filter_by(email=email, verification_code=code).first() if email and code else None
+        if not user:
+            flash('Invalid code or email address.', 'danger')
+            return render_template('set_password.html', email=email)
+        
+        user.set_password(password)
+        user.verification_code = None
+        db.session.commit()
+        flash('Your password has been set. Please log in.', 'success')
+        return redirect(url_for('login'))
+    
+    return render_template('set_password.html', email=email)
+
 @app.route('/logout')
 @login_required
 def logout():
@@ -228,15 +260,39 @@ def dashboard():
     else:
         return redirect(url_for('bookings'))
 
+# Bookings per list on the admin dashboard
+DASHBOARD_PAGE_SIZE = 25
+
 @app.route('/admin/dashboard')
 @login_required
 def admin_dashboard():
     if not current_user.is_admin:
         return redirect(url_for('dashboard'))
         
-    pending_bookings = Booking.query.filter_by(status='pending').all()
-    confirmed_bookings = Booking.query.filter_by(status='confirmed').all()
-    cancelled_bookings = Booking.query.filter_by(status='cancelled').all()
+    # Each list is a keyset page (newest first) with its own cursor in the query string
+    booking_pages = {}
+    for status in ('pending', 'confirmed', 'cancelled'):
+        query = Booking.query.options(joinedload(Booking.room), joinedload(Booking.user)).filter_by(status=status)
+        cursor = request.args.get(f'{status}_cursor')
+        try:
+            booking_pages[status] = keyset_page(query, (Booking.created_at, Booking.id), cursor, DASHBOARD_PAGE_SIZE)
+        except InvalidCursor:
+            # A stale or mangled link starts the list from the top
+            booking_pages[status] = keyset_page(query, (Booking.created_at, Booking.id), None, DASHBOARD_PAGE_SIZE)
+    pending_bookings = booking_pages['pending'][0]
+    confirmed_bookings = booking_pages['confirmed'][0]
+    cancelled_bookings = booking_pages['cancelled'][0]
+    next_cursors = {status: page[1] for status, page in booking_pages.items()}
+    
+    # Totals per status (and who cancelled) in one grouped query
+    booking_counts = {'pending': 0, 'confirmed': 0, 'cancelled': 0, 'cancelled_user': 0, 'cancelled_admin': 0}
+    for status, cancelled_by, count in db.session.query(
+        Booking.status, Booking.cancelled_by, db.func.count(Booking.id)
+    ).group_by(Booking.status, Booking.cancelled_by).all():
+        if status in booking_counts:
+            booking_counts[status] += count
+        if status == 'cancelled' and cancelled_by in ('user', 'admin'):
+            booking_counts[f'cancelled_{cancelled_by}'] += count
     recent_ratings = Rating.query.order_by(Rating.created_at.desc()).limit(10).all()
     
     # Calculate total revenue from confirmed bookings
@@ -246,6 +302,8 @@ def admin_dashboard():
                           pending_bookings=pending_bookings,
                           confirmed_bookings=confirmed_bookings,
                           cancelled_bookings=cancelled_bookings,
+                          booking_counts=booking_counts,
+                          next_cursors=next_cursors,
                           recent_ratings=recent_ratings,
                           total_revenue=total_revenue)
 
@@ -269,13 +327,7 @@ def booking():
         room = Room.query.get(room_id)
         
         # Check if room is available for the selected dates
-        existing_bookings = Booking.query.filter_by(room_id=room_id).filter(
-            ((Booking.check_in_date <= check_in_date) & (Booking.check_out_date >= check_in_date)) |
-            ((Booking.check_in_date <= check_out_date) & (Booking.check_out_date >= check_out_date)) |
-            ((Booking.check_in_date >= check_in_date) & (Booking.check_out_date <= check_out_date))
-        ).filter(Booking.status != 'cancelled').count()
-        
-        if existing_bookings > 0:
+        if not is_room_free(room.id, check_in_date, check_out_date):
             flash('Room is not available for the selected dates', 'danger')
             return redirect(url_for('booking'))
             
@@ -352,8 +404,12 @@ def checkout():
             status='pending'
         )
         
-        db.session.add(new_booking)
-        db.session.flush()  # Get the booking ID
+        # Holds the room's nights; fails if someone else booked them since the booking step
+        try:
+            reserve_booking(new_booking)
+        except RoomUnavailable:
+            flash('Sorry, this room was just booked for the selected dates. Please choose other dates or another room.', 'danger')
+            return redirect(url_for('booking'))
         
         # Add booking amenities
         for amenity_data in booking_data['amenities']:
@@ -553,24 +609,7 @@ def reply_to_rating(rating_id):
     return redirect(url_for('admin_dashboard'))
 
 # API Routes for AJAX
-@app.route('/api/rooms')
-def api_rooms():
-    rooms = Room.query.all()
-    room_list = []
-    
-    for room in rooms:
-        # Debug information about the room
-        print(f"Processing room for API: {room.name}, Image URL: {room.image_url}")
-        room_list.append({
-            'id': room.id,
-            'name': room.name,
-            'description': room.description,
-            'price_per_night': room.price_per_night,
-            'capacity': room.capacity,
-            'image_url': room.image_url
-        })
-    
-    return jsonify(room_list)
+# /api/rooms is served by the API blueprint (api_routes.get_rooms)
 
 @app.route('/debug/images')
 def debug_images():
@@ -593,6 +632,9 @@ def debug_api_rooms():
 
 @app.route('/api/amenities')
 def api_amenities():
+    return catalogue_response('legacy_amenities', _load_legacy_amenities)
+
+def _load_legacy_amenities():
     amenities = Amenity.query.all()
     amenity_list = []
     
@@ -604,7 +646,7 @@ def api_amenities():
             'price': amenity.price
         })
     
-    return jsonify(amenity_list)
+    return amenity_list
 
 @app.route('/api/check_availability')
 def check_availability():
@@ -621,16 +663,16 @@ def check_availability():
     except ValueError:
         return jsonify({'available': False, 'message': 'Invalid date format'})
     
+    room_id = parse_room_id(room_id)
+    if room_id is None:
+        return jsonify({'available': False, 'message': 'Invalid room_id'})
+    
     # Check if room is available for the selected dates
-    existing_bookings = Booking.query.filter_by(room_id=room_id).filter(
-        ((Booking.check_in_date <= check_in_date) & (Booking.check_out_date >= check_in_date)) |
-        ((Booking.check_in_date <= check_out_date) & (Booking.check_out_date >= check_out_date)) |
-        ((Booking.check_in_date >= check_in_date) & (Booking.check_out_date <= check_out_date))
-    ).filter(Booking.status != 'cancelled').count()
+    available = is_room_free(room_id, check_in_date, check_out_date)
     
     return jsonify({
-        'available': existing_bookings == 0,
-        'message': 'Room available' if existing_bookings == 0 else 'Room not available for selected dates'
+        'available': available,
+        'message': 'Room available' if available else 'Room not available for selected dates'
     })
 
 @app.route('/api/calculate_price')
@@ -715,109 +757,61 @@ def mark_all_notifications_read():
     db.session.commit()
     return jsonify({'success': True})
 
+def _revenue_series_response(granularity, default_periods):
+    if granularity not in reports.GRANULARITIES:
+        return jsonify({'error': f'granularity must be one of: {", ".join(reports.GRANULARITIES)}'}), 400
+    
+    args = request.args
+    if default_periods is None and not args.get('start_date'):
+        # Every year that has bookings
+        first = reports.first_booking_date() or datetime.now().date()
+        args = dict(args, start_date=first.strftime('%Y-%m-%d'))
+    try:
+        start_date, end_date = reports.parse_date_range(args, granularity, default_periods or 1)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    series = report_cache.get_or_load(
+        ('revenue_series', start_date, end_date, granularity),
+        lambda: reports.revenue_series(start_date, end_date, granularity)
+    )
+    return jsonify(series)
+
+@app.route('/api/revenue/series')
+@login_required
+def get_revenue_series():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    # Defaults to the last 12 periods of the requested granularity
+    return _revenue_series_response(request.args.get('granularity', 'month'), 12)
+
 @app.route('/api/revenue/weekly')
 @login_required
 def get_weekly_revenue():
     if not current_user.is_admin:
         return jsonify({'error': 'Unauthorized'}), 403
-        
-    # Get the last 8 weeks of data
-    end_date = datetime.now()
-    start_date = end_date - timedelta(weeks=8)
-    
-    # Query confirmed bookings within the date range
-    bookings = Booking.query.filter(
-        Booking.status == 'confirmed',
-        Booking.created_at >= start_date,
-        Booking.created_at <= end_date
-    ).all()
-    
-    # Group bookings by week
-    weekly_data = {}
-    for booking in bookings:
-        week_start = booking.created_at - timedelta(days=booking.created_at.weekday())
-        week_key = week_start.strftime('%Y-%m-%d')
-        if week_key not in weekly_data:
-            weekly_data[week_key] = 0
-        weekly_data[week_key] += booking.total_price
     
-    # Format data for chart
-    labels = []
-    data = []
-    for week_start in sorted(weekly_data.keys()):
-        labels.append(datetime.strptime(week_start, '%Y-%m-%d').strftime('%b %d'))
-        data.append(weekly_data[week_start])
-    
-    return jsonify({
-        'labels': labels,
-        'data': data
-    })
+    # Last 8 weeks
+    return _revenue_series_response('week', 8)
 
 @app.route('/api/revenue/monthly')
 @login_required
 def get_monthly_revenue():
     if not current_user.is_admin:
         return jsonify({'error': 'Unauthorized'}), 403
-        
-    # Get the last 12 months of data
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=365)
-    
-    # Query confirmed bookings within the date range
-    bookings = Booking.query.filter(
-        Booking.status == 'confirmed',
-        Booking.created_at >= start_date,
-        Booking.created_at <= end_date
-    ).all()
     
-    # Group bookings by month
-    monthly_data = {}
-    for booking in bookings:
-        month_key = booking.created_at.strftime('%Y-%m')
-        if month_key not in monthly_data:
-            monthly_data[month_key] = 0
-        monthly_data[month_key] += booking.total_price
-    
-    # Format data for chart
-    labels = []
-    data = []
-    for month_key in sorted(monthly_data.keys()):
-        labels.append(datetime.strptime(month_key, '%Y-%m').strftime('%b %Y'))
-        data.append(monthly_data[month_key])
-    
-    return jsonify({
-        'labels': labels,
-        'data': data
-    })
+    # Last 12 months
+    return _revenue_series_response('month', 12)
 
 @app.route('/api/revenue/yearly')
 @login_required
 def get_yearly_revenue():
     if not current_user.is_admin:
         return jsonify({'error': 'Unauthorized'}), 403
-        
-    # Get all years of data
-    bookings = Booking.query.filter_by(status='confirmed').all()
-    
-    # Group bookings by year
-    yearly_data = {}
-    for booking in bookings:
-        year_key = booking.created_at.strftime('%Y')
-        if year_key not in yearly_data:
-            yearly_data[year_key] = 0
-        yearly_data[year_key] += booking.total_price
     
-    # Format data for chart
-    labels = []
-    data = []
-    for year_key in sorted(yearly_data.keys()):
-        labels.append(year_key)
-        data.append(yearly_data[year_key])
-    
-    return jsonify({
-        'labels': labels,
-        'data': data
-    })
+    # All years
+    return _revenue_series_response('year', None)
 
 @app.route('/update_profile', methods=['POST'])
 @login_required
@@ -944,7 +938,9 @@ def add_staff():
         verification_code = request.form.get('verification_code')
         email = request.form.get('email')
         if verification_code:
-            if verification_code == session.get('staff_email_verification'):
+            if session.get('staff_email_verification') and \
+                    verification_code == signup_code(session.get('staff_email_verification_email', ''),
+                                                     session['staff_email_verification']):
                 staff_data = session.pop('pending_staff')
                 staff_user = User(
                     username=staff_data['username'],
@@ -989,9 +985,9 @@ def add_staff():
         if not phone_number or not phone_number.isdigit() or len(phone_number) != 11:
             flash('Phone number must be exactly 11 digits and contain only numbers.', 'danger')
             return redirect(url_for('add_staff'))
-        # Generate and send verification code
-        code = str(random.randint(100000, 999999))
-        session['staff_email_verification'] = code
+        # Send a verification code; the session and the job only hold the nonce it is derived from
+        nonce = secrets.token_urlsafe(16)
+        session['staff_email_verification'] = nonce
         session['staff_email_verification_email'] = email
         session['pending_staff'] = {
             'username': username,
@@ -1002,28 +998,9 @@ def add_staff():
             'staff_shift': staff_shift,
             'phone_number': phone_number
         }
-        # Send verification email
-        try:
-            msg = Message('Easy Hotel - Staff Email Verification',
-                          sender='no-reply@easyhotel.com',
-                          recipients=[email])
-            msg.body = f'''
-            Welcome to Easy Hotel Staff!
-
-            Your verification code is: {code}
-
-            Please enter this code to complete your staff registration.
-
-            If you did not request this, please ignore this email.
-
-            Best regards,
-            Easy Hotel Team
-            '''
-            mail.send(msg)
-        except Exception as e:
-            print(f"Email error: {str(e)}")
-            flash('Failed to send verification email. Please try again later.', 'danger')
-            return render_template('add_staff.html')
+        # Send verification email in the background
+        send_staff_code_email.delay(email, nonce)
+        db.session.commit()
         flash('Verification code has been sent to the staff email. Please check the inbox.', 'info')
         return render_template('add_staff.html', require_code=True, email=email)
     return render_template('add_staff.html')
@@ -1258,71 +1235,16 @@ def payroll_management():
             return render_template('payroll_management.html', payrolls=payrolls, show_archived=show_archived)
         period_start = datetime.strptime(period_start, '%Y-%m-%d').date()
         period_end = datetime.strptime(period_end, '%Y-%m-%d').date()
-        staff_list = User.query.filter_by(is_staff=True, staff_status='active').all()
-        for staff in staff_list:
-            # Set hourly and overtime rates based on staff_role
-            if staff.staff_role == 'Front Desk':
-                hourly_rate = 100.0
-                overtime_rate = 100.0 * 1.25
-            elif staff.staff_role == 'Bell Boy':
-                hourly_rate = 90.0
-                overtime_rate = 90.0 * 1.25
-            elif staff.staff_role == 'Housekeeping':
-                hourly_rate = 89.375
-                overtime_rate = 89.375 * 1.25
-            else:
-                hourly_rate = staff.hourly_rate or 0.0
-                overtime_rate = staff.overtime_rate or hourly_rate
-            # Prevent duplicate payrolls
-            existing = Payroll.query.filter_by(
-                staff_id=staff.id,
-                period_start=period_start,
-                period_end=period_end
-            ).first()
-            if existing:
-                continue
-            # Get attendance for this staff in the period
-            attendances = Attendance.query.filter_by(user_id=staff.id, approved=True).filter(
-                Attendance.date >= period_start, Attendance.date <= period_end
-            ).all()
-            total_hours = 0.0
-            overtime_hours = 0.0
-            for att in attendances:
-                if att.clock_in and att.clock_out:
-                    in_dt = datetime.combine(att.date, att.clock_in)
-                    out_dt = datetime.combine(att.date, att.clock_out)
-                    hours = (out_dt - in_dt).total_seconds() / 3600.0
-                    # Overtime: hours above 8 per day
-                    overtime = max(0, hours - 8)
-                    overtime_hours += overtime
-                    total_hours += hours
-            # Calculate pay
-            if staff.salary_type == 'fixed':
-                gross_pay = staff.base_salary
-            else:
-                base_hours = total_hours - overtime_hours
-                gross_pay = (base_hours * hourly_rate) + (overtime_hours * overtime_rate)
-            # Deductions/Bonuses (manual for now)
-            deductions = 0.0
-            bonuses = 0.0
-            net_pay = gross_pay + bonuses - deductions
-            # Create payroll record
-            payroll = Payroll(
-                staff_id=staff.id,
-                period_start=period_start,
-                period_end=period_end,
-                total_hours=total_hours,
-                overtime_hours=overtime_hours,
-                gross_pay=gross_pay,
-                deductions=deductions,
-                bonuses=bonuses,
-                net_pay=net_pay,
-                date_issued=datetime.utcnow(),
-                status='pending'
-            )
-            db.session.add(payroll)
-        db.session.commit()
-        flash('Payroll generated for all staff for the selected period.', 'success')
+        if period_start > period_end:
+            flash('Period start must be on or before period end.', 'danger')
+            return render_template('payroll_management.html', payrolls=payrolls, show_archived=show_archived)
+        if request.form.get('action') == 'preview':
+            # Dry run: show what would be generated without saving
+            preview, _ = generate_payroll(period_start, period_end, dry_run=True)
+            return render_template('payroll_management.html', payrolls=payrolls, show_archived=show_archived,
+                                   preview=preview, period_start=period_start, period_end=period_end)
+        _, created = generate_payroll(period_start, period_end)
+        flash(f'Payroll generated for {created} staff for the selected period.', 'success')
         return redirect(url_for('payroll_management'))
     return render_template('payroll_management.html', payrolls=payrolls, show_archived=show_archived)
 
@@ -1347,7 +1269,7 @@ def fix_staff_roles_and_salary():
         flash('Unauthorized', 'danger')
         return redirect(url_for('index'))
     updated = 0
-    valid_roles = ['Front Desk', 'Bell Boy', 'Housekeeping']
+    valid_roles = pay_rate_resolver().roles or ['Front Desk']
     for staff in User.query.filter_by(is_staff=True).all():
         staff.salary_type = 'hourly'
         if staff.staff_role not in valid_roles:
@@ -1413,8 +1335,6 @@ def walkin_booking():
     from datetime import datetime, date
     import os
     import secrets
-    import smtplib
-    from email.mime.text import MIMEText
     rooms = Room.query.all()
     available_rooms = []
     guest = None
@@ -1448,18 +1368,14 @@ def walkin_booking():
             if not room:
                 error = 'Room not found.'
             else:
-                # Check for overlapping bookings
-                overlapping = Booking.query.filter(
-                    Booking.room_id == room_id,
-                    Booking.status != 'cancelled',
-                    Booking.check_out_date > check_in_date,
-                    Booking.check_in_date < check_out_date
-                ).first()
-                if overlapping:
+                # Check for overlapping bookings in the room-night ledger
+                if not is_room_free(room.id, check_in_date, check_out_date):
                     error = 'Room is not available for the selected dates.'
                 else:
-                    # Create guest (if not exists)
+                    # Create guest (if not exists); the account, booking and email job
+                    # are committed together, so a failed reservation leaves nothing behind
                     guest = User.query.filter_by(email=email).first()
+                    new_guest = False
                     if not guest:
                         # Generate a unique username
                         base_username = name.replace(' ', '').lower() if name else "temp"
@@ -1469,65 +1385,45 @@ def walkin_booking():
                         if username_exists:
                             flash('Username has already exist', 'danger')
                             return render_template('walkin_booking.html', rooms=rooms, available_rooms=available_rooms, error='Username has already exist', now=date.today())
+                        # The guest sets a password with the one-time code (stored like a
+                        # reset code); the random password is never shown to anyone
                         guest = User(username=username, email=email, phone_number=phone)
-                        random_password = secrets.token_urlsafe(10)
-                        verification_code = str(random.randint(100000, 999999))
-                        guest.set_password(random_password)
+                        guest.set_password(secrets.token_urlsafe(16))
+                        guest.verification_code = str(random.randint(100000, 999999))
                         db.session.add(guest)
-                        db.session.commit()
-                        # Send email with password and verification code
-                        try:
-                            msg = MIMEText(f'''
-Welcome to Easy Hotel!
-
-Your walk-in account has been created.
-
-Login Email: {email}
-Password: {random_password}
-
-Please use these credentials to log in and verify your account.
-
-Best regards,\nEasy Hotel Team
-''')
-                            msg['Subject'] = 'Easy Hotel - Walk-in Account Details'
-                            msg['From'] = 'no-reply@easyhotel.com'
-                            msg['To'] = email
-                            with smtplib.SMTP('smtp.gmail.com', 587) as server:
-                                server.starttls()
-                                server.login('hoteleasy244@gmail.com', 'jler dwhq hzms pzom')
-                                server.sendmail('no-reply@easyhotel.com', [email], msg.as_string())
-                        except Exception as e:
-                            print(f"Email error: {str(e)}")
+                        db.session.flush()
+                        new_guest = True
                     # Create booking
                     booking = Booking(
                         user_id=guest.id,
-                        room_id=room_id,
+                        room_id=room.id,
                         check_in_date=check_in_date,
                         check_out_date=check_out_date,
                         guests=1,
                         status='confirmed',
                         total_price=room.price_per_night * (check_out_date - check_in_date).days
                     )
-                    db.session.add(booking)
-                    # Set room status to Occupied
-                    room.status = 'Occupied'
-                    db.session.commit()
-                    return redirect(url_for('walkin_receipt', booking_id=booking.id))
+                    try:
+                        # Rolls back the new guest too when the room was taken meanwhile
+                        reserve_booking(booking)
+                    except RoomUnavailable:
+                        error = 'Room is not available for the selected dates.'
+                    else:
+                        if new_guest:
+                            # Send email with the set-password code
+                            send_walkin_account_email.delay(guest.id)
+                        # Set room status to Occupied
+                        room.status = 'Occupied'
+                        db.session.commit()
+                        return redirect(url_for('walkin_receipt', booking_id=booking.id))
     # For GET or error, show available rooms for selected dates
     check_in = request.args.get('check_in')
     check_out = request.args.get('check_out')
     if check_in and check_out:
         check_in_date = datetime.strptime(check_in, '%Y-%m-%d').date()
         check_out_date = datetime.strptime(check_out, '%Y-%m-%d').date()
-        for room in rooms:
-            overlapping = Booking.query.filter(
-                Booking.room_id == room.id,
-                Booking.status != 'cancelled',
-                Booking.check_out_date > check_in_date,
-                Booking.check_in_date < check_out_date
-            ).first()
-            if not overlapping:
-                available_rooms.append(room)
+        unavailable = availability_index.unavailable_room_ids(check_in_date, check_out_date)
+        available_rooms = [room for room in rooms if room.id not in unavailable]
     return render_template('walkin_booking.html', rooms=rooms, available_rooms=available_rooms, error=error, now=date.today())
 
 @app.route('/walkin_receipt/<int:booking_id>')
@@ -1546,20 +1442,12 @@ def api_available_rooms():
     check_in_date = datetime.strptime(check_in, '%Y-%m-%d').date()
     check_out_date = datetime.strptime(check_out, '%Y-%m-%d').date()
     rooms = Room.query.all()
-    available_rooms = []
-    for room in rooms:
-        overlapping = Booking.query.filter(
-            Booking.room_id == room.id,
-            Booking.status != 'cancelled',
-            Booking.check_out_date > check_in_date,
-            Booking.check_in_date < check_out_date
-        ).first()
-        if not overlapping:
-            available_rooms.append({
-                'id': room.id,
-                'name': room.name,
-                'price_per_night': room.price_per_night
-            })
+    unavailable = availability_index.unavailable_room_ids(check_in_date, check_out_date)
+    available_rooms = [{
+        'id': room.id,
+        'name': room.name,
+        'price_per_night': room.price_per_night
+    } for room in rooms if room.id not in unavailable]
     return jsonify({'success': True, 'rooms': available_rooms})
 
 @app.route('/admin/pos', methods=['GET', 'POST'])
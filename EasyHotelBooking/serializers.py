@@ -0,0 +1,208 @@
+"""
+API Serializers
+Declared JSON shapes for the models the API returns. Each serializer names
+its views (a compact 'list' view for listings, a full 'detail' view for
+single objects); a view's fields are compiled once into getters, with date
+and datetime columns converted to ISO strings.
+
+Relationships are only followed when a view declares them (Nested, or a
+Computed field's ``loads``), and :meth:`Serializer.load_options` derives the
+matching joinedload options from the view, so a listing is one query:
+
+    bookings = Booking.query.options(*booking_serializer.load_options('list')).all()
+    jsonify({'bookings': booking_serializer.dump_many(bookings, 'list')})
+
+When orjson is installed (pip install orjson) :func:`init_serializers` makes
+it the app's JSON encoder. The JSON is equivalent to Flask's default encoder
+(same key order and date format); non-ASCII text is sent as UTF-8 instead of
+\\u escapes.
+"""
+
+from operator import attrgetter
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Date, DateTime, Time, inspect
+from sqlalchemy.orm import joinedload
+
+from models import User, Room, Booking, Notification, Payment
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Nested:
+    """Serialize the related object(s) behind relationship ``name`` with ``view``"""
+
+    def __init__(self, name, view='list', key=None):
+        self.name = name
+        self.view = view
+        self.key = key or name
+
+
+class Computed:
+    """Field computed by ``getter(obj)``; ``loads`` lists the relationship paths it reads ('booking.room')"""
+
+    def __init__(self, key, getter, loads=()):
+        self.key = key
+        self.getter = getter
+        self.loads = tuple(loads)
+
+
+def _isoformat(get):
+    def getter(obj):
+        value = get(obj)
+        return value.isoformat() if value is not None else None
+    return getter
+
+
+class Serializer:
+    """Compiled field sets ('views') for one model"""
+
+    registry = {}
+
+    def __init__(self, model, views):
+        self.model = model
+        self.views = views
+        self._compiled = {}
+        Serializer.registry[model] = self
+
+    def _related(self, name):
+        relationship = inspect(self.model).relationships[name]
+        return relationship, Serializer.registry[relationship.mapper.class_]
+
+    def _compile_field(self, field):
+        if isinstance(field, Computed):
+            return field.key, field.getter
+        if isinstance(field, Nested):
+            relationship, serializer = self._related(field.name)
+            get = attrgetter(field.name)
+            if relationship.uselist:
+                return field.key, lambda obj: serializer.dump_many(get(obj), field.view)
+            return field.key, lambda obj: serializer.dump(get(obj), field.view)
+
+        get = attrgetter(field)
+        column = self.model.__table__.columns.get(field)
+        if column is not None and isinstance(column.type, (Date, DateTime, Time)):
+            return field, _isoformat(get)
+        return field, get
+
+    def compiled(self, view):
+        """(key, getter) pairs for ``view``, compiled on first use"""
+        fields = self._compiled.get(view)
+        if fields is None:
+            fields = self._compiled[view] = tuple(self._compile_field(field) for field in self.views[view])
+        return fields
+
+    def dump(self, obj, view='detail'):
+        if obj is None:
+            return None
+        return {key: get(obj) for key, get in self.compiled(view)}
+
+    def dump_many(self, objs, view='list'):
+        fields = self.compiled(view)
+        return [{key: get(obj) for key, get in fields} for obj in objs]
+
+    def load_paths(self, view):
+        """Relationship paths (tuples of names) that ``view`` reads"""
+        paths = []
+        for field in self.views[view]:
+            if isinstance(field, Nested):
+                _, serializer = self._related(field.name)
+                paths.append((field.name,))
+                paths.extend((field.name,) + path for path in serializer.load_paths(field.view))
+            elif isinstance(field, Computed):
+                paths.extend(tuple(path.split('.')) for path in field.loads)
+        return paths
+
+    def load_options(self, view='list'):
+        """joinedload options that load everything ``view`` serializes in the same query"""
+        paths = set(self.load_paths(view))
+        options = []
+        for path in sorted(paths):
+            # A longer path loads its prefixes too
+            if any(other[:len(path)] == path and other != path for other in paths):
+                continue
+            option = None
+            model = self.model
+            for name in path:
+                attribute = getattr(model, name)
+                option = joinedload(attribute) if option is None else option.joinedload(attribute)
+                model = attribute.property.mapper.class_
+            options.append(option)
+        return options
+
+
+# Views ---------------------------------------------------------------------
+
+USER_FIELDS = ('id', 'username', 'email', 'phone_number', 'is_admin', 'is_staff', 'staff_role',
+               'staff_status', 'staff_shift', 'is_verified', 'created_at')
+
+user_serializer = Serializer(User, {
+    'list': USER_FIELDS,
+    'detail': USER_FIELDS,
+})
+
+ROOM_FIELDS = ('id', 'name', 'description', 'price_per_night', 'capacity', 'image_url')
+
+room_serializer = Serializer(Room, {
+    'list': ROOM_FIELDS,
+    'detail': ROOM_FIELDS,
+})
+
+BOOKING_FIELDS = ('id', 'user_id', 'room_id', 'check_in_date', 'check_out_date', 'guests', 'total_price',
+                  'status', 'cancellation_reason', 'cancelled_by', 'created_at')
+
+# Listings keep the nested room and user shape the API has always returned
+booking_serializer = Serializer(Booking, {
+    'list': BOOKING_FIELDS + (Nested('room', 'list'), Nested('user', 'list')),
+    'detail': BOOKING_FIELDS + (Nested('room', 'detail'), Nested('user', 'detail')),
+})
+
+NOTIFICATION_FIELDS = ('id', 'title', 'message', 'is_read', 'created_at')
+
+notification_serializer = Serializer(Notification, {
+    'list': NOTIFICATION_FIELDS,
+    'detail': NOTIFICATION_FIELDS,
+})
+
+payment_serializer = Serializer(Payment, {
+    'list': ('id', 'booking_id', 'user_id', 'amount', 'payment_method', 'payment_status',
+             'gcash_phone_number', 'created_at', 'paid_at',
+             Computed('user_name', lambda payment: payment.user.username if payment.user else 'Unknown',
+                      loads=('user',)),
+             Computed('booking_room',
+                      lambda payment: payment.booking.room.name if payment.booking and payment.booking.room
+                      else 'Unknown',
+                      loads=('booking.room',))),
+})
+
+
+# JSON encoding -------------------------------------------------------------
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider encoding with orjson; dates, decimals etc. still go through Flask's default"""
+
+    def dumps(self, obj, **kwargs):
+        # response() passes indent=2 or compact separators; anything else goes to the standard encoder
+        indent = kwargs.get('indent')
+        if set(kwargs) - {'indent', 'separators'} or indent not in (None, 2):
+            return super().dumps(obj, **kwargs)
+
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option).decode()
+        except TypeError:
+            # e.g. integers beyond 64 bits; the standard encoder handles or reports them
+            return super().dumps(obj, **kwargs)
+
+
+def init_serializers(app):
+    """Use orjson for JSON responses when it is installed"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
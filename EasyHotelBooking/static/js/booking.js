@@ -31,9 +31,9 @@ document.addEventListener('DOMContentLoaded', function() {
         
         fetch('/api/rooms')
             .then(response => response.json())
-            .then(rooms => {
+            .then(payload => {
                 roomSelect.innerHTML = '';
-                rooms.forEach(room => {
+                payload.data.forEach(room => {
                     const option = document.createElement('option');
                     option.value = room.id;
                     option.textContent = `${room.name} (Max ${room.capacity} guests) - ₱${room.price_per_night}/night`;
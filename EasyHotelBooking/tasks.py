@@ -0,0 +1,183 @@
+"""
+Background Tasks
+Outbound email and payment gateway work, run by the job queue workers.
+Tasks raise on failure so the queue can retry them with backoff.
+
+Job payloads are stored in plain text and copied to the dead-letter table, so
+tasks never take passwords or codes as arguments: they take a user id and
+read the current code when they run. Web sign-ups that have no user row yet
+pass a nonce instead, and the code is derived from it with the app secret
+(:func:`signup_code`).
+"""
+
+import hashlib
+import hmac
+
+from flask import current_app
+
+from extensions import db
+from jobs import task, enqueue
+from mailer import mailer
+from models import User
+
+
+def send_email(to_email, subject, body):
+    """Send a plain-text email through the pooled dispatcher, raising on failure"""
+    mailer.send(to_email, subject, body)
+    print(f"✅ Email sent successfully to {to_email}")
+
+
+@task('email.bulk')
+def send_bulk_email(messages):
+    """Send a list of [to, subject, body] messages over shared SMTP connections.
+
+    Messages that fail are queued again individually so one bad address does
+    not hold back the whole batch.
+    """
+    failures = mailer.send_many([tuple(message) for message in messages])
+    for (to_email, subject, body), error in failures:
+        print(f"Email to {to_email} failed in bulk send: {error}")
+        enqueue('email.single', to_email, subject, body)
+    return len(messages) - len(failures)
+
+
+@task('email.single')
+def send_single_email(to_email, subject, body):
+    """Send one ad-hoc message"""
+    send_email(to_email, subject, body)
+
+
+def signup_code(email, nonce):
+    """Six-digit verification code for a registration kept in the session until it is verified"""
+    digest = hmac.new(current_app.secret_key.encode(), f'{nonce}:{email.strip().lower()}'.encode(),
+                      hashlib.sha256).digest()
+    return f'{int.from_bytes(digest[:8], "big") % 1000000:06d}'
+
+
+def send_verification_code_email(email, verification_code):
+    """Send a registration verification code"""
+    send_email(email, 'Easy Hotel - Email Verification', f'''
+        Welcome to Easy Hotel!
+
+        Your verification code is: {verification_code}
+
+        Please enter this code to complete your registration.
+
+        If you did not request this registration, please ignore this email.
+
+        Best regards,
+        Easy Hotel Team
+        ''')
+
+
+@task('email.verification')
+def send_verification_email(user_id):
+    """Send the verification code of an account awaiting verification"""
+    user = db.session.get(User, user_id)
+    if user is None or user.is_verified or not user.verification_code:
+        return  # Already verified or account removed
+    send_verification_code_email(user.email, user.verification_code)
+
+
+@task('email.signup_verification')
+def send_signup_verification_email(email, nonce):
+    """Send the verification code of a web registration not saved yet"""
+    send_verification_code_email(email, signup_code(email, nonce))
+
+
+@task('email.password_reset')
+def send_password_reset_email(user_id):
+    """Send the user's current password reset code"""
+    user = db.session.get(User, user_id)
+    if user is None or not user.verification_code:
+        return  # Reset already used or account removed
+    send_email(user.email, 'Easy Hotel - Password Reset', f'''
+        Easy Hotel - Password Reset
+
+        You have requested to reset your password.
+
+        Your password reset code is: {user.verification_code}
+
+        Please use this code to reset your password. This code will expire in 1 hour.
+
+        If you did not request this password reset, please ignore this email and your password will remain unchanged.
+
+        Best regards,
+        Easy Hotel Team
+        ''')
+
+
+@task('email.staff_account')
+def send_staff_verification_email(user_id):
+    """Send verification email to new staff member"""
+    staff = db.session.get(User, user_id)
+    if staff is None:
+        return
+    send_email(staff.email, 'Easy Hotel - Staff Account Verification', f'''
+        Welcome to Easy Hotel Staff Team!
+
+        Dear {staff.username},
+
+        Your staff account has been created successfully. To complete your registration, please verify your email address.
+
+        Your verification code is: {staff.verification_code}
+
+        Please provide this code to your administrator to activate your account.
+
+        After verification, sign in with this email address ({staff.email}) and the password your administrator set for you.
+
+        If you have any questions, please contact your administrator.
+
+        Best regards,
+        Easy Hotel Management Team
+        ''')
+
+
+@task('email.staff_verification')
+def send_staff_code_email(email, nonce):
+    """Send the verification code for a staff member added from the admin panel"""
+    code = signup_code(email, nonce)
+    send_email(email, 'Easy Hotel - Staff Email Verification', f'''
+            Welcome to Easy Hotel Staff!
+
+            Your verification code is: {code}
+
+            Please enter this code to complete your staff registration.
+
+            If you did not request this, please ignore this email.
+
+            Best regards,
+            Easy Hotel Team
+            ''')
+
+
+@task('email.walkin_account')
+def send_walkin_account_email(user_id):
+    """Send a one-time set-password code to a guest whose account was created at the front desk"""
+    guest = db.session.get(User, user_id)
+    if guest is None or not guest.verification_code:
+        return  # Password already set or account removed
+    send_email(guest.email, 'Easy Hotel - Walk-in Account Details', f'''
+Welcome to Easy Hotel!
+
+Your walk-in account has been created.
+
+Login Email: {guest.email}
+Set-password code: {guest.verification_code}
+
+To choose your password, open the Easy Hotel website, go to Login and choose
+"Set your password", then enter your email address and this code.
+
+Best regards,\nEasy Hotel Team
+''')
+
+
+@task('payments.verify', max_attempts=8)
+def verify_gcash_payment(payment_id):
+    """Refresh a GCash payment's status from PayMongo"""
+    from payment_service import gcash_service
+
+    result = gcash_service.verify_payment(payment_id)
+    if not result.get('success'):
+        raise RuntimeError(result.get('message', 'Payment verification failed'))
+    return result
@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+import tasks
+from conftest import TEST_EMAIL_DOMAIN
+from extensions import db
+from jobs import work
+from models import Job, User
+from tasks import signup_code
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    sent = []
+    monkeypatch.setattr(tasks, 'send_email', lambda to_email, subject, body: sent.append((to_email, subject, body)))
+    return sent
+
+
+def job_payloads():
+    return [json.loads(job.payload) for job in Job.query.order_by(Job.id)]
+
+
+def test_api_registration_job_carries_only_the_user_id(client, outbox):
+    email = f'newguest{TEST_EMAIL_DOMAIN}'
+    response = client.post('/api/auth/register', json={
+        'username': 'newguest', 'email': email, 'password': 'Password123', 'confirm_password': 'Password123',
+        'phone_number': '09171234567'
+    })
+    assert response.status_code == 200
+    user = User.query.filter_by(email=email).one()
+
+    assert job_payloads() == [{'args': [user.id], 'kwargs': {}}]
+    work(burst=True)
+    assert user.verification_code in outbox[0][2]
+
+
+def test_web_registration_job_carries_no_code(client, outbox):
+    email = f'webguest{TEST_EMAIL_DOMAIN}'
+    response = client.post('/register', data={
+        'username': 'webguest', 'email': email, 'password': 'Password123', 'confirm_password': 'Password123',
+        'phone_number': '09171234567'
+    })
+    assert response.status_code == 200
+    [payload] = job_payloads()
+    work(burst=True)
+    code = outbox[0][2].split('Your verification code is: ')[1].split()[0]
+    assert code not in json.dumps(payload)
+    with client.session_transaction() as session:
+        assert code not in json.dumps(dict(session))
+
+    client.post('/register', data={'email': email, 'verification_code': code})
+    assert User.query.filter_by(email=email).count() == 1
+
+
+def test_web_registration_rejects_a_wrong_code(client, app):
+    email = f'webguest{TEST_EMAIL_DOMAIN}'
+    client.post('/register', data={
+        'username': 'webguest', 'email': email, 'password': 'Password123', 'confirm_password': 'Password123',
+        'phone_number': '09171234567'
+    })
+    [payload] = job_payloads()
+    wrong = f"{(int(signup_code(email, payload['args'][1])) + 1) % 1000000:06d}"
+
+    client.post('/register', data={'email': email, 'verification_code': wrong})
+    assert User.query.filter_by(email=email).count() == 0
+
+
+def test_walkin_code_sets_the_password(client, make_user, outbox):
+    guest = make_user('walkin')
+    guest.verification_code = '482913'
+    tasks.send_walkin_account_email.delay(guest.id)
+    db.session.commit()
+    work(burst=True)
+    assert '482913' in outbox[0][2] and 'Set your password' in outbox[0][2]
+
+    response = client.post('/set-password', data={
+        'email': guest.email, 'code': '482913', 'password': 'Chosen12345', 'confirm_password': 'Chosen12345'
+    })
+    assert response.status_code == 302
+    db.session.refresh(guest)
+    assert guest.check_password('Chosen12345')
+    assert guest.verification_code is None
+
+    # The code is single-use
+    response = client.post('/set-password', data={
+        'email': guest.email, 'code': '482913', 'password': 'Other12345', 'confirm_password': 'Other12345'
+    })
+    assert response.status_code == 200
+    db.session.refresh(guest)
+    assert guest.check_password('Chosen12345')
+
+
+def test_web_forgot_password_sends_a_code_for_set_password(client, make_user, outbox):
+    guest = make_user('forgetful')
+    response = client.post('/forgot-password', data={'email': guest.email})
+    assert response.status_code == 302
+    assert job_payloads() == [{'args': [guest.id], 'kwargs': {}}]
+
+    work(burst=True)
+    db.session.refresh(guest)
+    assert guest.verification_code in outbox[0][2]
+    client.post('/set-password', data={
+        'email': guest.email, 'code': guest.verification_code, 'password': 'Chosen12345',
+        'confirm_password': 'Chosen12345'
+    })
+    db.session.refresh(guest)
+    assert guest.check_password('Chosen12345')
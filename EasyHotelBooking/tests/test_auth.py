@@ -0,0 +1,97 @@
+import time
+
+import auth
+from auth import issue_tokens, revocation_cache
+from conftest import bearer
+from extensions import db
+from models import RevokedToken
+
+
+def refresh(client, refresh_token):
+    return client.post('/api/auth/refresh', json={'refresh_token': refresh_token})
+
+
+def test_logout_revokes_access_and_refresh_tokens(client, guest):
+    tokens = issue_tokens(guest)
+    headers = {'Authorization': f"Bearer {tokens['token']}"}
+    assert client.get('/api/user/profile', headers=headers).status_code == 200
+
+    response = client.post('/api/auth/logout', headers=headers, json={'refresh_token': tokens['refresh_token']})
+    assert response.status_code == 200
+
+    assert client.get('/api/user/profile', headers=headers).status_code == 401
+    assert refresh(client, tokens['refresh_token']).status_code == 401
+
+
+def test_refresh_rotates_the_refresh_token(client, guest):
+    tokens = issue_tokens(guest)
+
+    response = refresh(client, tokens['refresh_token'])
+    assert response.status_code == 200
+    renewed = response.get_json()
+    assert renewed['refresh_token'] != tokens['refresh_token']
+    assert client.get('/api/user/profile',
+                      headers={'Authorization': f"Bearer {renewed['token']}"}).status_code == 200
+
+    # A used refresh token cannot be exchanged again
+    assert refresh(client, tokens['refresh_token']).status_code == 401
+    assert refresh(client, renewed['refresh_token']).status_code == 200
+
+
+def test_refresh_token_is_single_use_without_the_revocation_cache(client, guest, monkeypatch):
+    # Two workers racing with the same token both miss the revocation in their
+    # cache; the unique jti still lets only one of them through
+    tokens = issue_tokens(guest)
+    monkeypatch.setattr(auth, 'is_revoked', lambda data: False)
+
+    assert refresh(client, tokens['refresh_token']).status_code == 200
+    assert refresh(client, tokens['refresh_token']).status_code == 401
+    assert RevokedToken.query.filter_by(reason='refreshed').count() == 1
+
+
+def test_refresh_token_is_not_an_access_token(client, guest):
+    tokens = issue_tokens(guest)
+    headers = {'Authorization': f"Bearer {tokens['refresh_token']}"}
+    assert client.get('/api/user/profile', headers=headers).status_code == 401
+
+
+def test_password_change_revokes_existing_tokens(client, guest):
+    headers = bearer(guest)
+    tokens = issue_tokens(guest)
+
+    guest.set_password('NewPassword456')
+    db.session.commit()
+
+    assert client.get('/api/user/profile', headers=headers).status_code == 401
+    assert refresh(client, tokens['refresh_token']).status_code == 401
+    assert client.get('/api/user/profile', headers=bearer(guest)).status_code == 200
+
+
+def test_revocation_reaches_processes_without_a_shared_version_store(client, guest, monkeypatch):
+    # Another worker revokes the tokens: this process sees no version bump,
+    # only the new row once its cached set expires
+    monkeypatch.setattr(revocation_cache, 'ttl', 0.2)
+    revocation_cache.bump()
+    monkeypatch.setattr(revocation_cache, 'bump', lambda: None)
+    headers = bearer(guest)
+    assert client.get('/api/user/profile', headers=headers).status_code == 200
+
+    auth.revoke_user_tokens(guest.id, 'password_changed')
+    db.session.commit()
+    assert client.get('/api/user/profile', headers=headers).status_code == 200
+
+    time.sleep(0.3)
+    assert client.get('/api/user/profile', headers=headers).status_code == 401
+
+
+def test_role_change_invalidates_token_claims(client, guest):
+    headers = bearer(guest)
+    assert client.get('/api/user/profile', headers=headers).status_code == 200
+
+    guest.is_staff = True
+    guest.staff_role = 'receptionist'
+    db.session.commit()
+
+    response = client.get('/api/user/profile', headers=headers)
+    assert response.status_code == 401
+    assert client.get('/api/user/profile', headers=bearer(guest)).status_code == 200
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+import jobs
+from extensions import db
+from jobs import task, enqueue, work, replay_dead
+from models import Job, DeadLetterJob
+
+calls = []
+
+
+@task('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task('tests.always_fails', max_attempts=2)
+def always_fails():
+    raise RuntimeError('gateway down')
+
+
+def _make_due(job_id):
+    # Skip the backoff wait
+    Job.query.filter_by(id=job_id).update({'run_at': datetime.utcnow()})
+    db.session.commit()
+
+
+def test_enqueue_is_committed_by_the_caller(app):
+    job_id = enqueue('tests.record', 'rolled back')
+    db.session.rollback()
+    assert db.session.get(Job, job_id) is None
+
+    job_id = enqueue('tests.record', 'kept')
+    db.session.commit()
+    assert db.session.get(Job, job_id).status == 'queued'
+
+
+def test_worker_runs_queued_jobs(app):
+    calls.clear()
+    record.delay('hello')
+    db.session.commit()
+
+    assert work(burst=True) == 1
+    assert calls == ['hello']
+    assert Job.query.one().status == 'done'
+
+
+def test_failed_job_is_retried_with_backoff(app):
+    job_id = enqueue('tests.always_fails')
+    db.session.commit()
+
+    work(burst=True)
+    job = db.session.get(Job, job_id)
+    assert job.status == 'queued'
+    assert job.attempts == 1
+    assert job.run_at > datetime.utcnow()
+    assert 'gateway down' in job.last_error
+    assert DeadLetterJob.query.count() == 0
+
+
+def test_exhausted_job_moves_to_dead_letters_and_can_be_replayed(app):
+    job_id = enqueue('tests.always_fails')
+    db.session.commit()
+    work(burst=True)
+    _make_due(job_id)
+    work(burst=True)
+
+    job = db.session.get(Job, job_id)
+    assert job.status == 'dead'
+    dead = DeadLetterJob.query.one()
+    assert (dead.job_id, dead.task, dead.attempts) == (job_id, 'tests.always_fails', 2)
+
+    assert replay_dead() == 1
+    assert DeadLetterJob.query.count() == 0
+    replayed = Job.query.filter(Job.id != job_id).one()
+    assert (replayed.task, replayed.status, replayed.attempts) == ('tests.always_fails', 'queued', 0)
+
+
+def test_backoff_grows_and_is_capped():
+    assert jobs.BACKOFF_BASE / 2 <= jobs.backoff_delay(1) <= jobs.BACKOFF_BASE
+    assert jobs.BACKOFF_BASE * 2 <= jobs.backoff_delay(3) <= jobs.BACKOFF_BASE * 4
+    assert jobs.backoff_delay(100) <= jobs.BACKOFF_MAX
@@ -0,0 +1,58 @@
+import smtplib
+
+import pytest
+
+from mailer import MailDispatcher, SMTPConnection
+
+
+class FakeServer:
+    def __init__(self, drop=False):
+        self.drop = drop
+        self.sent = []
+        self.closed = False
+
+    def sendmail(self, sender, recipients, message):
+        if self.drop:
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        self.sent.append(recipients)
+
+    def quit(self):
+        self.closed = True
+
+
+@pytest.fixture
+def dispatcher(monkeypatch):
+    monkeypatch.setenv('MAIL_USERNAME', 'mailer')
+    monkeypatch.setenv('MAIL_PASSWORD', 'secret')
+    return MailDispatcher(backend='smtp')
+
+
+def test_dropped_connection_is_reopened_and_retried(dispatcher, monkeypatch):
+    fresh = FakeServer()
+    dispatcher._pool.put(SMTPConnection(FakeServer(drop=True)))
+    monkeypatch.setattr(dispatcher, '_open', lambda: SMTPConnection(fresh))
+
+    dispatcher.send('guest@example.com', 'Hello', 'Body')
+    assert fresh.sent == [['guest@example.com']]
+    assert dispatcher._pool.get_nowait().server is fresh
+
+
+def test_failed_reconnect_discards_the_connection(dispatcher, monkeypatch):
+    dropped = FakeServer(drop=True)
+    dispatcher._pool.put(SMTPConnection(dropped))
+
+    def unreachable():
+        raise OSError('Network is unreachable')
+    monkeypatch.setattr(dispatcher, '_open', unreachable)
+
+    failures = dispatcher.send_many([('a@example.com', 'Hi', 'Body'), ('b@example.com', 'Hi', 'Body')])
+    assert [message[0] for message, _ in failures] == ['a@example.com', 'b@example.com']
+    assert dropped.closed
+    assert dispatcher._pool.qsize() == 0
+
+    # The slot was released and the next send opens a new session
+    fresh = FakeServer()
+    monkeypatch.setattr(dispatcher, '_open', lambda: SMTPConnection(fresh))
+    for _ in range(dispatcher.pool_size + 1):
+        dispatcher.send('c@example.com', 'Hi', 'Body')
+    assert len(fresh.sent) == dispatcher.pool_size + 1
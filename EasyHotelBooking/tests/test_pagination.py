@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import bearer
+from extensions import db
+from models import Booking, Payment
+from pagination import encode_cursor, decode_cursor, InvalidCursor, capped_count
+
+CREATED = datetime(2026, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def pending_bookings(make_booking):
+    # Pairs share a created_at so the id has to break the tie
+    bookings = []
+    for index in range(7):
+        booking = make_booking(10 + index * 3, 2, status='pending', commit=False)
+        booking.created_at = CREATED + timedelta(minutes=index // 2)
+        bookings.append(booking)
+    db.session.commit()
+    return sorted(bookings, key=lambda booking: (booking.created_at, booking.id), reverse=True)
+
+
+def fetch_all(client, url, headers, limit=3):
+    pages = []
+    cursor = None
+    while True:
+        params = {'limit': limit}
+        if cursor:
+            params['cursor'] = cursor
+        response = client.get(url, query_string=params, headers=headers)
+        assert response.status_code == 200
+        body = response.get_json()
+        pages.append(body)
+        cursor = body['next_cursor']
+        assert body['has_more'] is (cursor is not None)
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_every_row_once_in_order(client, admin, pending_bookings):
+    pages = fetch_all(client, '/api/admin/bookings/pending', bearer(admin))
+
+    assert [len(page['bookings']) for page in pages] == [3, 3, 1]
+    ids = [booking['id'] for page in pages for booking in page['bookings']]
+    assert ids == [booking.id for booking in pending_bookings]
+    assert all(page['total_count'] == 7 and page['total_count_exact'] for page in pages)
+
+
+def test_new_rows_do_not_shift_later_pages(client, admin, pending_bookings, make_booking):
+    headers = bearer(admin)
+    first = client.get('/api/admin/bookings/pending', query_string={'limit': 3}, headers=headers).get_json()
+
+    make_booking(60, 2, status='pending')
+    second = client.get('/api/admin/bookings/pending',
+                        query_string={'limit': 3, 'cursor': first['next_cursor']}, headers=headers).get_json()
+
+    assert [booking['id'] for booking in second['bookings']] == [booking.id for booking in pending_bookings[3:6]]
+    assert second['total_count'] == 8
+
+
+def test_filters_apply_to_pages_and_total(client, admin, pending_bookings):
+    pending_bookings[0].status = 'confirmed'
+    db.session.commit()
+
+    pages = fetch_all(client, '/api/admin/bookings/pending', bearer(admin))
+    ids = [booking['id'] for page in pages for booking in page['bookings']]
+    assert ids == [booking.id for booking in pending_bookings[1:]]
+    assert pages[0]['total_count'] == 6
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', encode_cursor(['2026-01-01T12:00:00'])])
+def test_invalid_cursor_is_rejected(client, admin, cursor):
+    response = client.get('/api/admin/bookings/pending', query_string={'cursor': cursor}, headers=bearer(admin))
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Invalid cursor'
+
+
+def test_cursor_round_trip():
+    values = [datetime(2026, 1, 1, 12, 0, 30, 125), 42]
+    assert decode_cursor(encode_cursor(values), (Booking.created_at, Booking.id)) == values
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor(values), (Booking.id,))
+
+
+def test_capped_count_stops_at_the_cap(pending_bookings):
+    assert capped_count(Booking.query) == (7, True)
+    assert capped_count(Booking.query, cap=7) == (7, True)
+    assert capped_count(Booking.query, cap=5) == (5, False)
+    assert capped_count(Booking.query.filter_by(status='confirmed')) == (0, True)
+
+
+def test_payment_listing_pages_and_counts(client, admin, guest, pending_bookings):
+    for booking in pending_bookings:
+        db.session.add(Payment(booking_id=booking.id, user_id=guest.id, amount=booking.total_price,
+                               payment_method='cash', created_at=booking.created_at))
+    db.session.commit()
+    expected = [payment.id for payment in Payment.query.order_by(Payment.created_at.desc(), Payment.id.desc())]
+
+    pages = fetch_all(client, '/api/admin/payments', bearer(admin))
+    assert [payment['id'] for page in pages for payment in page['payments']] == expected
+    assert all(page['total_payments'] == 7 and page['total_payments_exact'] for page in pages)
@@ -0,0 +1,47 @@
+from datetime import date, time
+
+import pytest
+
+from extensions import db
+from models import Attendance
+from payroll import compute_payroll
+
+PERIOD = (date(2026, 3, 1), date(2026, 3, 15))
+
+
+@pytest.fixture
+def hourly_staff(make_user):
+    return make_user('concierge', is_staff=True, staff_role='Concierge', staff_status='active',
+                     salary_type='hourly', hourly_rate=100.0, overtime_rate=150.0)
+
+
+def clock(staff, day, clock_in, clock_out, approved=True):
+    db.session.add(Attendance(user_id=staff.id, date=day, clock_in=clock_in, clock_out=clock_out,
+                              approved=approved))
+
+
+def line_for(staff):
+    return next(line for line in compute_payroll(*PERIOD) if line['staff_id'] == staff.id)
+
+
+def test_regular_and_overtime_hours(hourly_staff):
+    clock(hourly_staff, date(2026, 3, 2), time(9, 0), time(17, 0))
+    clock(hourly_staff, date(2026, 3, 3), time(8, 0), time(18, 30))
+    clock(hourly_staff, date(2026, 3, 4), time(8, 0), time(20, 0), approved=False)
+    clock(hourly_staff, date(2026, 3, 20), time(8, 0), time(20, 0))
+    db.session.commit()
+
+    line = line_for(hourly_staff)
+    assert line['total_hours'] == pytest.approx(18.5)
+    assert line['overtime_hours'] == pytest.approx(2.5)
+    assert line['gross_pay'] == pytest.approx(16 * 100.0 + 2.5 * 150.0)
+
+
+def test_clock_out_before_clock_in_is_not_an_overnight_shift(hourly_staff):
+    # Same-day arithmetic, as payroll has always done; no 24 hours are added
+    clock(hourly_staff, date(2026, 3, 2), time(22, 0), time(6, 0))
+    db.session.commit()
+
+    line = line_for(hourly_staff)
+    assert line['total_hours'] == pytest.approx(-16.0)
+    assert line['overtime_hours'] == 0.0
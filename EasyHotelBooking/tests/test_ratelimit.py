@@ -0,0 +1,32 @@
+import pytest
+
+import ratelimit
+from ratelimit import TokenBucketLimiter
+
+
+@pytest.fixture
+def strict_limits(monkeypatch):
+    # Two attempts per client IP, no refill to speak of during the test
+    monkeypatch.setattr(ratelimit, 'ip_limiter', TokenBucketLimiter(rate=0.001, burst=2))
+    monkeypatch.setattr(ratelimit, 'email_limiter', TokenBucketLimiter(rate=0.001, burst=100))
+
+
+def login(client, client_ip, attempt):
+    return client.post('/api/auth/login', json={'email': f'nobody{attempt}@example.com', 'password': 'wrong'},
+                       headers={'X-Forwarded-For': client_ip})
+
+
+def test_forwarded_clients_have_separate_buckets(client, strict_limits):
+    # Every request arrives from the router's address; only X-Forwarded-For tells clients apart
+    assert [login(client, '203.0.113.7', n).status_code for n in range(3)] == [401, 401, 429]
+    assert login(client, '198.51.100.23', 3).status_code == 401
+    assert login(client, '203.0.113.7', 4).status_code == 429
+
+
+def test_email_bucket_applies_across_clients(client, monkeypatch):
+    monkeypatch.setattr(ratelimit, 'ip_limiter', TokenBucketLimiter(rate=0.001, burst=100))
+    monkeypatch.setattr(ratelimit, 'email_limiter', TokenBucketLimiter(rate=0.001, burst=2))
+    payload = {'email': 'target@example.com', 'password': 'wrong'}
+    statuses = [client.post('/api/auth/login', json=payload, headers={'X-Forwarded-For': f'203.0.113.{n}'})
+                .status_code for n in range(3)]
+    assert statuses == [401, 401, 429]
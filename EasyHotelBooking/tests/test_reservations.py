@@ -0,0 +1,135 @@
+from datetime import date, timedelta
+
+import pytest
+
+import api_routes
+import reservations
+from conftest import bearer
+from extensions import db
+from models import Booking, RoomNight
+from reservations import RoomUnavailable, reserve_booking, is_room_free, night_rates
+
+
+def held_nights(booking_id):
+    return sorted(night for (night,) in db.session.query(RoomNight.night).filter_by(booking_id=booking_id))
+
+
+def days(offset):
+    return date.today() + timedelta(days=offset)
+
+
+def test_booking_holds_one_row_per_night(make_booking):
+    booking = make_booking(5, 3)
+    assert held_nights(booking.id) == [days(5), days(6), days(7)]
+    assert sum(rate for (rate,) in db.session.query(RoomNight.rate).filter_by(booking_id=booking.id)) \
+        == pytest.approx(booking.total_price)
+
+
+def test_overlapping_booking_is_rejected(make_booking, room):
+    first = make_booking(5, 3)
+    with pytest.raises(RoomUnavailable):
+        reserve_booking(make_booking(7, 2, commit=False))
+
+    assert Booking.query.count() == 1
+    assert held_nights(first.id) == [days(5), days(6), days(7)]
+
+
+def test_back_to_back_stays_and_other_rooms_are_allowed(make_booking, room):
+    make_booking(5, 3)
+    reserve_booking(make_booking(8, 2, commit=False))
+    reserve_booking(make_booking(5, 3, room_id=room.id + 1, commit=False))
+    db.session.commit()
+    assert Booking.query.count() == 3
+
+
+def test_cancelling_releases_the_nights(make_booking, room):
+    booking = make_booking(5, 3)
+    assert not is_room_free(room.id, days(5), days(8))
+
+    booking.status = 'cancelled'
+    db.session.commit()
+    assert held_nights(booking.id) == []
+    assert is_room_free(room.id, days(5), days(8))
+    reserve_booking(make_booking(5, 3, commit=False))
+    db.session.commit()
+
+
+def test_moving_a_booking_frees_nights_for_another_in_the_same_flush(make_booking):
+    first = make_booking(5, 2)
+    second = make_booking(7, 2)
+
+    # Swap the two stays in one transaction
+    first.check_in_date, first.check_out_date = days(7), days(9)
+    second.check_in_date, second.check_out_date = days(5), days(7)
+    db.session.commit()
+
+    assert held_nights(first.id) == [days(7), days(8)]
+    assert held_nights(second.id) == [days(5), days(6)]
+
+
+def test_repricing_updates_night_rates(make_booking):
+    booking = make_booking(5, 3)
+    booking.total_price = 100.0
+    db.session.commit()
+    rates = [rate for (rate,) in db.session.query(RoomNight.rate).filter_by(booking_id=booking.id)
+             .order_by(RoomNight.night)]
+    assert rates == [33.34, 33.33, 33.33]
+
+
+def test_night_rates_add_up_to_the_total():
+    assert night_rates(100.0, 3) == [33.34, 33.33, 33.33]
+    assert sum(night_rates(1234.57, 7)) == pytest.approx(1234.57)
+    assert night_rates(100.0, 0) == []
+
+
+def booking_request(room, start, nights):
+    return {
+        'room_id': room.id,
+        'check_in_date': days(start).isoformat(),
+        'check_out_date': days(start + nights).isoformat(),
+        'guests': 1
+    }
+
+
+def test_api_refuses_a_double_booking(client, guest, room, make_booking):
+    make_booking(5, 3)
+    response = client.post('/api/bookings', json=booking_request(room, 6, 2), headers=bearer(guest))
+    assert response.status_code == 400
+    assert Booking.query.count() == 1
+
+
+def test_api_reports_a_lost_race_as_conflict(client, guest, room, make_booking, monkeypatch):
+    # Both requests passed the availability pre-check; the ledger key stops the second
+    make_booking(5, 3)
+    monkeypatch.setattr(api_routes, 'is_room_free', lambda *args, **kwargs: True)
+
+    response = client.post('/api/bookings', json=booking_request(room, 6, 2), headers=bearer(guest))
+    assert response.status_code == 409
+    assert Booking.query.count() == 1
+
+
+def test_api_books_a_free_room(client, guest, room):
+    response = client.post('/api/bookings', json=booking_request(room, 5, 2), headers=bearer(guest))
+    assert response.status_code == 200
+    booking_id = response.get_json()['booking']['id']
+    assert held_nights(booking_id) == [days(5), days(6)]
+
+
+def test_guard_fails_closed_until_the_ledger_is_rebuilt(make_booking, room, monkeypatch):
+    # An upgraded database: bookings exist but the ledger was never filled
+    existing = make_booking(5, 3)
+    RoomNight.query.delete()
+    db.session.commit()
+    monkeypatch.setattr(reservations, '_ledger_ready', False)
+
+    assert not reservations.ledger_ready()
+    assert not is_room_free(room.id, days(6), days(7))
+    assert is_room_free(room.id, days(8), days(9))
+    with pytest.raises(RoomUnavailable):
+        reserve_booking(make_booking(7, 2, commit=False))
+    assert Booking.query.count() == 1
+
+    reservations.rebuild_room_nights()
+    assert reservations.ledger_ready()
+    assert held_nights(existing.id) == [days(5), days(6), days(7)]
+    assert not is_room_free(room.id, days(6), days(7))
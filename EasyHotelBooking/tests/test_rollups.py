@@ -0,0 +1,55 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+import reports
+from extensions import db
+from models import DailyReport
+from rollups import rollup_range, last_complete_day
+
+TODAY = date.today()
+START = TODAY - timedelta(days=5)
+
+
+@pytest.fixture
+def past_bookings(make_booking):
+    for index, (days_ago, price) in enumerate(((5, 300.0), (3, 120.0), (3, 80.0), (1, 50.0))):
+        booking = make_booking(10 + index * 4, 2, commit=False)
+        booking.total_price = price
+        booking.created_at = datetime.combine(TODAY - timedelta(days=days_ago), datetime.min.time()) \
+            + timedelta(hours=10)
+    db.session.commit()
+
+
+def test_rollup_is_idempotent(past_bookings):
+    assert rollup_range(START, TODAY) == 5
+    first = reports.revenue_series(START, TODAY - timedelta(days=1), 'day')
+
+    assert rollup_range(START, TODAY) == 5
+    assert reports.revenue_series(START, TODAY - timedelta(days=1), 'day') == first
+    assert first['data'] == [300.0, 0.0, 200.0, 0.0, 50.0]
+    assert DailyReport.query.count() == 5
+
+
+def test_rollup_updates_rows_in_place(past_bookings, make_booking):
+    rollup_range(START, TODAY)
+    ids = {row.report_date: row.id for row in DailyReport.query}
+
+    booking = make_booking(80, 1, commit=False)
+    booking.total_price = 25.0
+    booking.created_at = datetime.combine(TODAY - timedelta(days=1), datetime.min.time())
+    db.session.commit()
+    rollup_range(START, TODAY)
+
+    assert {row.report_date: row.id for row in DailyReport.query} == ids
+    assert db.session.get(DailyReport, ids[last_complete_day()]).total_revenue == 75.0
+
+
+def test_report_date_is_unique(app):
+    db.session.add(DailyReport(report_date=START))
+    db.session.commit()
+    db.session.add(DailyReport(report_date=START))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
@@ -0,0 +1,147 @@
+"""
+The serializers replaced hand-written to_dict methods; these copies of the
+old methods pin the JSON shape (keys, key order, date format) clients rely on.
+"""
+
+import json
+from datetime import datetime
+
+import pytest
+
+from conftest import bearer
+from extensions import db
+from models import Booking, Notification, Payment
+from serializers import (user_serializer, room_serializer, booking_serializer, notification_serializer,
+                         payment_serializer)
+
+
+def user_to_dict(user):
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'phone_number': user.phone_number,
+        'is_admin': user.is_admin,
+        'is_staff': user.is_staff,
+        'staff_role': user.staff_role,
+        'staff_status': user.staff_status,
+        'staff_shift': user.staff_shift,
+        'is_verified': user.is_verified,
+        'created_at': user.created_at.isoformat()
+    }
+
+
+def room_to_dict(room):
+    return {
+        'id': room.id,
+        'name': room.name,
+        'description': room.description,
+        'price_per_night': room.price_per_night,
+        'capacity': room.capacity,
+        'image_url': room.image_url
+    }
+
+
+def booking_to_dict(booking):
+    return {
+        'id': booking.id,
+        'user_id': booking.user_id,
+        'room_id': booking.room_id,
+        'check_in_date': booking.check_in_date.isoformat(),
+        'check_out_date': booking.check_out_date.isoformat(),
+        'guests': booking.guests,
+        'total_price': booking.total_price,
+        'status': booking.status,
+        'cancellation_reason': booking.cancellation_reason,
+        'cancelled_by': booking.cancelled_by,
+        'created_at': booking.created_at.isoformat(),
+        'room': room_to_dict(booking.room) if booking.room else None,
+        'user': user_to_dict(booking.user) if booking.user else None
+    }
+
+
+def notification_to_dict(notification):
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'is_read': notification.is_read,
+        'created_at': notification.created_at.isoformat()
+    }
+
+
+def payment_to_dict(payment):
+    # Formerly built inline by GET /api/admin/payments
+    return {
+        'id': payment.id,
+        'booking_id': payment.booking_id,
+        'user_id': payment.user_id,
+        'amount': payment.amount,
+        'payment_method': payment.payment_method,
+        'payment_status': payment.payment_status,
+        'gcash_phone_number': payment.gcash_phone_number,
+        'created_at': payment.created_at.isoformat(),
+        'paid_at': payment.paid_at.isoformat() if payment.paid_at else None,
+        'user_name': payment.user.username if payment.user else 'Unknown',
+        'booking_room': payment.booking.room.name if payment.booking and payment.booking.room else 'Unknown'
+    }
+
+
+def same_shape(actual, expected):
+    """Equal, with the keys in the same order (the JSON is not key-sorted for every client)"""
+    return actual == expected and json.dumps(actual) == json.dumps(expected)
+
+
+@pytest.fixture
+def booking(make_booking):
+    booking = make_booking(5, 2)
+    booking.cancellation_reason = 'Plans changed — ñ'
+    db.session.commit()
+    return booking
+
+
+@pytest.mark.parametrize('view', ['list', 'detail'])
+def test_user_and_room_shapes(admin, room, view):
+    assert same_shape(user_serializer.dump(admin, view), user_to_dict(admin))
+    assert same_shape(room_serializer.dump(room, view), room_to_dict(room))
+
+
+@pytest.mark.parametrize('view', ['list', 'detail'])
+def test_booking_shape(booking, view):
+    assert same_shape(booking_serializer.dump(booking, view), booking_to_dict(booking))
+    assert same_shape(booking_serializer.dump_many([booking], view), [booking_to_dict(booking)])
+
+
+def test_notification_shape(guest):
+    notification = Notification(user_id=guest.id, title='Booking confirmed', message='See you soon')
+    db.session.add(notification)
+    db.session.commit()
+    assert same_shape(notification_serializer.dump_many([notification], 'list'),
+                      [notification_to_dict(notification)])
+
+
+def test_payment_shape(booking, guest):
+    pending = Payment(booking_id=booking.id, user_id=guest.id, amount=200.0, payment_method='gcash',
+                      gcash_phone_number='09171234567')
+    paid = Payment(booking_id=booking.id, user_id=guest.id, amount=200.0, payment_method='cash',
+                   payment_status='completed', paid_at=datetime.utcnow())
+    db.session.add_all([pending, paid])
+    db.session.commit()
+    payments = [pending, paid]
+    assert same_shape(payment_serializer.dump_many(payments, 'list'), [payment_to_dict(p) for p in payments])
+
+
+def test_listing_response_matches_old_json(client, guest, booking):
+    response = client.get('/api/bookings', headers=bearer(guest))
+    assert response.status_code == 200
+
+    expected = json.loads(json.dumps({'bookings': [booking_to_dict(db.session.get(Booking, booking.id))]}))
+    assert response.get_json() == expected
+
+
+def test_listing_loads_relationships_in_one_query(booking):
+    db.session.expunge_all()
+    bookings = Booking.query.options(*booking_serializer.load_options('list')).all()
+    db.session.expunge_all()
+    # Detached objects raise on lazy loads, so this only works if the view's data was loaded up front
+    assert booking_serializer.dump_many(bookings, 'list')[0]['room']['id'] == bookings[0].room_id
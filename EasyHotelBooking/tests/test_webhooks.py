@@ -0,0 +1,133 @@
+import hashlib
+import hmac
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import bearer
+from extensions import db
+from models import Job, Payment, PaymentEvent
+from payment_reconciliation import (RECONCILE_MIN_AGE, verify_signature, ingest_event, webhook_secret,
+                                    reconcile_payments)
+
+BODY = b'{"data": {}}'
+
+
+def sign(body, secret=None, timestamp=None, mode='te'):
+    timestamp = int(timestamp if timestamp is not None else time.time())
+    digest = hmac.new((secret or webhook_secret()).encode(), f'{timestamp}.'.encode() + body,
+                      hashlib.sha256).hexdigest()
+    return f'{mode}={digest},t={timestamp}'
+
+
+def paid_event(event_id, intent_id, event_type='payment.paid'):
+    return {
+        'data': {
+            'id': event_id,
+            'attributes': {
+                'type': event_type,
+                'data': {'id': 'pay_1', 'attributes': {'payment_intent_id': intent_id, 'status': 'paid'}}
+            }
+        }
+    }
+
+
+@pytest.fixture
+def gcash_payment(make_booking, guest):
+    booking = make_booking(10, 2, status='pending')
+    payment = Payment(booking_id=booking.id, user_id=guest.id, amount=booking.total_price,
+                      payment_method='gcash', gateway_transaction_id='pi_test_1')
+    db.session.add(payment)
+    db.session.commit()
+    return payment
+
+
+@pytest.mark.parametrize('mode', ['te', 'li'])
+def test_valid_signature_is_accepted(mode):
+    assert verify_signature(sign(BODY, mode=mode), BODY)
+
+
+def test_invalid_signatures_are_rejected():
+    assert not verify_signature(sign(BODY, secret='whsk_other'), BODY)
+    assert not verify_signature(sign(BODY), b'{"data": {"tampered": true}}')
+    assert not verify_signature(sign(BODY, timestamp=time.time() - 3600), BODY)
+    assert not verify_signature('t=abc,te=00', BODY)
+    assert not verify_signature(None, BODY)
+    # Without a configured secret nothing verifies
+    assert not verify_signature(sign(BODY), BODY, secret='')
+
+
+def test_unsigned_webhook_is_refused(client, gcash_payment):
+    body = json.dumps(paid_event('evt_1', 'pi_test_1')).encode()
+    response = client.post('/api/payment/webhook', data=body, content_type='application/json')
+    assert response.status_code == 401
+    assert PaymentEvent.query.count() == 0
+    assert db.session.get(Payment, gcash_payment.id).payment_status == 'pending'
+
+
+def test_malformed_event_is_rejected(client):
+    body = b'{"data": {"id": "evt_bad"}}'
+    response = client.post('/api/payment/webhook', data=body, content_type='application/json',
+                           headers={'Paymongo-Signature': sign(body)})
+    assert response.status_code == 400
+
+
+def test_paid_event_completes_payment_once(client, gcash_payment):
+    body = json.dumps(paid_event('evt_1', 'pi_test_1')).encode()
+    headers = {'Paymongo-Signature': sign(body)}
+
+    response = client.post('/api/payment/webhook', data=body, content_type='application/json', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'processed'
+
+    db.session.expire_all()
+    payment = db.session.get(Payment, gcash_payment.id)
+    assert payment.payment_status == 'completed'
+    assert payment.paid_at is not None
+    assert payment.booking.status == 'confirmed'
+
+    # PayMongo redelivers until it sees a 2xx; the repeat is acknowledged but not stored again
+    response = client.post('/api/payment/webhook', data=body, content_type='application/json', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'duplicate'
+    assert PaymentEvent.query.filter_by(event_id='evt_1').count() == 1
+
+
+def test_late_failed_event_does_not_undo_completion(app, gcash_payment):
+    assert ingest_event(paid_event('evt_1', 'pi_test_1')) == 'processed'
+    assert ingest_event(paid_event('evt_2', 'pi_test_1', 'payment.failed')) == 'processed'
+    assert db.session.get(Payment, gcash_payment.id).payment_status == 'completed'
+
+
+def test_unknown_and_unmatched_events_are_recorded(app):
+    assert ingest_event(paid_event('evt_1', 'pi_unknown')) == 'unmatched'
+    assert ingest_event(paid_event('evt_2', 'pi_unknown', 'source.chargeable')) == 'ignored'
+    assert PaymentEvent.query.count() == 2
+
+
+def test_verify_waits_for_the_webhook_then_polls(client, guest, gcash_payment):
+    response = client.post(f'/api/payment/{gcash_payment.id}/verify', headers=bearer(guest))
+    assert response.get_json() == {'success': True, 'status': 'pending'}
+    assert Job.query.count() == 0
+
+    # No webhook arrived within RECONCILE_MIN_AGE: ask the gateway
+    gcash_payment.created_at = datetime.utcnow() - timedelta(seconds=RECONCILE_MIN_AGE + 1)
+    db.session.commit()
+    response = client.post(f'/api/payment/{gcash_payment.id}/verify', headers=bearer(guest))
+    assert response.get_json()['queued'] is True
+    assert [job.task for job in Job.query] == ['payments.verify']
+
+
+def test_reconcile_errors_are_logged_not_printed(app, gcash_payment, caplog, capsys):
+    class Unreachable:
+        def get(self, path):
+            raise ConnectionError('gateway unreachable')
+
+    with caplog.at_level(logging.WARNING, logger='payment_reconciliation'):
+        summary = reconcile_payments(min_age=0, client=Unreachable())
+    assert summary['error_payment_ids'] == [gcash_payment.id]
+    assert f'Reconcile of payment {gcash_payment.id} failed: gateway unreachable' in caplog.text
+    assert capsys.readouterr().out == ''